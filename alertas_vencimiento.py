@@ -0,0 +1,155 @@
+# alertas_vencimiento.py
+# Colección materializada AlertasVencimiento: una fila por patente × tipo (normalizado) con el
+# vencimiento más lejano conocido, el móvil y el modelo del vehículo.
+# La API la mantiene de forma incremental (dependencies.refrescar_alertas_vencimiento) y el ETL
+# la reconstruye completa al terminar la carga.
+# Uso: python alertas_vencimiento.py [--dry-run]   (reconstruye desde cero tras importaciones masivas)
+
+import os
+import logging
+import argparse
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pymongo import MongoClient
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+COLECCION_ALERTAS = "AlertasVencimiento"
+
+# Tipos de Documentacion que generan alerta (SEGURO y Poliza_Detalle se unifican como SEGURO)
+TIPOS_DOCUMENTACION_ALERTA = ["SEGURO", "Poliza_Detalle", "VTV"]
+
+
+def normalizar_tipo_vencimiento(tipo: str) -> str:
+    """Unifica las variantes de póliza (SEGURO, Poliza_Detalle, POLIZA_SEGURO_DIGITAL) como SEGURO."""
+    tipo_upper = (tipo or "").upper()
+    return "SEGURO" if "SEGURO" in tipo_upper or "POLIZA" in tipo_upper else tipo
+
+
+def expr_tipo_normalizado(campo: str) -> Dict[str, Any]:
+    """Equivalente en agregación de normalizar_tipo_vencimiento."""
+    return {
+        "$cond": [
+            {"$regexMatch": {"input": {"$toUpper": {"$ifNull": [campo, ""]}}, "regex": "SEGURO|POLIZA"}},
+            "SEGURO",
+            campo
+        ]
+    }
+
+
+def expr_fecha_documento_digital(campo: str) -> Dict[str, Any]:
+    """Convierte la fecha (date, ISO o dd/mm/aaaa) de documentos_digitales a BSON date, o null."""
+    return {
+        "$ifNull": [
+            {"$convert": {"input": campo, "to": "date", "onError": None, "onNull": None}},
+            {"$dateFromString": {"dateString": {"$toString": campo}, "format": "%d/%m/%Y", "onError": None, "onNull": None}}
+        ]
+    }
+
+
+def pipeline_materializar_alertas(
+    patente: Optional[str] = None, actualizado_en: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
+    """
+    Pipeline (a ejecutar sobre Documentacion) que produce las filas de AlertasVencimiento:
+    une Documentacion con Vehiculos.documentos_digitales ($unionWith), agrupa por
+    patente + tipo normalizado quedándose con el vencimiento más lejano (una póliza
+    renovada anula a la vieja) y agrega móvil y modelo con $lookup.
+    No incluye la etapa final ($out / $merge): la elige quien lo ejecuta. `actualizado_en` es la
+    marca de las filas (por defecto $$NOW); el refresco incremental pasa la suya para borrar las viejas.
+    """
+    filtro_doc: Dict[str, Any] = {
+        "tipo_documento": {"$in": TIPOS_DOCUMENTACION_ALERTA},
+        "fecha_vencimiento": {"$type": "date"}
+    }
+    filtro_veh: Dict[str, Any] = {"documentos_digitales": {"$elemMatch": {"fecha_vencimiento": {"$nin": [None, ""]}}}}
+    if patente:
+        filtro_doc["patente"] = patente
+        filtro_veh["_id"] = patente
+
+    return [
+        {"$match": filtro_doc},
+        {"$project": {
+            "_id": 0,
+            "patente": 1,
+            "tipo": expr_tipo_normalizado("$tipo_documento"),
+            "fecha": "$fecha_vencimiento"
+        }},
+        {"$unionWith": {
+            "coll": "Vehiculos",
+            "pipeline": [
+                {"$match": filtro_veh},
+                {"$project": {"documentos_digitales.tipo": 1, "documentos_digitales.fecha_vencimiento": 1}},
+                {"$unwind": "$documentos_digitales"},
+                {"$project": {
+                    "_id": 0,
+                    "patente": "$_id",
+                    "tipo": expr_tipo_normalizado("$documentos_digitales.tipo"),
+                    "fecha": expr_fecha_documento_digital("$documentos_digitales.fecha_vencimiento")
+                }},
+                {"$match": {"fecha": {"$ne": None}}}
+            ]
+        }},
+        {"$group": {"_id": {"patente": "$patente", "tipo": "$tipo"}, "fecha": {"$max": "$fecha"}}},
+        {"$lookup": {
+            "from": "Vehiculos",
+            "let": {"patente": "$_id.patente"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$_id", "$$patente"]}}},
+                {"$project": {"movil_nro": "$nro_movil", "descripcion_modelo": 1}}  # esquema canónico
+            ],
+            "as": "vehiculo"
+        }},
+        {"$unwind": {"path": "$vehiculo", "preserveNullAndEmptyArrays": True}},
+        {"$project": {
+            "_id": {"$concat": [{"$toString": "$_id.patente"}, "_", {"$toString": "$_id.tipo"}]},
+            "patente": "$_id.patente",
+            "tipo_documento": "$_id.tipo",
+            "fecha_vencimiento": "$fecha",
+            "movil_nro": {"$ifNull": [{"$toString": "$vehiculo.movil_nro"}, None]},
+            "descripcion_modelo": {"$ifNull": ["$vehiculo.descripcion_modelo", None]},
+            "actualizado_en": {"$literal": actualizado_en} if actualizado_en else "$$NOW"
+        }}
+    ]
+
+
+def reconstruir_alertas_vencimiento(db, dry_run: bool = False) -> int:
+    """Regenera AlertasVencimiento desde cero ($out reemplaza la colección conservando sus índices)."""
+    pipeline = pipeline_materializar_alertas()
+
+    if dry_run:
+        filas = list(db["Documentacion"].aggregate(pipeline + [{"$count": "total"}]))
+        total = filas[0]["total"] if filas else 0
+        logger.info(f"[DRY] Se generarían {total} alertas en {COLECCION_ALERTAS}.")
+        return total
+
+    # Los índices de AlertasVencimiento los declara dependencies.INDICES_REQUERIDOS
+    db["Documentacion"].aggregate(pipeline + [{"$out": COLECCION_ALERTAS}])
+
+    total = db[COLECCION_ALERTAS].count_documents({})
+    logger.info(f"{COLECCION_ALERTAS} reconstruida: {total} alertas.")
+    return total
+
+
+def main(dry_run: bool):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    load_dotenv()
+    mongo_uri = os.getenv("MONGO_URI")
+    if not mongo_uri:
+        raise RuntimeError("Falta MONGO_URI en las variables de entorno")
+
+    client = MongoClient(mongo_uri)
+    try:
+        db = client[os.getenv("DB_NAME", "MacSeguridadFlota")]
+        reconstruir_alertas_vencimiento(db, dry_run)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconstruye la colección materializada AlertasVencimiento desde Documentacion y Vehiculos.")
+    parser.add_argument("--dry-run", action="store_true", help="Solo cuenta cuántas alertas se generarían.")
+    args = parser.parse_args()
+    main(args.dry_run)
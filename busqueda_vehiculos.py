@@ -0,0 +1,157 @@
+# busqueda_vehiculos.py
+# Campo de búsqueda indexado para GET /vehiculos?filtro=
+# Cada vehículo guarda `search_tokens` (multikey, índice en dependencies.INDICES_REQUERIDOS) con los
+# n-gramas de la patente y los prefijos de móvil, marca, modelo, descripción y tipo, en minúsculas y
+# sin acentos. Los tokens se guardan también por campo en `search_tokens_campos` para que un PATCH
+# parcial pueda recalcular `search_tokens` en la misma operación de escritura.
+# Lo usan create_vehiculo / update_vehiculo (routers/flota.py) y el upsert de vehículos del ETL.
+# Uso: python busqueda_vehiculos.py [--dry-run]   (backfill de los vehículos existentes)
+
+import os
+import re
+import logging
+import argparse
+import unicodedata
+from typing import Any, Dict, List
+
+from pymongo import MongoClient, UpdateOne
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+# Grupo de búsqueda → campos del documento que lo alimentan (canónico + clave legada en MAYÚSCULAS
+# de documentos aún no migrados por esquema_vehiculos.py)
+CAMPOS_BUSQUEDA: Dict[str, tuple] = {
+    "patente": ("_id", "patente_original"),
+    "nro_movil": ("NRO_MOVIL", "nro_movil"),
+    "marca": ("MARCA", "marca"),
+    "modelo": ("MODELO", "modelo"),
+    "descripcion_modelo": ("DESCRIPCION_MODELO", "descripcion_modelo"),
+    "tipo": ("TIPO", "tipo"),
+}
+
+# Campo de la API (VehiculoCreateInput / VehiculoPatchInput) → grupo de búsqueda
+GRUPO_POR_CAMPO_API = {
+    "nro_movil": "nro_movil",
+    "marca": "marca",
+    "modelo": "modelo",
+    "descripcion_modelo": "descripcion_modelo",
+    "tipo": "tipo",
+}
+
+_NO_ALFANUMERICO = re.compile(r"[^a-z0-9]+")
+
+
+# Valores de relleno del ETL que no deben generar tokens
+_VALORES_VACIOS = {"", "N/A", "NAN", "NONE", "SIN MODELO"}
+
+
+def _palabras(valor: Any) -> List[str]:
+    """Minúsculas, sin acentos, partido en palabras alfanuméricas."""
+    if valor is None or str(valor).strip().upper() in _VALORES_VACIOS:
+        return []
+    texto = unicodedata.normalize("NFKD", str(valor)).encode("ascii", "ignore").decode("ascii").lower()
+    return [p for p in _NO_ALFANUMERICO.split(texto) if p]
+
+
+def tokens_campo(grupo: str, valor: Any) -> List[str]:
+    """
+    Tokens de un valor: para la patente todos los n-gramas (>= 2 caracteres) para que "123"
+    encuentre "AB123CD"; para el resto, los prefijos de cada palabra.
+    """
+    tokens = set()
+    for palabra in _palabras(valor):
+        if grupo == "patente":
+            tokens.update(
+                palabra[i:j] for i in range(len(palabra)) for j in range(i + 2, len(palabra) + 1)
+            )
+        else:
+            tokens.update(palabra[:j] for j in range(1, len(palabra) + 1))
+    return sorted(tokens)
+
+
+def tokens_por_grupo(doc: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Tokens de cada grupo de búsqueda a partir de un documento de Vehiculos completo."""
+    resultado = {}
+    for grupo, campos in CAMPOS_BUSQUEDA.items():
+        tokens = set()
+        for campo in campos:
+            tokens.update(tokens_campo(grupo, doc.get(campo)))
+        resultado[grupo] = sorted(tokens)
+    return resultado
+
+
+def campos_busqueda(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Campos a guardar (search_tokens_campos + search_tokens) para un documento completo."""
+    por_grupo = tokens_por_grupo(doc)
+    return {
+        "search_tokens_campos": por_grupo,
+        "search_tokens": sorted({t for tokens in por_grupo.values() for t in tokens}),
+    }
+
+
+def expr_union_search_tokens() -> Dict[str, Any]:
+    """Expresión de agregación que recompone search_tokens desde search_tokens_campos."""
+    return {"$setUnion": [
+        {"$ifNull": [f"$search_tokens_campos.{grupo}", []]} for grupo in CAMPOS_BUSQUEDA
+    ]}
+
+
+def etapas_actualizar_busqueda(valores_por_grupo: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Etapas de un update con pipeline para un PATCH parcial: reemplaza los tokens de los grupos
+    modificados y recompone search_tokens en la misma operación atómica.
+    """
+    if not valores_por_grupo:
+        return []
+    return [
+        {"$set": {
+            f"search_tokens_campos.{grupo}": {"$literal": tokens_campo(grupo, valor)}
+            for grupo, valor in valores_por_grupo.items()
+        }},
+        {"$set": {"search_tokens": expr_union_search_tokens()}},
+    ]
+
+
+def tokens_de_busqueda(filtro: str) -> List[str]:
+    """Palabras del texto buscado; el vehículo debe contener todas ($all) en search_tokens."""
+    return list(dict.fromkeys(_palabras(filtro)))
+
+
+def backfill(db, dry_run: bool = False) -> int:
+    """Recalcula search_tokens de todos los vehículos con un único bulk_write."""
+    operaciones = [
+        UpdateOne({"_id": doc["_id"]}, {"$set": campos_busqueda(doc)})
+        for doc in db["Vehiculos"].find({}, {campo: 1 for campos in CAMPOS_BUSQUEDA.values() for campo in campos})
+    ]
+    if not operaciones:
+        logger.info("No hay vehículos para actualizar.")
+        return 0
+    if dry_run:
+        logger.info(f"[DRY] {len(operaciones)} vehículos a actualizar.")
+        return len(operaciones)
+
+    result = db["Vehiculos"].bulk_write(operaciones, ordered=False)
+    logger.info(f"search_tokens recalculados: {result.modified_count} de {len(operaciones)} vehículos.")
+    return result.modified_count
+
+
+def main(dry_run: bool):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    load_dotenv()
+    mongo_uri = os.getenv("MONGO_URI")
+    if not mongo_uri:
+        raise RuntimeError("Falta MONGO_URI en las variables de entorno")
+
+    client = MongoClient(mongo_uri)
+    try:
+        backfill(client[os.getenv("DB_NAME", "MacSeguridadFlota")], dry_run)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recalcula el campo search_tokens de todos los vehículos.")
+    parser.add_argument("--dry-run", action="store_true", help="Solo cuenta cuántos vehículos se actualizarían.")
+    args = parser.parse_args()
+    main(args.dry_run)
@@ -0,0 +1,200 @@
+# clasificacion_costos.py
+# Clasificación de los costos al escribir: campos `categoria` y `excluido` en Mantenimiento y Finanzas.
+# Antes cada lectura clasificaba por su cuenta (palabras de multa en el motivo para el reporte,
+# palabras de exclusión en la descripción para /costos/unificado, monto 0 para la limpieza) y los
+# números no coincidían. Ahora la regla vive solo acá y se guarda en el documento:
+#   categoria: "Multa" (solo Finanzas), "Mantenimiento" o el tipo_costo / TIPO del costo ("Otros" si no hay)
+#   excluido:  None si es un gasto real; "sin_importe" (importe <= 0) o "no_es_gasto" (ajustes,
+#              correcciones, devoluciones...) si los reportes no lo cuentan.
+# Escriben la clasificación: el ETL, los endpoints de costos (dependencies.registrar_escritura_costo)
+# y este script para los documentos existentes (o todos, tras cambiar las listas de palabras).
+# Uso: python clasificacion_costos.py [--dry-run] [--lote 1000] [--todos]
+
+import os
+import re
+import logging
+import argparse
+import unicodedata
+from typing import Any, Dict, Optional
+
+from pymongo import MongoClient, UpdateOne
+from dotenv import load_dotenv
+
+from versiones import COLECCION_METADATOS, INCREMENTO_VERSION, filtro_version
+
+logger = logging.getLogger(__name__)
+
+COLECCIONES_CLASIFICADAS = ("Finanzas", "Mantenimiento")
+
+CATEGORIA_MULTA = "Multa"
+EXCLUSION_SIN_IMPORTE = "sin_importe"
+EXCLUSION_NO_ES_GASTO = "no_es_gasto"
+
+# Filtro de los costos que cuentan en reportes, rollup y exportaciones (null o sin clasificar todavía)
+FILTRO_INCLUIDO = {"excluido": None}
+# Categoría de Finanzas sin tipo y de los documentos que todavía no se clasificaron
+CATEGORIA_OTROS = "Otros"
+
+# Palabras (sin acentos) que marcan una fila de Finanzas como multa
+PALABRAS_MULTA = ["MULTA", "INFRACCION", "EXCESO", "VELOCIDAD", "VIA PROHIBIDA"]
+# Campos donde se buscan: tipo del registro (ETL: INFRACCION), tipo elegido en la carga manual y motivo
+CAMPOS_MULTA = ("tipo_registro", "tipo_costo", "TIPO", "motivo", "MOTIVO")
+
+# Palabras (sin acentos) de la descripción que marcan movimientos que no son gastos reales
+PALABRAS_EXCLUSION = {
+    "Mantenimiento": ["ADMINISTRATIVO", "CORRECCION", "AJUSTE", "DEVOLUCION"],
+    "Finanzas": ["ADMINISTRATIVO", "CORRECCION", "DEVOLUCION", "DESCUENTO", "AJUSTE"],
+}
+
+# Campos de importe por colección, en orden de prioridad (ETL / edición primero, costos manuales después)
+CAMPOS_IMPORTE = {
+    "Mantenimiento": ("costo_monto", "COSTO_MONTO", "importe"),
+    "Finanzas": ("MONTO", "monto", "importe"),
+}
+
+# Campos de descripción por colección, en orden de prioridad (edición manual primero)
+CAMPOS_DESCRIPCION = {
+    "Mantenimiento": ("detalle", "descripcion", "DESCRIPCIÓN", "DESCRIPCIN", "motivo"),
+    "Finanzas": ("DETALLE", "descripcion", "motivo", "MOTIVO", "ACTA"),
+}
+
+_RE_MULTA = re.compile("|".join(PALABRAS_MULTA))
+_RE_EXCLUSION = {origen: re.compile("|".join(palabras)) for origen, palabras in PALABRAS_EXCLUSION.items()}
+
+
+def primero(doc: Dict[str, Any], *campos: str) -> Any:
+    """Equivalente de $ifNull: primer campo que no sea None (ni falte)."""
+    for campo in campos:
+        if doc.get(campo) is not None:
+            return doc[campo]
+    return None
+
+
+def _a_float(valor: Any) -> float:
+    try:
+        return float(valor) if valor is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _mayusculas_sin_acentos(texto: Any) -> str:
+    texto = unicodedata.normalize("NFKD", str(texto or ""))
+    return "".join(c for c in texto if not unicodedata.combining(c)).upper()
+
+
+def importe_costo(doc: Dict[str, Any], origen: str) -> float:
+    """Primer campo de importe con valor, como double (0 si falta o no es numérico)."""
+    return _a_float(primero(doc, *CAMPOS_IMPORTE[origen]))
+
+
+def descripcion_costo(doc: Dict[str, Any], origen: str) -> Optional[str]:
+    descripcion = primero(doc, *CAMPOS_DESCRIPCION[origen])
+    return str(descripcion).strip() if descripcion is not None else None
+
+
+def clasificar(doc: Dict[str, Any], origen: str) -> Dict[str, Any]:
+    """Campos de clasificación a guardar en un documento de Mantenimiento o Finanzas."""
+    if importe_costo(doc, origen) <= 0:
+        excluido = EXCLUSION_SIN_IMPORTE
+    elif _RE_EXCLUSION[origen].search(_mayusculas_sin_acentos(descripcion_costo(doc, origen))):
+        excluido = EXCLUSION_NO_ES_GASTO
+    else:
+        excluido = None
+
+    if origen == "Mantenimiento":
+        categoria = "Mantenimiento"
+    elif _RE_MULTA.search(_mayusculas_sin_acentos(" ".join(str(doc.get(c) or "") for c in CAMPOS_MULTA))):
+        categoria = CATEGORIA_MULTA
+    else:
+        categoria = str(primero(doc, "tipo_costo", "TIPO") or CATEGORIA_OTROS)
+    return {"categoria": categoria, "excluido": excluido}
+
+
+def clasificacion_guardada(doc: Dict[str, Any], origen: str) -> Dict[str, Any]:
+    """
+    La clasificación como la leen los pipelines (FILTRO_INCLUIDO, costos_mensuales.PROYECCION_COSTO_*):
+    los campos guardados, y para un documento sin clasificar todavía, incluido y en "Otros".
+    Las sumas y restas incrementales del rollup y el libro usan esta y no clasificar(): un documento
+    viejo se descuenta de la misma fila en la que lo puso la reconstrucción.
+    """
+    if origen == "Mantenimiento":
+        categoria = "Mantenimiento"
+    else:
+        categoria = doc["categoria"] if doc.get("categoria") is not None else CATEGORIA_OTROS
+    return {"categoria": categoria, "excluido": doc.get("excluido")}
+
+
+def es_multa(categoria: Optional[str]) -> bool:
+    return categoria == CATEGORIA_MULTA
+
+
+def _campos_leidos(origen: str) -> Dict[str, int]:
+    """Proyección con lo que necesita clasificar() más la clasificación guardada."""
+    campos = (*CAMPOS_IMPORTE[origen], *CAMPOS_DESCRIPCION[origen], *CAMPOS_MULTA, "categoria", "excluido")
+    return {campo: 1 for campo in campos}
+
+
+def backfill_coleccion(db, collection_name: str, dry_run: bool = False, lote: int = 1000, todos: bool = False) -> int:
+    """
+    Guarda la clasificación en los documentos que no la tienen (o en todos con `todos`) con un solo
+    cursor y bulk_write cada `lote` cambios. Solo escribe los documentos cuya clasificación cambia.
+    Se puede cortar y volver a correr: sin `todos` retoma por los que siguen sin categoria.
+    """
+    collection = db[collection_name]
+    filtro = {} if todos else {"categoria": {"$exists": False}}
+    pendientes = collection.count_documents(filtro)
+    if dry_run or not pendientes:
+        logger.info(f"{'[DRY] ' if dry_run else ''}{collection_name}: {pendientes} documentos por clasificar.")
+        return pendientes if dry_run else 0
+
+    actualizados, revisados = 0, 0
+    operaciones = []
+    for doc in collection.find(filtro, _campos_leidos(collection_name)).sort("_id", 1):
+        clasificacion = clasificar(doc, collection_name)
+        if any(campo not in doc or doc[campo] != valor for campo, valor in clasificacion.items()):
+            operaciones.append(UpdateOne({"_id": doc["_id"]}, {"$set": clasificacion}))
+        revisados += 1
+        if len(operaciones) >= lote or revisados == pendientes:
+            if operaciones:
+                actualizados += collection.bulk_write(operaciones, ordered=False).modified_count
+                operaciones = []
+            logger.info(f"{collection_name}: {revisados}/{pendientes} revisados, {actualizados} reclasificados.")
+    if operaciones:
+        actualizados += collection.bulk_write(operaciones, ordered=False).modified_count
+
+    if actualizados:
+        db[COLECCION_METADATOS].update_one(filtro_version(collection_name), INCREMENTO_VERSION, upsert=True)
+    logger.info(f"{collection_name}: {actualizados} documentos reclasificados.")
+    return actualizados
+
+
+def main(dry_run: bool, lote: int, todos: bool):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    load_dotenv()
+    mongo_uri = os.getenv("MONGO_URI")
+    if not mongo_uri:
+        raise RuntimeError("Falta MONGO_URI en las variables de entorno")
+
+    # Importados acá y no arriba: ambos módulos importan este (import circular)
+    from costos_mensuales import reconstruir_costos_mensuales
+    from libro_costos import reconstruir_libro_costos
+
+    client = MongoClient(mongo_uri)
+    try:
+        db = client[os.getenv("DB_NAME", "MacSeguridadFlota")]
+        actualizados = sum(backfill_coleccion(db, collection_name, dry_run, lote, todos) for collection_name in COLECCIONES_CLASIFICADAS)
+        if actualizados and not dry_run:
+            # El rollup y el libro copian la clasificación: se regeneran con la nueva
+            reconstruir_costos_mensuales(db)
+            reconstruir_libro_costos(db)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Guarda categoria y excluido en Finanzas y Mantenimiento.")
+    parser.add_argument("--dry-run", action="store_true", help="Solo cuenta los documentos pendientes.")
+    parser.add_argument("--lote", type=int, default=1000, help="Documentos por bulk_write (default: 1000).")
+    parser.add_argument("--todos", action="store_true", help="Reclasifica todos los documentos, no solo los nuevos.")
+    args = parser.parse_args()
+    main(args.dry_run, args.lote, args.todos)
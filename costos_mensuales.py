@@ -0,0 +1,194 @@
+# costos_mensuales.py
+# Filas de costo clasificadas y rollup mensual CostosMensuales.
+# Mantenimiento y Finanzas guardan el importe con nombres distintos según el origen (ETL, costos
+# manuales, ediciones) y la categoría ya clasificada al escribir (clasificacion_costos.py).
+# PROYECCION_COSTO_* los llevan a una fila común (patente, fecha, tipo, importe, origen, es_multa)
+# para los reportes; fila_costo hace lo mismo en Python con la misma regla (la clasificación guardada,
+# clasificacion_costos.clasificacion_guardada). Los costos excluidos no entran.
+# CostosMensuales: una fila por patente × mes × origen × categoría con total, total_infracciones y
+# cantidad. La API la mantiene con $inc en cada escritura de costos (dependencies.registrar_escritura_costo)
+# y el ETL la reconstruye completa al terminar la carga.
+# Uso: python costos_mensuales.py [--dry-run]   (reconstruye desde cero tras importaciones masivas)
+
+import os
+import logging
+import argparse
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pymongo import MongoClient
+from dotenv import load_dotenv
+
+from clasificacion_costos import (
+    CAMPOS_IMPORTE, CATEGORIA_MULTA, CATEGORIA_OTROS, FILTRO_INCLUIDO, clasificacion_guardada, es_multa, importe_costo
+)
+
+logger = logging.getLogger(__name__)
+
+COLECCION_COSTOS_MENSUALES = "CostosMensuales"
+
+def expr_importe(*campos: str) -> Dict[str, Any]:
+    """Primer campo con valor convertido a double (0 si falta o no es numérico)."""
+    return {"$convert": {
+        "input": {"$ifNull": [f"${c}" for c in campos] + [None]},
+        "to": "double", "onError": 0.0, "onNull": 0.0
+    }}
+
+
+# Proyección común de cada colección: las filas salen ya clasificadas y con importe numérico
+PROYECCION_COSTO_MANTENIMIENTO = {
+    "_id": 0,
+    "_clave": {"$toString": "$_id"},
+    "patente": 1,
+    "_fecha_ms": {"$toLong": "$fecha_evento"},
+    "fecha": {"$dateToString": {"format": "%Y-%m-%d", "date": "$fecha_evento"}},
+    "tipo": {"$literal": "Mantenimiento"},
+    "descripcion": {"$ifNull": ["$DESCRIPCIÓN", "Servicio técnico"]},
+    "importe": expr_importe(*CAMPOS_IMPORTE["Mantenimiento"]),
+    "origen": {"$literal": "Mantenimiento"},
+    "es_multa": {"$literal": False},
+}
+
+PROYECCION_COSTO_FINANZAS = {
+    "_id": 0,
+    "_clave": {"$toString": "$_id"},
+    "patente": 1,
+    "_fecha_ms": {"$toLong": "$fecha_evento"},
+    "fecha": {"$dateToString": {"format": "%Y-%m-%d", "date": "$fecha_evento"}},
+    "tipo": {"$ifNull": ["$categoria", CATEGORIA_OTROS]},
+    "descripcion": {"$substrCP": [{"$toString": {"$ifNull": ["$motivo", "$ACTA", "Gasto financiero"]}}, 0, 100]},
+    "importe": expr_importe(*CAMPOS_IMPORTE["Finanzas"]),
+    "origen": {"$literal": "Finanzas"},
+    "es_multa": {"$eq": ["$categoria", CATEGORIA_MULTA]},
+}
+
+
+def clasificar_costo(doc: Dict[str, Any], origen: str) -> Dict[str, Any]:
+    """Clasificación guardada (la misma que leen los pipelines) más importe numérico y es_multa de un documento."""
+    clasificacion = clasificacion_guardada(doc, origen)
+    return {**clasificacion, "importe": importe_costo(doc, origen), "es_multa": es_multa(clasificacion["categoria"])}
+
+
+def fila_costo(doc: Dict[str, Any], origen: str) -> Optional[Dict[str, Any]]:
+    """
+    Fila del rollup para un documento de costos.
+    None si el documento no tiene fecha_evento o está excluido: tampoco entra en los reportes ni en
+    la reconstrucción.
+    """
+    fecha = doc.get("fecha_evento")
+    if not isinstance(fecha, datetime) or not doc.get("patente"):
+        return None
+
+    clasificacion = clasificar_costo(doc, origen)
+    if clasificacion["excluido"]:
+        return None
+    return {
+        "patente": doc["patente"],
+        "mes": fecha.strftime("%Y-%m"),
+        "origen": origen,
+        **{k: clasificacion[k] for k in ("categoria", "importe", "es_multa")},
+    }
+
+
+def id_costo_mensual(patente: str, mes: str, origen: str, categoria: str) -> str:
+    return f"{patente}|{mes}|{origen}|{categoria}"
+
+
+def incremento_costo_mensual(fila: Dict[str, Any], signo: int) -> Dict[str, Any]:
+    """Filtro y update ($inc con upsert) que suma (signo 1) o resta (signo -1) una fila al rollup."""
+    return {
+        "filtro": {"_id": id_costo_mensual(fila["patente"], fila["mes"], fila["origen"], fila["categoria"])},
+        "update": {
+            "$inc": {
+                "total": signo * fila["importe"],
+                "total_infracciones": signo * fila["importe"] if fila["es_multa"] else 0.0,
+                "cantidad": signo,
+            },
+            "$setOnInsert": {k: fila[k] for k in ("patente", "mes", "origen", "categoria")},
+            "$set": {"actualizado_en": datetime.utcnow()},
+        },
+    }
+
+
+PROYECCION_COSTO = {"Mantenimiento": PROYECCION_COSTO_MANTENIMIENTO, "Finanzas": PROYECCION_COSTO_FINANZAS}
+
+
+def pipeline_costos_mensuales(filtro: Optional[Dict[str, Any]] = None, origen: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Pipeline (a ejecutar sobre Mantenimiento) que produce las filas de CostosMensuales.
+    Con `origen` se ejecuta sobre esa colección sola (sin $unionWith).
+    No incluye la etapa final ($out / $merge): la elige quien lo ejecuta.
+    """
+    filtro = {**(filtro or {}), "fecha_evento": {"$type": "date"}, **FILTRO_INCLUIDO}
+    if origen:
+        etapas = [{"$match": filtro}, {"$project": PROYECCION_COSTO[origen]}]
+    else:
+        etapas = [
+            {"$match": filtro},
+            {"$project": PROYECCION_COSTO_MANTENIMIENTO},
+            {"$unionWith": {"coll": "Finanzas", "pipeline": [
+                {"$match": filtro},
+                {"$project": PROYECCION_COSTO_FINANZAS},
+            ]}},
+        ]
+    return etapas + [
+        {"$group": {
+            "_id": {"patente": "$patente", "mes": {"$substrCP": ["$fecha", 0, 7]}, "origen": "$origen", "categoria": "$tipo"},
+            "total": {"$sum": "$importe"},
+            "total_infracciones": {"$sum": {"$cond": ["$es_multa", "$importe", 0.0]}},
+            "cantidad": {"$sum": 1},
+        }},
+        {"$project": {
+            "_id": {"$concat": [
+                {"$toString": "$_id.patente"}, "|", "$_id.mes", "|", "$_id.origen", "|", {"$toString": "$_id.categoria"}
+            ]},
+            "patente": "$_id.patente",
+            "mes": "$_id.mes",
+            "origen": "$_id.origen",
+            "categoria": {"$toString": "$_id.categoria"},
+            "total": 1,
+            "total_infracciones": 1,
+            "cantidad": 1,
+            "actualizado_en": "$$NOW",
+        }},
+    ]
+
+
+def reconstruir_costos_mensuales(db, dry_run: bool = False) -> int:
+    """Regenera CostosMensuales desde cero ($out reemplaza la colección conservando sus índices)."""
+    pipeline = pipeline_costos_mensuales()
+
+    if dry_run:
+        filas = list(db["Mantenimiento"].aggregate(pipeline + [{"$count": "total"}]))
+        total = filas[0]["total"] if filas else 0
+        logger.info(f"[DRY] Se generarían {total} filas en {COLECCION_COSTOS_MENSUALES}.")
+        return total
+
+    # Los índices de CostosMensuales los declara dependencies.INDICES_REQUERIDOS
+    db["Mantenimiento"].aggregate(pipeline + [{"$out": COLECCION_COSTOS_MENSUALES}])
+
+    total = db[COLECCION_COSTOS_MENSUALES].count_documents({})
+    logger.info(f"{COLECCION_COSTOS_MENSUALES} reconstruida: {total} filas.")
+    return total
+
+
+def main(dry_run: bool):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    load_dotenv()
+    mongo_uri = os.getenv("MONGO_URI")
+    if not mongo_uri:
+        raise RuntimeError("Falta MONGO_URI en las variables de entorno")
+
+    client = MongoClient(mongo_uri)
+    try:
+        db = client[os.getenv("DB_NAME", "MacSeguridadFlota")]
+        reconstruir_costos_mensuales(db, dry_run)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconstruye el rollup CostosMensuales desde Mantenimiento y Finanzas.")
+    parser.add_argument("--dry-run", action="store_true", help="Solo cuenta cuántas filas se generarían.")
+    args = parser.parse_args()
+    main(args.dry_run)
@@ -1,20 +1,31 @@
 from __future__ import annotations
-from pymongo import MongoClient
-from pydantic import BaseModel, Field, ConfigDict, Field, field_validator
-from typing import List, Optional, Any, Dict, Iterable
+from pymongo import MongoClient, IndexModel, UpdateOne, ReplaceOne
+from pydantic import BaseModel, Field, ConfigDict, field_validator
+from typing import List, Optional, Any, Dict, Iterable, AsyncIterator, Awaitable, Callable
 from datetime import datetime, date # Importado 'date'
 import math
 from dateutil.parser import parse, ParserError
-from fastapi import HTTPException
+from fastapi import HTTPException, Request, Response
 from bson.objectid import ObjectId
 import re # Necesario para normalize_patente
 import os
+import json
+import base64
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
-from typing import Optional
 
 from motor.motor_asyncio import AsyncIOMotorGridFSBucket
-from fastapi import HTTPException
+from alertas_vencimiento import COLECCION_ALERTAS, pipeline_materializar_alertas
+from esquema_vehiculos import VERSION_ESQUEMA_VEHICULO, filtro_pendientes
+from fechas_costos import COLECCIONES_COSTOS
+from clasificacion_costos import clasificar
+from costos_mensuales import COLECCION_COSTOS_MENSUALES, fila_costo, incremento_costo_mensual, pipeline_costos_mensuales
+from libro_costos import COLECCION_COSTOS, FILTRO_LIBRO_COMPLETO, asiento_costo, id_asiento
+from versiones import COLECCION_METADATOS, INCREMENTO_VERSION, filtro_version
+import hashlib
+import heapq
+import asyncio
+from fastapi.responses import StreamingResponse
 
 load_dotenv()
 
@@ -46,6 +57,12 @@ async def connect_to_mongodb():
             raise
     return _client
 
+def get_mongo_client() -> AsyncIOMotorClient:
+    """Cliente Motor conectado (para sesiones / transacciones)."""
+    if _client is None:
+        raise HTTPException(status_code=500, detail="Conexión a MongoDB no establecida. Intente más tarde.")
+    return _client
+
 def get_db_collection(collection_name: str):
     """Función que usan todos tus routers"""
     if _client is None:
@@ -118,6 +135,343 @@ async def get_gridfs_bucket() -> AsyncIOMotorGridFSBucket:
     db = _client[DB_NAME]
     return AsyncIOMotorGridFSBucket(db)
 
+# =================================================================
+# REGISTRO DECLARATIVO DE ÍNDICES
+# =================================================================
+# Cada entrada respalda una forma de consulta concreta de los routers. Se aplica de forma
+# idempotente en el startup (asegurar_indices) y verificar_indices.py reporta faltantes,
+# redundantes y sin uso. Los nombres los asigna MongoDB (ej: "patente_1_fecha_1").
+INDICES_REQUERIDOS: Dict[str, List[Dict[str, Any]]] = {
+    "Vehiculos": [
+        {"keys": [("search_tokens", 1)]},            # GET /vehiculos?filtro= (multikey)
+        {"keys": [("schema_version", 1)]},          # migración reanudable del esquema canónico
+    ],
+    "Documentacion": [
+        {"keys": [("patente", 1), ("tipo_documento", 1)]},           # PUT/GET /documentacion, alertas por patente
+        {"keys": [("tipo_documento", 1), ("fecha_vencimiento", 1)]},  # materialización de alertas
+    ],
+    "Mantenimiento": [
+        {"keys": [("patente", 1), ("fecha_evento", 1)]},  # reporte por vehículo, costos unificados
+        {"keys": [("fecha_evento", 1)]},             # reporte de flota por período, exportación
+        {"keys": [("patente", 1), ("categoria", 1)]},  # costos de un vehículo por categoría
+    ],
+    "Finanzas": [
+        {"keys": [("patente", 1), ("fecha_evento", 1)]},  # reporte por vehículo, costos unificados
+        {"keys": [("fecha_evento", 1)]},             # reporte de flota por período, exportación
+        {"keys": [("patente", 1), ("categoria", 1)]},  # multas de un vehículo, costos por categoría
+    ],
+    "polizas_seguros": [
+        {"keys": [("numero_poliza", 1)]},            # chequeo de duplicados al agregar póliza
+        {"keys": [("fecha_subida", -1)]},            # listado ordenado
+    ],
+    "fs.files": [
+        {"keys": [("metadata.patente", 1)]},         # archivos GridFS de un vehículo
+    ],
+    COLECCION_ALERTAS: [
+        {"keys": [("fecha_vencimiento", 1)]},                    # /alertas/criticas, dashboard
+        {"keys": [("patente", 1), ("fecha_vencimiento", 1)]},    # alertas de un vehículo
+    ],
+    COLECCION_COSTOS: [
+        {"keys": [("patente", 1), ("fecha", 1)]},    # reportes por vehículo
+        {"keys": [("fecha", 1)]},                     # reportes de flota por período
+        {"keys": [("origen", 1), ("fuente_id", 1)]},  # asiento de un documento de origen
+    ],
+    COLECCION_COSTOS_MENSUALES: [
+        {"keys": [("mes", 1)]},                      # totales de flota por período (dashboard)
+        {"keys": [("patente", 1), ("mes", 1)]},      # tendencia mensual de un vehículo
+    ],
+}
+
+async def asegurar_indices() -> None:
+    """Crea los índices de INDICES_REQUERIDOS (idempotente). Un fallo se informa pero no frena el arranque."""
+    db = _client[DB_NAME]
+    for collection_name, indices in INDICES_REQUERIDOS.items():
+        modelos = [IndexModel(indice["keys"], **indice.get("options", {})) for indice in indices]
+        try:
+            await db[collection_name].create_indexes(modelos)
+        except Exception as e:
+            print(f"⚠️ No se pudieron asegurar los índices de {collection_name}: {e}")
+
+async def verificar_esquema_vehiculos() -> None:
+    """Avisa si quedan vehículos sin migrar al esquema canónico (python esquema_vehiculos.py)."""
+    try:
+        pendientes = await _client[DB_NAME]["Vehiculos"].count_documents(filtro_pendientes())
+    except Exception as e:
+        print(f"⚠️ No se pudo verificar schema_version de Vehiculos: {e}")
+        return
+    if pendientes:
+        print(f"⚠️ {pendientes} vehículos sin schema_version {VERSION_ESQUEMA_VEHICULO}: ejecutar 'python esquema_vehiculos.py'")
+
+async def verificar_fechas_costos() -> None:
+    """Avisa si hay costos sin fecha_evento: el reporte por vehículo no los ve (python fechas_costos.py)."""
+    for coleccion in COLECCIONES_COSTOS:
+        try:
+            pendientes = await _client[DB_NAME][coleccion].count_documents({"fecha_evento": {"$exists": False}})
+        except Exception as e:
+            print(f"⚠️ No se pudo verificar fecha_evento de {coleccion}: {e}")
+            continue
+        if pendientes:
+            print(f"⚠️ {pendientes} documentos de {coleccion} sin fecha_evento: ejecutar 'python fechas_costos.py'")
+
+async def verificar_clasificacion_costos() -> None:
+    """Avisa si hay costos sin categoria: los reportes los cuentan como "Otros" (python clasificacion_costos.py)."""
+    for coleccion in COLECCIONES_COSTOS:
+        try:
+            pendientes = await _client[DB_NAME][coleccion].count_documents({"categoria": {"$exists": False}})
+        except Exception as e:
+            print(f"⚠️ No se pudo verificar la clasificación de {coleccion}: {e}")
+            continue
+        if pendientes:
+            print(f"⚠️ {pendientes} documentos de {coleccion} sin clasificar: ejecutar 'python clasificacion_costos.py'")
+
+async def libro_costos_completo() -> bool:
+    """True si el libro Costos tiene todos los costos (backfill o reconstrucción terminados): los reportes lo leen."""
+    doc = await get_db_collection(COLECCION_METADATOS).find_one(FILTRO_LIBRO_COMPLETO)
+    return bool(doc and doc.get("completo"))
+
+async def verificar_libro_costos() -> None:
+    """Avisa si el libro Costos no está completo: los reportes de flota leen Mantenimiento + Finanzas (python libro_costos.py)."""
+    try:
+        completo = await libro_costos_completo()
+    except Exception as e:
+        print(f"⚠️ No se pudo verificar el libro {COLECCION_COSTOS}: {e}")
+        return
+    if not completo:
+        print(f"⚠️ El libro {COLECCION_COSTOS} no está completo: ejecutar 'python libro_costos.py'")
+
+# =================================================================
+# VERSIONES POR COLECCIÓN Y RESPUESTAS CONDICIONALES (ETag / If-None-Match)
+# =================================================================
+async def incrementar_version(coleccion: str) -> None:
+    """Llamar después de cada escritura sobre una colección cuyos GET exponen ETag."""
+    await get_db_collection(COLECCION_METADATOS).update_one(filtro_version(coleccion), INCREMENTO_VERSION, upsert=True)
+
+async def version_coleccion(coleccion: str) -> int:
+    doc = await get_db_collection(COLECCION_METADATOS).find_one(filtro_version(coleccion))
+    return doc.get("version", 0) if doc else 0
+
+def etag_para(coleccion: str, version: int, *partes: Any) -> str:
+    """ETag fuerte: versión de la colección + lo que distingue la respuesta (patente, query string)."""
+    clave = json.dumps([coleccion, version, *partes], default=str)
+    return '"' + hashlib.sha1(clave.encode("utf-8")).hexdigest()[:24] + '"'
+
+def responder_si_no_modificado(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Si If-None-Match coincide devuelve un 304 sin cuerpo (el endpoint no arma el payload).
+    Si no, deja ETag y Cache-Control: no-cache en la respuesta para que el navegador revalide.
+    """
+    cabeceras = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidatos = {e.strip().removeprefix("W/") for e in if_none_match.split(",")}
+        if etag in candidatos or "*" in candidatos:
+            return Response(status_code=304, headers=cabeceras)
+    response.headers.update(cabeceras)
+    return None
+
+# =================================================================
+# CURSORES OPACOS PARA PAGINACIÓN POR CLAVE (KEYSET)
+# =================================================================
+def codificar_cursor(valores: List[Any]) -> str:
+    """Serializa los valores de la clave de orden del último ítem como un cursor opaco (base64 url-safe)."""
+    return base64.urlsafe_b64encode(json.dumps(valores, default=str).encode("utf-8")).decode("ascii")
+
+def decodificar_cursor(cursor: str, largo: int) -> List[Any]:
+    """Inversa de codificar_cursor. Un cursor mal formado es un error del cliente (400)."""
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor de paginación inválido.")
+    if not isinstance(valores, list) or len(valores) != largo:
+        raise HTTPException(status_code=400, detail="Cursor de paginación inválido.")
+    return valores
+
+# =================================================================
+# RESPUESTAS NDJSON EN STREAMING (historiales largos de costos)
+# =================================================================
+MEDIA_NDJSON = "application/x-ndjson"
+
+def pide_ndjson(request: Request, stream: bool = False) -> bool:
+    """El cliente pidió streaming con ?stream=1 o con Accept: application/x-ndjson."""
+    return stream or MEDIA_NDJSON in request.headers.get("accept", "")
+
+def linea_ndjson(registro: Dict[str, Any]) -> bytes:
+    return (json.dumps(registro, default=str, ensure_ascii=False) + "\n").encode("utf-8")
+
+def respuesta_ndjson(lineas: AsyncIterator[bytes]) -> StreamingResponse:
+    """Envía cada línea apenas se genera: memoria constante y primer byte sin esperar al total."""
+    return StreamingResponse(lineas, media_type=MEDIA_NDJSON, headers={"Cache-Control": "no-cache"})
+
+class _Descendente:
+    """Invierte la comparación de una clave para que heapq entregue primero el mayor."""
+    __slots__ = ("valor",)
+
+    def __init__(self, valor: Any):
+        self.valor = valor
+
+    def __lt__(self, otro: "_Descendente") -> bool:
+        return otro.valor < self.valor
+
+async def fusionar_ordenados(
+    flujos: List[AsyncIterator[Dict[str, Any]]], clave: Callable[[Dict[str, Any]], Any], descendente: bool = False
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    heapq.merge para cursores async ya ordenados por `clave`: en memoria solo hay una fila por cursor.
+    Reemplaza $unionWith + $sort en los streams, donde el $sort junta todas las filas antes de la primera.
+    """
+    heap = []
+    for orden, flujo in enumerate(aiter(f) for f in flujos):
+        fila = await anext(flujo, None)
+        if fila is not None:
+            heap.append(((_Descendente(clave(fila)) if descendente else clave(fila)), orden, fila, flujo))
+    heapq.heapify(heap)
+    while heap:
+        _, orden, fila, flujo = heap[0]
+        yield fila
+        siguiente = await anext(flujo, None)
+        if siguiente is None:
+            heapq.heappop(heap)
+        else:
+            valor = clave(siguiente)
+            heapq.heapreplace(heap, ((_Descendente(valor) if descendente else valor), orden, siguiente, flujo))
+
+# =================================================================
+# SUB-CONSULTAS EN PARALELO (endpoints compuestos: dashboard, reportes)
+# =================================================================
+MAX_CONSULTAS_PARALELAS = 4  # por request: no acaparar el pool de conexiones de Motor
+
+async def en_paralelo(ramas: Dict[str, Awaitable[Any]], limite: int = MAX_CONSULTAS_PARALELAS) -> Dict[str, Any]:
+    """
+    Ejecuta sub-consultas independientes a la vez (como mucho `limite` simultáneas).
+    Cada rama devuelve su resultado o la excepción que lanzó: un fallo no cancela a las demás y
+    quien llama decide si la rama es obligatoria (re-lanza) u opcional (usa un valor por defecto).
+    """
+    semaforo = asyncio.Semaphore(limite)
+
+    async def _rama(nombre: str, consulta: Awaitable[Any]) -> Any:
+        async with semaforo:
+            try:
+                return await consulta
+            except Exception as e:
+                if not isinstance(e, HTTPException):
+                    print(f"⚠️ Sub-consulta '{nombre}' falló: {e}")
+                return e
+
+    resultados = await asyncio.gather(*(_rama(nombre, consulta) for nombre, consulta in ramas.items()))
+    return dict(zip(ramas, resultados))
+
+def resultado_rama(resultados: Dict[str, Any], nombre: str, *defecto: Any) -> Any:
+    """Resultado de una rama de en_paralelo. Sin `defecto` la rama es obligatoria y su error se re-lanza."""
+    valor = resultados[nombre]
+    if isinstance(valor, Exception):
+        if not defecto:
+            raise valor
+        return defecto[0]
+    return valor
+
+# =================================================================
+# MANTENIMIENTO INCREMENTAL DE AlertasVencimiento
+# =================================================================
+async def refrescar_alertas_vencimiento(patente: str) -> None:
+    """
+    Recalcula las filas de AlertasVencimiento de UNA patente tras escribir un vencimiento.
+    Se llama desde todos los endpoints que modifican fechas de vencimiento (o datos del vehículo
+    que se copian en la alerta). Las filas que ya no correspondan se eliminan por marca de tiempo.
+    """
+    marca = datetime.utcnow()
+    pipeline = pipeline_materializar_alertas(patente, actualizado_en=marca)
+    pipeline.append({
+        "$merge": {"into": COLECCION_ALERTAS, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}
+    })
+
+    await get_db_collection("Documentacion").aggregate(pipeline).to_list(length=None)
+    await get_db_collection(COLECCION_ALERTAS).delete_many({"patente": patente, "actualizado_en": {"$lt": marca}})
+
+# =================================================================
+# MANTENIMIENTO INCREMENTAL DE CostosMensuales
+# =================================================================
+async def acumular_costos_mensuales(
+    origen: str, antes: Optional[Dict[str, Any]] = None, despues: Optional[Dict[str, Any]] = None
+) -> None:
+    """
+    Aplica al rollup una escritura de costos: resta el documento `antes` y suma `despues`
+    (alta: solo despues; baja: solo antes; edición: ambos). La llama registrar_escritura_costo.
+    """
+    incrementos = [
+        incremento_costo_mensual(fila, signo)
+        for fila, signo in ((fila_costo(antes, origen) if antes else None, -1), (fila_costo(despues, origen) if despues else None, 1))
+        if fila
+    ]
+    if not incrementos:
+        return
+    rollup = get_db_collection(COLECCION_COSTOS_MENSUALES)
+    await rollup.bulk_write([UpdateOne(inc["filtro"], inc["update"], upsert=True) for inc in incrementos], ordered=True)
+    # Filas que quedaron sin documentos (baja o cambio de mes/categoría)
+    await rollup.delete_many({"_id": {"$in": [inc["filtro"]["_id"] for inc in incrementos]}, "cantidad": {"$lte": 0}})
+
+# =================================================================
+# ESCRITURAS DE COSTOS: libro Costos + rollup CostosMensuales
+# =================================================================
+async def registrar_escritura_costo(
+    origen: str, antes: Optional[Dict[str, Any]] = None, despues: Optional[Dict[str, Any]] = None
+) -> None:
+    """
+    Propaga una escritura sobre Mantenimiento / Finanzas: clasificación del documento
+    (clasificacion_costos.py), asiento del libro Costos (reemplazo o baja) y rollup CostosMensuales.
+    Llamar después de escribir el origen, con el documento anterior (edición / baja) y el nuevo (alta / edición).
+    """
+    libro = get_db_collection(COLECCION_COSTOS)
+    if despues:
+        # Clasificación guardada en el documento: las altas ya la traen, las ediciones con $set parcial
+        # se reclasifican acá sobre el documento resultante (una escritura solo si cambió)
+        clasificacion = clasificar(despues, origen)
+        if any(campo not in despues or despues[campo] != valor for campo, valor in clasificacion.items()):
+            await get_db_collection(origen).update_one({"_id": despues["_id"]}, {"$set": clasificacion})
+            despues = {**despues, **clasificacion}
+        asiento = asiento_costo(despues, origen)
+        escritura_libro = libro.replace_one({"_id": asiento["_id"]}, asiento, upsert=True)
+    else:
+        escritura_libro = libro.delete_one({"_id": id_asiento(origen, antes["_id"])})
+    await asyncio.gather(escritura_libro, acumular_costos_mensuales(origen, antes, despues))
+
+async def registrar_altas_costos(origen: str, docs: List[Dict[str, Any]]) -> None:
+    """
+    Alta masiva (POST /costos/manual/batch): asientos del libro y rollup de todos los documentos con
+    un bulk_write por colección derivada. Los documentos ya vienen clasificados e insertados (con _id).
+    """
+    asientos = [asiento_costo(doc, origen) for doc in docs]
+    incrementos = [incremento_costo_mensual(fila, 1) for fila in (fila_costo(doc, origen) for doc in docs) if fila]
+    escrituras = [get_db_collection(COLECCION_COSTOS).bulk_write(
+        [ReplaceOne({"_id": asiento["_id"]}, asiento, upsert=True) for asiento in asientos], ordered=False
+    )]
+    if incrementos:
+        # ordered: varias filas del lote pueden caer en la misma fila del rollup (mismo upsert)
+        escrituras.append(get_db_collection(COLECCION_COSTOS_MENSUALES).bulk_write(
+            [UpdateOne(inc["filtro"], inc["update"], upsert=True) for inc in incrementos], ordered=True
+        ))
+    await asyncio.gather(*escrituras)
+
+async def registrar_borrado_masivo_costos(origen: str, filtro: Dict[str, Any]) -> None:
+    """Baja en las colecciones derivadas de los documentos que cumplen `filtro` (llamar antes del delete_many)."""
+    ids = await get_db_collection(origen).distinct("_id", filtro)
+    await asyncio.gather(
+        get_db_collection(COLECCION_COSTOS).delete_many({"_id": {"$in": [id_asiento(origen, i) for i in ids]}}),
+        descontar_costos_mensuales(origen, filtro),
+    )
+
+async def descontar_costos_mensuales(origen: str, filtro: Dict[str, Any]) -> None:
+    """Resta del rollup los documentos que cumplen `filtro` (llamar antes de un delete_many)."""
+    filas = await get_db_collection(origen).aggregate(pipeline_costos_mensuales(filtro, origen)).to_list(length=None)
+    if not filas:
+        return
+    rollup = get_db_collection(COLECCION_COSTOS_MENSUALES)
+    await rollup.bulk_write([
+        UpdateOne({"_id": fila["_id"]}, {"$inc": {
+            "total": -fila["total"], "total_infracciones": -fila["total_infracciones"], "cantidad": -fila["cantidad"]
+        }}) for fila in filas
+    ], ordered=False)
+    await rollup.delete_many({"_id": {"$in": [fila["_id"] for fila in filas]}, "cantidad": {"$lte": 0}})
+
 # =========================================================================
 # 2. MODELOS DE DATOS (PYDANTIC)
 # =========================================================================
@@ -128,6 +482,7 @@ class DatoAgregado(BaseModel):
     """Estructura para datos resumidos en reportes (ej: Costos por Categoría)."""
     categoria: str
     total: float
+    grupo: Optional[str] = Field(None, description="Valor de la dimensión de agrupación (patente, área o responsable), si se pidió.")
 
 # --- MODELOS DE RESPUESTA PARA ENDPOINTS ESPECÍFICOS ---
 
@@ -142,11 +497,45 @@ class ReportePeriodoResponse(BaseModel):
     
     model_config = BASE_CONFIG_WITH_NUMERIC_FIX
 
+class ReporteComparativoInput(BaseModel):
+    """Body de POST /reportes/comparativo: patentes a comparar y período."""
+    patentes: List[str] = Field(..., min_length=1, max_length=500, description="Patentes a comparar (se normalizan y deduplican).")
+    desde: date = Field(..., description="Fecha de inicio del periodo (YYYY-MM-DD).")
+    hasta: date = Field(..., description="Fecha de fin del periodo (YYYY-MM-DD).")
+
+    @field_validator('patentes')
+    @classmethod
+    def normalizar_patentes(cls, v: List[str]) -> List[str]:
+        normalizadas = list(dict.fromkeys(p for p in (normalize_patente(x) for x in v) if p))
+        if not normalizadas:
+            raise ValueError("Debe indicar al menos una patente válida.")
+        return normalizadas
+
+class ComparativoVehiculo(BaseModel):
+    """Totales de un vehículo dentro del reporte comparativo."""
+    patente: str
+    total_general: float
+    total_mantenimiento: float
+    total_infracciones: float
+    por_categoria: List[DatoAgregado] = Field(..., description="Totales del vehículo por categoría.")
+
+class ReporteComparativoResponse(BaseModel):
+    """Modelo de respuesta del reporte comparativo entre vehículos."""
+    fecha_inicio: str
+    fecha_fin: str
+    vehiculos: List[ComparativoVehiculo] = Field(..., description="Un ítem por patente pedida, en el mismo orden.")
+    no_encontradas: List[str] = Field(default_factory=list, description="Patentes pedidas que no existen en la flota.")
+
+    model_config = BASE_CONFIG_WITH_NUMERIC_FIX
+
 class DashboardResponse(BaseModel):
     """Modelo de respuesta para el resumen de datos clave del Dashboard."""
     total_vehiculos: int = Field(..., description="Cantidad total de vehículos en la flota.")
     vehiculos_activos: int = Field(..., description="Cantidad de vehículos marcados como activos.")
     ultimas_alertas: List[Alerta] = Field(..., description="Las 5 alertas de vencimiento más críticas.")
+    total_mantenimiento: float = Field(0.0, description="Costos de mantenimiento del último año (rollup mensual).")
+    total_infracciones: float = Field(0.0, description="Multas del último año (rollup mensual).")
+    total_general: float = Field(0.0, description="Mantenimiento + infracciones del último año.")
     
     model_config = BASE_CONFIG_WITH_NUMERIC_FIX
     
@@ -168,7 +557,10 @@ class ReporteCostosResponse(BaseModel):
     total_costos_mantenimiento: float = Field(..., alias="total_mantenimiento")
     total_costos_infracciones: float = Field(..., alias="total_infracciones")
     total_general: float
-    detalles: List[CostoItem]
+    cantidad_registros: int = Field(0, description="Filas del período (todas las páginas).")
+    detalles: List[CostoItem] = Field(..., description="Página del detalle, más reciente primero.")
+    next_cursor: Optional[str] = Field(None, description="Cursor de la página siguiente (None = última página).")
+    alertas: List[Alerta] = Field([], description="Vencimientos críticos del vehículo (vacío si no se pudieron calcular).")
     # 🔑 NUEVO CAMPO AGREGADO
     documentos_digitales: Optional[List[DocumentoDigital]] = Field(None, description="Lista de documentos digitales asociados al vehículo.")
     
@@ -486,6 +878,12 @@ class CostoManualInput(BaseModel):
         """Redondea el importe a 2 decimales para consistencia financiera."""
         return round(v, 2)
 
+class CostoManualLoteItem(CostoManualInput):
+    """Fila de POST /costos/manual/batch: un CostoManualInput más el comprobante que le corresponde."""
+    comprobante_index: Optional[int] = Field(
+        None, ge=0, description="Posición del archivo en 'comprobantes' (solo multipart). Varias filas pueden compartirlo."
+    )
+
 class CostoManualDelete(BaseModel):
     """
     Define el input requerido para eliminar un costo manual.
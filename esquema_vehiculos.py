@@ -0,0 +1,204 @@
+# esquema_vehiculos.py
+# Esquema canónico de la colección Vehiculos.
+# Históricamente el ETL escribía claves en minúsculas (nro_movil, anio...) y la API en MAYÚSCULAS
+# (NRO_MOVIL, ANIO...), y cada lectura resolvía cadenas "X or x". El esquema canónico usa solo los
+# nombres en minúsculas (los mismos de la API) y marca cada documento migrado con `schema_version`.
+# vehiculo_desde_doc es el único mapper de lectura: camino directo para documentos migrados y
+# canonicalización en memoria para los que todavía no lo están.
+# Uso: python esquema_vehiculos.py [--dry-run] [--lote 500]   (migración reanudable)
+
+import os
+import math
+import logging
+import argparse
+from typing import Any, Dict, List, Optional
+
+from pymongo import MongoClient, UpdateOne
+from dotenv import load_dotenv
+
+from busqueda_vehiculos import campos_busqueda
+from versiones import COLECCION_METADATOS, INCREMENTO_VERSION, filtro_version
+
+logger = logging.getLogger(__name__)
+
+VERSION_ESQUEMA_VEHICULO = 1
+
+# Contador de versión de Vehiculos (versiones.py): la migración lo incrementa al terminar
+FILTRO_VERSION_VEHICULOS = filtro_version("Vehiculos")
+
+# Campo canónico → claves legadas que lo alimentaban (la legada gana si tiene valor: son ediciones de la API)
+CAMPOS_LEGADOS: Dict[str, tuple] = {
+    "nro_movil": ("NRO_MOVIL",),
+    "anio": ("ANIO",),
+    "color": ("COLOR",),
+    "marca": ("MARCA",),
+    "modelo": ("MODELO",),
+    "tipo": ("TIPO",),
+    "descripcion_modelo": ("DESCRIPCION_MODELO",),
+    "tipo_combustible": ("TIPO_COMBUSTIBLE",),
+    "medidas_cubiertas": ("MEDIDAS_CUBIERTAS",),
+    "ubicacion": ("UBICACION",),
+    "area": ("AREA",),
+    "responsable": ("RESPONSABLE",),
+    "documentacion": ("DOCUMENTACION",),
+    "costo_adquisicion": ("COSTO_ADQUISICION",),
+}
+
+# Revisión del documento: cada escritura de la API sobre un vehículo la incrementa y la migración solo
+# aplica su UpdateOne si sigue siendo la revisión que leyó (schema_version no sirve: la API no lo toca).
+CAMPO_REVISION = "revision"
+INCREMENTO_REVISION = {CAMPO_REVISION: 1}  # para $inc
+ETAPA_INCREMENTO_REVISION = {"$set": {CAMPO_REVISION: {"$add": [{"$ifNull": [f"${CAMPO_REVISION}", 0]}, 1]}}}  # updates con pipeline
+
+# Campos canónicos sin variante legada
+CAMPOS_SIMPLES = ("patente_original", "activo", "clave_radio", "documentos_digitales")
+
+# Campos de la respuesta Vehiculo (además de patente = _id)
+CAMPOS_API = tuple(CAMPOS_LEGADOS) + CAMPOS_SIMPLES
+
+
+def _vacio(valor: Any) -> bool:
+    return valor is None or (isinstance(valor, float) and math.isnan(valor)) or (isinstance(valor, str) and not valor.strip())
+
+
+def _normalizar_valor(campo: str, valor: Any) -> Any:
+    """Tipos canónicos: nro_movil texto sin '.0', anio entero, textos sin espacios sobrantes, NaN → None."""
+    if _vacio(valor):
+        return None
+    if campo == "nro_movil":
+        if isinstance(valor, float) and valor.is_integer():
+            valor = int(valor)
+        return str(valor).strip()
+    if campo == "anio":
+        try:
+            return int(float(valor))
+        except (TypeError, ValueError):
+            return None
+    if isinstance(valor, str):
+        return valor.strip()
+    return valor
+
+
+def valor_canonico(doc: Dict[str, Any], campo: str) -> Any:
+    """Valor canónico de un campo leyendo las claves legadas y la canónica, en ese orden."""
+    for clave in CAMPOS_LEGADOS.get(campo, ()) + (campo,):
+        valor = _normalizar_valor(campo, doc.get(clave))
+        if valor is not None:
+            return valor
+    return None
+
+
+def canonicalizar_vehiculo(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Documento de Vehiculos con solo los campos canónicos (conserva el resto de claves no legadas).
+    Los campos sin valor se omiten en lugar de guardarse como null.
+    """
+    legadas = {clave for claves in CAMPOS_LEGADOS.values() for clave in claves}
+    canonico = {clave: valor for clave, valor in doc.items() if clave not in legadas}
+    for campo in CAMPOS_LEGADOS:
+        valor = valor_canonico(doc, campo)
+        if valor is None:
+            canonico.pop(campo, None)
+        else:
+            canonico[campo] = valor
+    canonico["schema_version"] = VERSION_ESQUEMA_VEHICULO
+    return canonico
+
+
+def claves_legadas(campos: List[str]) -> List[str]:
+    """Claves legadas a eliminar cuando se escriben estos campos canónicos (PATCH parcial)."""
+    return [clave for campo in campos for clave in CAMPOS_LEGADOS.get(campo, ())]
+
+
+def vehiculo_desde_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Único mapper de lectura: documento de Vehiculos → datos del modelo Vehiculo."""
+    if doc.get("schema_version", 0) < VERSION_ESQUEMA_VEHICULO:
+        doc = canonicalizar_vehiculo(doc)
+
+    datos = {campo: doc.get(campo) for campo in CAMPOS_API}
+    datos["patente"] = doc.get("_id")
+    datos["activo"] = bool(doc.get("activo", True))
+    datos["modelo"] = doc.get("modelo") or doc.get("descripcion_modelo")
+    datos["documentos_digitales"] = doc.get("documentos_digitales") or []
+    return datos
+
+
+def filtro_pendientes() -> Dict[str, Any]:
+    """Vehículos sin migrar a la versión actual (incluye los que no tienen schema_version)."""
+    return {"schema_version": {"$not": {"$gte": VERSION_ESQUEMA_VEHICULO}}}
+
+
+def operacion_migrar(doc: Dict[str, Any]) -> UpdateOne:
+    """
+    UpdateOne que deja el documento en el esquema canónico y recalcula search_tokens.
+    El filtro incluye la revisión leída: si la API lo modificó después de la lectura, el UpdateOne no
+    coincide y el vehículo queda pendiente para la próxima corrida (no se pisa la edición).
+    """
+    canonico = canonicalizar_vehiculo(doc)
+    canonico.update(campos_busqueda(canonico))
+    canonico.pop("_id")
+    canonico.pop(CAMPO_REVISION, None)
+    # Claves legadas y canónicas que quedaron sin valor (NaN, "") se eliminan
+    sobrantes = [clave for clave in claves_legadas(list(CAMPOS_LEGADOS)) + list(CAMPOS_LEGADOS)
+                 if clave in doc and clave not in canonico]
+    update: Dict[str, Any] = {"$set": canonico, "$inc": INCREMENTO_REVISION}
+    if sobrantes:
+        update["$unset"] = {clave: "" for clave in sobrantes}
+    # Sin revisión (nunca editado por la API) el filtro {revision: None} coincide con el campo ausente
+    return UpdateOne({"_id": doc["_id"], CAMPO_REVISION: doc.get(CAMPO_REVISION)}, update)
+
+
+def migrar_vehiculos(db, dry_run: bool = False, lote: int = 500) -> int:
+    """
+    Migra Vehiculos por lotes ordenados por _id. Cada lote se confirma con un bulk_write, así que
+    una ejecución interrumpida se retoma volviendo a correrla (solo toma los pendientes, incluidos
+    los que la API editó durante la corrida).
+    """
+    collection = db["Vehiculos"]
+    pendientes = collection.count_documents(filtro_pendientes())
+    if not pendientes:
+        logger.info(f"Vehiculos ya está en schema_version {VERSION_ESQUEMA_VEHICULO}.")
+        return 0
+    if dry_run:
+        logger.info(f"[DRY] {pendientes} vehículos a migrar a schema_version {VERSION_ESQUEMA_VEHICULO}.")
+        return pendientes
+
+    migrados = 0
+    ultimo_id: Optional[Any] = None
+    while True:
+        filtro = filtro_pendientes()
+        if ultimo_id is not None:
+            filtro["_id"] = {"$gt": ultimo_id}
+        docs = list(collection.find(filtro).sort("_id", 1).limit(lote))
+        if not docs:
+            break
+        result = collection.bulk_write([operacion_migrar(doc) for doc in docs], ordered=False)
+        migrados += result.modified_count
+        ultimo_id = docs[-1]["_id"]
+        logger.info(f"Migrados {migrados}/{pendientes} vehículos (último: {ultimo_id}).")
+
+    db[COLECCION_METADATOS].update_one(FILTRO_VERSION_VEHICULOS, INCREMENTO_VERSION, upsert=True)
+    logger.info(f"Migración completada: {migrados} vehículos en schema_version {VERSION_ESQUEMA_VEHICULO}.")
+    return migrados
+
+
+def main(dry_run: bool, lote: int):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    load_dotenv()
+    mongo_uri = os.getenv("MONGO_URI")
+    if not mongo_uri:
+        raise RuntimeError("Falta MONGO_URI en las variables de entorno")
+
+    client = MongoClient(mongo_uri)
+    try:
+        migrar_vehiculos(client[os.getenv("DB_NAME", "MacSeguridadFlota")], dry_run, lote)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migra la colección Vehiculos al esquema canónico (schema_version).")
+    parser.add_argument("--dry-run", action="store_true", help="Solo cuenta cuántos vehículos se migrarían.")
+    parser.add_argument("--lote", type=int, default=500, help="Vehículos por bulk_write (default: 500).")
+    args = parser.parse_args()
+    main(args.dry_run, args.lote)
@@ -10,6 +10,14 @@ import uuid
 from dateutil.parser import parse, ParserError 
 from pandas.api.types import is_datetime64_any_dtype as is_datetime
 from datetime import datetime, timedelta
+from alertas_vencimiento import COLECCION_ALERTAS, reconstruir_alertas_vencimiento
+from busqueda_vehiculos import campos_busqueda
+from esquema_vehiculos import VERSION_ESQUEMA_VEHICULO, CAMPOS_LEGADOS, valor_canonico
+from fechas_costos import COLECCIONES_COSTOS, fecha_evento
+from clasificacion_costos import clasificar
+from costos_mensuales import COLECCION_COSTOS_MENSUALES, reconstruir_costos_mensuales
+from libro_costos import COLECCION_COSTOS, marcar_libro_completo, reconstruir_libro_costos
+from versiones import COLECCION_METADATOS, INCREMENTO_VERSION, filtro_version
 
 # [CORRECCIÓN INICIAL] Configuración para silenciar el FutureWarning de downcasting en Pandas
 pd.set_option('future.no_silent_downcasting', True)
@@ -881,6 +889,11 @@ def load_data_to_mongodb(data: Dict[str, List[Dict[str, Any]]]):
         
         from pymongo import UpdateOne 
 
+        # Mientras se recargan Mantenimiento y Finanzas el libro Costos queda atrasado: los reportes
+        # vuelven a leer las colecciones de origen hasta que reconstruir_libro_costos lo marque completo.
+        if any(data.get(coleccion) for coleccion in COLECCIONES_COSTOS):
+            marcar_libro_completo(db, False)
+
         for collection_name, records in data.items():
             if not records:
            
@@ -893,10 +906,17 @@ def load_data_to_mongodb(data: Dict[str, List[Dict[str, Any]]]):
                 print(f"\n⚙️ Procesando colección '{collection_name}' ({len(records)} registros)...")
          
         
+                # Tipos del esquema canónico (nro_movil texto, anio entero) y campo de búsqueda indexado
+                for record in records:
+                    record.update({campo: valor_canonico(record, campo) for campo in CAMPOS_LEGADOS if campo in record})
+                    record.update(campos_busqueda(record))
+
+                # schema_version solo en altas: un vehículo existente puede conservar claves legadas
+                # que migra esquema_vehiculos.py
                 updates = [
                     (
                         {'_id': record['_id']}, 
-                        {'$set': record},    
+                        {'$set': record, '$setOnInsert': {'schema_version': VERSION_ESQUEMA_VEHICULO}},    
     
                         True                    
                     ) for record in records if '_id' in record
@@ -915,11 +935,35 @@ def load_data_to_mongodb(data: Dict[str, List[Dict[str, Any]]]):
               
                     print(f"⚠️ Colección '{collection_name}' sin registros válidos para actualización.")
             else:
-                # El resto de colecciones se borran y se vuelven a insertar.
-                collection.drop() 
+                # Costos: fecha normalizada para los filtros por rango y clasificación (categoria / excluido)
+                if collection_name in COLECCIONES_COSTOS:
+                    for record in records:
+                        record['fecha_evento'] = fecha_evento(record)
+                        record.update(clasificar(record, collection_name))
+
+                # El resto de colecciones se vacían y se vuelven a insertar. delete_many y no drop():
+                # drop() se lleva los índices de dependencies.INDICES_REQUERIDOS hasta el próximo arranque.
+                collection.delete_many({})
                 collection.insert_many(records)
                 print(f"✅ Colección '{collection_name}' insertada con éxito: {len(records)} documentos.")
 
+        # Nueva versión de cada colección cargada: la réplica de flota se recarga y los ETag cambian
+        for collection_name, records in data.items():
+            if records:
+                db[COLECCION_METADATOS].update_one(filtro_version(collection_name), INCREMENTO_VERSION, upsert=True)
+
+        # La colección materializada de alertas depende de Documentacion y Vehiculos: se regenera completa.
+        total_alertas = reconstruir_alertas_vencimiento(db)
+        print(f"✅ Colección '{COLECCION_ALERTAS}' reconstruida: {total_alertas} alertas.")
+
+        # El rollup mensual de costos depende de Mantenimiento y Finanzas: también se regenera completo.
+        total_rollup = reconstruir_costos_mensuales(db)
+        print(f"✅ Colección '{COLECCION_COSTOS_MENSUALES}' reconstruida: {total_rollup} filas.")
+
+        # El libro Costos copia Mantenimiento y Finanzas (recargadas completas): se rehace desde cero.
+        total_asientos = reconstruir_libro_costos(db)
+        print(f"✅ Colección '{COLECCION_COSTOS}' reconstruida: {total_asientos} asientos.")
+
     except Exception as e:
         print(f"❌ ERROR CRÍTICO durante la carga a MongoDB: {e}")
         print("Asegúrate de que la 'CONNECTION_STRING' y la contraseña sean correctas.")
@@ -0,0 +1,144 @@
+# fechas_costos.py
+# Fecha normalizada de los costos: campo BSON `fecha_evento` en Finanzas y Mantenimiento.
+# Cada origen guarda la fecha en un campo y formato distinto (fecha datetime del ETL y de los costos
+# manuales, FECHA / costo_fecha texto de las ediciones, fecha_infraccion / dia de los CSV de multas).
+# fecha_evento la resuelve una sola vez al escribir, así los reportes filtran por rango en Mongo
+# con el índice (patente, fecha_evento) en lugar de traer todas las filas de la patente.
+# Escriben fecha_evento: el ETL, los endpoints de /costos y este script para los documentos existentes.
+# Uso: python fechas_costos.py [--dry-run] [--lote 1000]   (backfill reanudable)
+
+import os
+import re
+import logging
+import argparse
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from pymongo import MongoClient, UpdateOne
+from dotenv import load_dotenv
+
+from costos_mensuales import reconstruir_costos_mensuales
+from versiones import COLECCION_METADATOS, INCREMENTO_VERSION, filtro_version
+
+logger = logging.getLogger(__name__)
+
+COLECCIONES_COSTOS = ("Finanzas", "Mantenimiento")
+
+# Campos de fecha en orden de prioridad: primero los que escribe la edición manual (son los vigentes)
+CAMPOS_FECHA = ("FECHA", "costo_fecha", "fecha", "dia", "fecha_infraccion", "FECHA_INFRACCIN")
+
+_VALORES_VACIOS = ("", "N/A", "NULL", "NONE", "NAN", "NAT", "SIN FECHA")
+
+
+def parsear_fecha(valor: Any) -> Optional[datetime]:
+    """datetime, dd/mm/aaaa, mm/aaaa (multas CABA) o ISO → datetime sin hora de zona. None si no se entiende."""
+    if isinstance(valor, datetime):
+        # pandas.NaT también es datetime pero no tiene año válido
+        return valor.replace(tzinfo=None) if valor == valor else None
+    if not isinstance(valor, str):
+        return None
+    valor = valor.strip()
+    if valor.upper() in _VALORES_VACIOS:
+        return None
+    try:
+        match = re.match(r"^(\d{1,2})[/-](\d{1,2})[/-](\d{4})", valor)
+        if match:
+            d, m, a = (int(x) for x in match.groups())
+            return datetime(a, m, d)
+        match = re.match(r"^(\d{1,2})[/-](\d{4})$", valor)
+        if match:
+            m, a = (int(x) for x in match.groups())
+            return datetime(a, m, 1)
+        if re.match(r"^\d{4}-\d{2}-\d{2}", valor):
+            return datetime.fromisoformat(valor.replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        return None
+    return None
+
+
+def filtro_despues_de_id(ultimo_id: Any) -> Dict[str, Any]:
+    """
+    Documentos con _id mayor a `ultimo_id` en el orden de sort("_id", 1). Los _id son UUID texto (ETL)
+    u ObjectId (API): $gt solo compara dentro del mismo tipo BSON y los textos se ordenan antes, así
+    que después del último texto siguen todos los que no son texto.
+    """
+    if isinstance(ultimo_id, str):
+        return {"$or": [{"_id": {"$gt": ultimo_id}}, {"_id": {"$not": {"$type": "string"}}}]}
+    return {"_id": {"$gt": ultimo_id}}
+
+
+def fecha_evento(doc: Dict[str, Any]) -> Optional[datetime]:
+    """Fecha del costo según el primer campo de CAMPOS_FECHA con un valor parseable."""
+    for campo in CAMPOS_FECHA:
+        fecha = parsear_fecha(doc.get(campo))
+        if fecha is not None:
+            return fecha
+    return None
+
+
+def backfill_coleccion(db, collection_name: str, dry_run: bool = False, lote: int = 1000) -> int:
+    """
+    Completa fecha_evento en los documentos que no lo tienen, por lotes ordenados por _id.
+    Los que no tienen ninguna fecha parseable quedan con fecha_evento null (no entran en ningún rango)
+    y no se vuelven a procesar.
+    """
+    collection = db[collection_name]
+    filtro_base = {"fecha_evento": {"$exists": False}}
+    pendientes = collection.count_documents(filtro_base)
+    if not pendientes:
+        logger.info(f"{collection_name}: fecha_evento ya completo.")
+        return 0
+    if dry_run:
+        logger.info(f"[DRY] {collection_name}: {pendientes} documentos sin fecha_evento.")
+        return pendientes
+
+    actualizados, sin_fecha = 0, 0
+    ultimo_id: Optional[Any] = None
+    while True:
+        filtro = dict(filtro_base)
+        if ultimo_id is not None:
+            filtro.update(filtro_despues_de_id(ultimo_id))
+        docs = list(collection.find(filtro, {campo: 1 for campo in CAMPOS_FECHA}).sort("_id", 1).limit(lote))
+        if not docs:
+            break
+        operaciones = []
+        for doc in docs:
+            fecha = fecha_evento(doc)
+            sin_fecha += fecha is None
+            operaciones.append(UpdateOne({"_id": doc["_id"], "fecha_evento": {"$exists": False}},
+                                         {"$set": {"fecha_evento": fecha}}))
+        result = collection.bulk_write(operaciones, ordered=False)
+        actualizados += result.modified_count
+        ultimo_id = docs[-1]["_id"]
+        logger.info(f"{collection_name}: {actualizados}/{pendientes} documentos con fecha_evento.")
+
+    db[COLECCION_METADATOS].update_one(filtro_version(collection_name), INCREMENTO_VERSION, upsert=True)
+    if sin_fecha:
+        logger.warning(f"{collection_name}: {sin_fecha} documentos sin fecha reconocible (fecha_evento null).")
+    return actualizados
+
+
+def main(dry_run: bool, lote: int):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    load_dotenv()
+    mongo_uri = os.getenv("MONGO_URI")
+    if not mongo_uri:
+        raise RuntimeError("Falta MONGO_URI en las variables de entorno")
+
+    client = MongoClient(mongo_uri)
+    try:
+        db = client[os.getenv("DB_NAME", "MacSeguridadFlota")]
+        actualizados = sum(backfill_coleccion(db, collection_name, dry_run, lote) for collection_name in COLECCIONES_COSTOS)
+        if actualizados and not dry_run:
+            # Los documentos recién fechados entran en el rollup mensual
+            reconstruir_costos_mensuales(db)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Completa fecha_evento en Finanzas y Mantenimiento.")
+    parser.add_argument("--dry-run", action="store_true", help="Solo cuenta los documentos pendientes.")
+    parser.add_argument("--lote", type=int, default=1000, help="Documentos por bulk_write (default: 1000).")
+    args = parser.parse_args()
+    main(args.dry_run, args.lote)
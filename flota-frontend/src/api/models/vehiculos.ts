@@ -139,7 +139,9 @@ export interface ReporteCostosResponse {
     total_general: number;
     total_mantenimiento: number; 
     total_infracciones: number;
-    detalles: CostoItem[]; 
+    cantidad_registros: number;
+    detalles: CostoItem[]; // página del detalle (más reciente primero)
+    next_cursor: string | null; // se pasa como ?cursor= para la página siguiente
     alertas: Alerta[];
 }
 
@@ -153,6 +155,9 @@ export interface DashboardResponse {
     alertas_criticas: Alerta[];
     resumen_costos: ResumenCostoGlobal;
     total_vehiculos: number;
+    total_mantenimiento: number; // último año, del rollup CostosMensuales
+    total_infracciones: number;
+    total_general: number;
 }
 
 export interface CostoManualDeleteInput {
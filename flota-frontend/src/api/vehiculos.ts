@@ -76,13 +76,20 @@ function mapVehiculoResponse(data: VehiculoBackendResponse): Vehiculo {
  */
 export async function fetchVehiculos(): Promise<Vehiculo[]> {
     try {
-        // Obtenemos la respuesta que es un array de VehiculoBackendResponse
-        const response = await apiClient.get<VehiculoBackendResponse[]>('/vehiculos');
-
-        // 🎯 SOLUCIÓN CRÍTICA: Mapear CADA objeto para convertirlo a la estructura esperada (Vehiculo)
-        const vehiculosMapeados: Vehiculo[] = response.data.map(vehiculoData => 
-            mapVehiculoResponse(vehiculoData)
-        );
+        // Recorremos la flota por páginas con el cursor del header X-Next-Cursor (sin skip)
+        const vehiculosMapeados: Vehiculo[] = [];
+        let cursor: string | undefined;
+        do {
+            const response = await apiClient.get<VehiculoBackendResponse[]>('/vehiculos', {
+                params: { limit: 500, cursor },
+            });
+
+            // 🎯 SOLUCIÓN CRÍTICA: Mapear CADA objeto para convertirlo a la estructura esperada (Vehiculo)
+            vehiculosMapeados.push(...response.data.map(vehiculoData =>
+                mapVehiculoResponse(vehiculoData)
+            ));
+            cursor = response.headers['x-next-cursor'] || undefined;
+        } while (cursor);
 
         return vehiculosMapeados; // Devolver la lista mapeada
 
@@ -161,7 +168,7 @@ export async function deleteVehiculo(patente: string): Promise<void> {
         // pero la función normalize_patente del backend lo maneja.
         const url = `/vehiculos/${patente}`;
 
-        // Esperamos 204 No Content
+        // 202 Accepted: los archivos del vehículo se borran en segundo plano (GET /limpiezas/{id})
         await apiClient.delete(url);
 
     } catch (error: unknown) {
@@ -265,9 +272,9 @@ export async function fetchReporteVehiculo(
       data.total_mantenimiento.toLocaleString('es-AR', { style: 'currency', currency: 'ARS' }));
     console.log('%cInfracciones :', 'font-weight: bold; color: #d93025;', 
       data.total_infracciones.toLocaleString('es-AR', { style: 'currency', currency: 'ARS' }));
-    console.log('%cRegistros encontrados:', 'font-weight: bold;', data.detalles.length);
 
-    if (data.detalles.length > 0) {
+    // detalles es solo la primera página: el total de filas del período viene en cantidad_registros
+    if (data.cantidad_registros > 0) {
       console.table(
         data.detalles.map((item) => ({
           Fecha: item.fecha.split('T')[0],
@@ -0,0 +1,138 @@
+# libro_costos.py
+# Libro único de costos: colección Costos con un solo esquema para Mantenimiento y Finanzas.
+# Cada asiento copia un documento de origen ya normalizado: patente, fecha (BSON, = fecha_evento),
+# categoria, importe, es_multa, excluido, descripcion, origen y comprobante_file_id. El _id es
+# "<origen>:<_id de origen>", así que escribir el mismo documento dos veces es idempotente.
+# La API escribe el asiento en cada alta / edición / baja de costos (dependencies.registrar_escritura_costo),
+# el ETL lo reconstruye completo al terminar la carga y este script completa los existentes.
+# Los reportes de flota (/reportes/periodo, /reportes/comparativo) lo leen solo cuando está completo:
+# la marca en Metadatos la ponen el backfill al recorrer ambas colecciones y la reconstrucción del ETL.
+# Uso: python libro_costos.py [--dry-run] [--lote 1000] [--desde-cero]   (backfill reanudable)
+
+import os
+import logging
+import argparse
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from pymongo import MongoClient, ReplaceOne
+from dotenv import load_dotenv
+
+from clasificacion_costos import descripcion_costo
+from costos_mensuales import clasificar_costo
+from fechas_costos import COLECCIONES_COSTOS, filtro_despues_de_id
+from versiones import COLECCION_METADATOS
+
+logger = logging.getLogger(__name__)
+
+COLECCION_COSTOS = "Costos"
+
+# Documento de Metadatos con la marca de libro completo
+FILTRO_LIBRO_COMPLETO = {"_id": "libro_costos"}
+
+
+def id_asiento(origen: str, fuente_id: Any) -> str:
+    return f"{origen}:{fuente_id}"
+
+
+def asiento_costo(doc: Dict[str, Any], origen: str) -> Dict[str, Any]:
+    """Asiento del libro para un documento de Mantenimiento o Finanzas."""
+    fecha = doc.get("fecha_evento")
+    return {
+        "_id": id_asiento(origen, doc["_id"]),
+        "fuente_id": doc["_id"],
+        "origen": origen,
+        "patente": doc.get("patente"),
+        "fecha": fecha if isinstance(fecha, datetime) else None,
+        **clasificar_costo(doc, origen),
+        "descripcion": descripcion_costo(doc, origen),
+        "comprobante_file_id": doc.get("comprobante_file_id"),
+        "actualizado_en": datetime.utcnow(),
+    }
+
+
+def backfill_coleccion(db, origen: str, dry_run: bool = False, lote: int = 1000, desde_cero: bool = False) -> int:
+    """
+    Copia al libro los documentos de `origen` por lotes ordenados por _id. El último _id de cada lote
+    confirmado se guarda en Metadatos, así una ejecución interrumpida se retoma desde ahí (no desde el
+    mayor fuente_id del libro: la API escribe asientos nuevos mientras tanto).
+    Con `desde_cero` recorre todo (sirve tras cambios en la normalización).
+    """
+    fuente = db[origen]
+    libro = db[COLECCION_COSTOS]
+    progreso = db[COLECCION_METADATOS]
+    filtro_progreso = {"_id": f"backfill_costos_{origen.lower()}"}
+
+    ultimo_id: Optional[Any] = None
+    if not desde_cero:
+        marca = progreso.find_one(filtro_progreso)
+        ultimo_id = marca.get("ultimo_id") if marca else None
+
+    filtro_base = filtro_despues_de_id(ultimo_id) if ultimo_id is not None else {}
+    pendientes = fuente.count_documents(filtro_base)
+    if dry_run or not pendientes:
+        logger.info(f"{'[DRY] ' if dry_run else ''}{origen}: {pendientes} documentos pendientes de copiar a {COLECCION_COSTOS}.")
+        return pendientes
+
+    copiados = 0
+    while True:
+        filtro = filtro_despues_de_id(ultimo_id) if ultimo_id is not None else {}
+        docs = list(fuente.find(filtro).sort("_id", 1).limit(lote))
+        if not docs:
+            break
+        libro.bulk_write([
+            ReplaceOne({"_id": id_asiento(origen, doc["_id"])}, asiento_costo(doc, origen), upsert=True)
+            for doc in docs
+        ], ordered=False)
+        copiados += len(docs)
+        ultimo_id = docs[-1]["_id"]
+        progreso.update_one(filtro_progreso, {"$set": {"ultimo_id": ultimo_id}}, upsert=True)
+        logger.info(f"{origen}: {copiados}/{pendientes} documentos copiados a {COLECCION_COSTOS}.")
+    return copiados
+
+
+def marcar_libro_completo(db, completo: bool) -> None:
+    """Marca (o desmarca) el libro como completo: los reportes de flota lo leen solo con la marca puesta."""
+    db[COLECCION_METADATOS].update_one(
+        FILTRO_LIBRO_COMPLETO, {"$set": {"completo": completo, "actualizado_en": datetime.utcnow()}}, upsert=True
+    )
+
+
+def completar_libro_costos(db, dry_run: bool = False, lote: int = 1000, desde_cero: bool = False) -> int:
+    """Backfill de ambas colecciones; si termina sin cortes, marca el libro completo (las altas posteriores las escribe la API)."""
+    copiados = sum(backfill_coleccion(db, origen, dry_run, lote, desde_cero) for origen in COLECCIONES_COSTOS)
+    if not dry_run:
+        marcar_libro_completo(db, True)
+    return copiados
+
+
+def reconstruir_libro_costos(db) -> int:
+    """Vacía el libro y lo vuelve a llenar desde ambas colecciones (ETL: las fuentes se recargan completas)."""
+    marcar_libro_completo(db, False)
+    db[COLECCION_COSTOS].delete_many({})
+    db[COLECCION_METADATOS].delete_many({"_id": {"$in": [f"backfill_costos_{o.lower()}" for o in COLECCIONES_COSTOS]}})
+    return completar_libro_costos(db, desde_cero=True)
+
+
+def main(dry_run: bool, lote: int, desde_cero: bool):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    load_dotenv()
+    mongo_uri = os.getenv("MONGO_URI")
+    if not mongo_uri:
+        raise RuntimeError("Falta MONGO_URI en las variables de entorno")
+
+    client = MongoClient(mongo_uri)
+    try:
+        db = client[os.getenv("DB_NAME", "MacSeguridadFlota")]
+        completar_libro_costos(db, dry_run, lote, desde_cero)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Completa el libro de costos (Costos) desde Mantenimiento y Finanzas.")
+    parser.add_argument("--dry-run", action="store_true", help="Solo cuenta los documentos pendientes.")
+    parser.add_argument("--lote", type=int, default=1000, help="Documentos por bulk_write (default: 1000).")
+    parser.add_argument("--desde-cero", action="store_true", help="Recorre todos los documentos, no solo los nuevos.")
+    args = parser.parse_args()
+    main(args.dry_run, args.lote, args.desde_cero)
@@ -0,0 +1,146 @@
+# limpieza_gridfs.py
+# Limpieza en segundo plano de los archivos GridFS de un vehículo eliminado.
+# DELETE /vehiculos/{patente} junta los file_id referenciados (documentos_digitales, Documentacion,
+# comprobantes de Mantenimiento/Finanzas) y crea una tarea en TareasLimpieza; ejecutar_limpieza corre
+# como BackgroundTask, suma los archivos con metadata.patente y los borra informando el avance.
+# Los archivos que otra patente sigue referenciando (comprobantes compartidos) no se borran.
+# El estado se consulta con GET /limpiezas/{tarea_id} (se guarda en Mongo: sirve desde cualquier worker).
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from gridfs.errors import NoFile
+
+from dependencies import get_db_collection, get_gridfs_bucket
+
+logger = logging.getLogger(__name__)
+
+COLECCION_TAREAS = "TareasLimpieza"
+
+# Colección → campo con el file_id de GridFS (Vehiculos se trata aparte: array documentos_digitales)
+REFERENCIAS_ARCHIVOS = {
+    "Documentacion": "file_id",
+    "Mantenimiento": "comprobante_file_id",
+    "Finanzas": "comprobante_file_id",
+}
+
+
+def _object_ids(valores: Iterable[Any]) -> List[ObjectId]:
+    """Convierte los file_id guardados como string; descarta vacíos e inválidos."""
+    ids = set()
+    for valor in valores:
+        if not valor:
+            continue
+        try:
+            ids.add(valor if isinstance(valor, ObjectId) else ObjectId(str(valor)))
+        except (InvalidId, TypeError):
+            continue
+    return sorted(ids)
+
+
+async def archivos_referenciados(patente: str, collection_name: str) -> List[Any]:
+    """file_id referenciados por los documentos de una patente en una colección."""
+    campo = REFERENCIAS_ARCHIVOS[collection_name]
+    docs = await get_db_collection(collection_name).find(
+        {"patente": patente, campo: {"$nin": [None, ""]}}, {campo: 1}
+    ).to_list(length=None)
+    return [doc[campo] for doc in docs]
+
+
+async def archivos_en_uso(file_ids: List[ObjectId]) -> set:
+    """
+    file_id que todavía referencia algún documento (de otra patente: la cascada ya borró los del
+    vehículo). Un comprobante deduplicado por POST /costos/manual/batch puede ser de varios vehículos.
+    """
+    if not file_ids:
+        return set()
+    valores = list(file_ids) + [str(file_id) for file_id in file_ids]
+    consultas = [
+        get_db_collection(collection_name).distinct(campo, {campo: {"$in": valores}})
+        for collection_name, campo in REFERENCIAS_ARCHIVOS.items()
+    ]
+    consultas.append(get_db_collection("Vehiculos").distinct(
+        "documentos_digitales.file_id", {"documentos_digitales.file_id": {"$in": valores}}
+    ))
+    referenciados = [valor for valores_coleccion in await asyncio.gather(*consultas) for valor in valores_coleccion]
+    return set(_object_ids(referenciados)) & set(file_ids)
+
+
+def archivos_del_vehiculo(vehiculo: Optional[Dict[str, Any]]) -> List[Any]:
+    return [d.get("file_id") for d in (vehiculo or {}).get("documentos_digitales") or [] if isinstance(d, dict)]
+
+
+async def crear_tarea_limpieza(patente: str, file_ids: Iterable[Any]) -> str:
+    tarea = {
+        "tipo": "gridfs_vehiculo",
+        "patente": patente,
+        "file_ids": _object_ids(file_ids),
+        "estado": "pendiente",
+        "archivos_total": None,
+        "archivos_compartidos": 0,
+        "archivos_borrados": 0,
+        "errores": [],
+        "creada_en": datetime.utcnow(),
+        "finalizada_en": None,
+    }
+    result = await get_db_collection(COLECCION_TAREAS).insert_one(tarea)
+    return str(result.inserted_id)
+
+
+async def ejecutar_limpieza(tarea_id: str) -> None:
+    """BackgroundTask: borra los archivos de la tarea y los que tengan metadata.patente del vehículo."""
+    tareas = get_db_collection(COLECCION_TAREAS)
+    tarea = await tareas.find_one_and_update(
+        {"_id": ObjectId(tarea_id), "estado": "pendiente"}, {"$set": {"estado": "en_proceso"}}
+    )
+    if not tarea:
+        return
+
+    try:
+        bucket = await get_gridfs_bucket()
+        por_metadata = await get_db_collection("fs.files").find(
+            {"metadata.patente": tarea["patente"]}, {"_id": 1}
+        ).to_list(length=None)
+        file_ids = _object_ids(list(tarea["file_ids"]) + [doc["_id"] for doc in por_metadata])
+        en_uso = await archivos_en_uso(file_ids)
+        file_ids = [file_id for file_id in file_ids if file_id not in en_uso]
+        await tareas.update_one({"_id": tarea["_id"]}, {"$set": {
+            "archivos_total": len(file_ids), "archivos_compartidos": len(en_uso)
+        }})
+
+        borrados, errores = 0, []
+        for file_id in file_ids:
+            try:
+                await bucket.delete(file_id)
+                borrados += 1
+            except NoFile:
+                borrados += 1  # ya no estaba: no hay nada que liberar
+            except Exception as e:
+                errores.append(f"{file_id}: {e}")
+            if borrados % 20 == 0:
+                await tareas.update_one({"_id": tarea["_id"]}, {"$set": {"archivos_borrados": borrados}})
+
+        await tareas.update_one({"_id": tarea["_id"]}, {"$set": {
+            "estado": "error" if errores else "completada",
+            "archivos_borrados": borrados,
+            "errores": errores,
+            "finalizada_en": datetime.utcnow(),
+        }})
+        logger.info(f"Limpieza GridFS de {tarea['patente']}: {borrados}/{len(file_ids)} archivos, {len(errores)} errores.")
+    except Exception as e:
+        logger.error(f"Limpieza GridFS {tarea_id} falló: {e}")
+        await tareas.update_one({"_id": tarea["_id"]}, {"$set": {
+            "estado": "error", "errores": [str(e)], "finalizada_en": datetime.utcnow()
+        }})
+
+
+async def obtener_tarea(tarea_id: str) -> Optional[Dict[str, Any]]:
+    try:
+        oid = ObjectId(tarea_id)
+    except InvalidId:
+        return None
+    return await get_db_collection(COLECCION_TAREAS).find_one({"_id": oid}, {"file_ids": 0})
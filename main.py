@@ -1,13 +1,15 @@
 import logging  # ← NUEVO: Para logs
 from typing import Dict, Any  # ← Para typing en response_model
 from fastapi import FastAPI, HTTPException, status, Query
-from dependencies import UpdateMonto, get_db_collection, connect_to_mongodb
+from dependencies import UpdateMonto, get_db_collection, connect_to_mongodb, asegurar_indices, verificar_esquema_vehiculos, verificar_fechas_costos, verificar_clasificacion_costos, verificar_libro_costos, registrar_escritura_costo
+from replica_flota import replica_flota
 from bson.objectid import ObjectId
 from fastapi.middleware.cors import CORSMiddleware
 from routers import flota
 from routers.archivos import router as archivos_router
 from routers.costos import router as costos_router
 from routers.documentacion import router as documentacion_router
+from routers.exportacion import router as exportacion_router
 
 from routers.polizas import router as polizas_router
 
@@ -39,6 +41,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Content-Disposition"],  # Cursor de paginación de GET /vehiculos, ETag de lecturas y nombre de las exportaciones
 )
 
 # Ahora sí: incluir los routers DESPUÉS del middleware
@@ -47,6 +50,7 @@ app.include_router(flota.router, prefix="")
 app.include_router(costos_router)
 app.include_router(polizas_router)
 app.include_router(documentacion_router)
+app.include_router(exportacion_router)
 
 # =========================================================================
 # EVENTO DE INICIO: CONEXIÓN ASINCRÓNICA A MONGODB
@@ -55,6 +59,16 @@ app.include_router(documentacion_router)
 @app.on_event("startup")
 async def startup_db_client(): 
     await connect_to_mongodb()
+    await asegurar_indices()
+    await verificar_esquema_vehiculos()
+    await verificar_fechas_costos()
+    await verificar_clasificacion_costos()
+    await verificar_libro_costos()
+    try:
+        await replica_flota.cargar()
+    except Exception as e:
+        # Sin réplica la API sigue funcionando: se carga en la primera lectura
+        logger.warning(f"No se pudo cargar la réplica de flota en el arranque: {e}")
     logger.info("CONEXIÓN A MONGODB ATLAS EXITOSA - API LISTA")  # ← MEJORA: Log
 
 @app.on_event("shutdown")
@@ -98,7 +112,8 @@ async def update_monto(collection_name: str, doc_id: str, data: UpdateMonto):
     if data.monto < 0:
         raise HTTPException(status_code=400, detail="El monto debe ser mayor o igual a cero.")
 
-    collection = get_db_collection("Finanzas" if collection_name == "finanzas" else "Mantenimiento")
+    coleccion_nombre = "Finanzas" if collection_name == "finanzas" else "Mantenimiento"
+    collection = get_db_collection(coleccion_nombre)
 
     try:
         obj_id = ObjectId(doc_id)
@@ -111,18 +126,19 @@ async def update_monto(collection_name: str, doc_id: str, data: UpdateMonto):
     if data.motivo is not None:
         update_data["motivo"] = data.motivo
 
-    # ← AHORA USAMOS await + update_one ASINCRONO
-    result = await collection.update_one(
+    # ← find_one_and_update devuelve el documento anterior: alimenta el rollup CostosMensuales
+    anterior = await collection.find_one_and_update(
         {"_id": obj_id},
         {"$set": update_data}
     )
 
-    if result.matched_count == 0:
+    if anterior is None:
         raise HTTPException(status_code=404, detail=f"Documento no encontrado: {doc_id}")
+    await registrar_escritura_costo(coleccion_nombre, antes=anterior, despues={**anterior, **update_data})
 
     logger.info(f"Monto actualizado en {collection_name} para ID {doc_id}")  # ← MEJORA: Log de auditoría
 
     return {
         "message": f"Monto actualizado correctamente en {collection_name.capitalize()}",
-        "modified": result.modified_count > 0
+        "modified": any(anterior.get(campo) != valor for campo, valor in update_data.items())
     }
\ No newline at end of file
@@ -0,0 +1,159 @@
+# replica_flota.py
+# Réplica en memoria (por proceso) de la colección Vehiculos, que es chica y se lee en casi todos los
+# endpoints: listado, detalle, reporte, dashboard y validación de subidas.
+# Índice principal por patente normalizada (_id) y secundario por nro_movil. Se carga en el startup.
+# Coherencia: toda escritura de la API sobre Vehiculos pasa por registrar / invalidar / eliminar, que
+# incrementan el contador Metadatos.version_vehiculos (versiones.py). Cada réplica compara su
+# versión con la de Mongo como mucho cada INTERVALO_VERIFICACION segundos y se recarga si cambió
+# (otro worker, el ETL o la migración escribieron).
+# Los documentos devueltos son compartidos: quien los lee no debe modificarlos.
+
+import time
+import asyncio
+import logging
+from bisect import bisect_right, insort
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+from dependencies import get_db_collection
+from esquema_vehiculos import FILTRO_VERSION_VEHICULOS, valor_canonico
+from versiones import COLECCION_METADATOS, INCREMENTO_VERSION
+
+logger = logging.getLogger(__name__)
+
+INTERVALO_VERIFICACION = 5.0  # segundos entre consultas del contador de versión
+
+
+class ReplicaFlota:
+    def __init__(self):
+        self._por_patente: Dict[str, Dict[str, Any]] = {}
+        self._por_movil: Dict[str, str] = {}
+        self._orden: List[str] = []          # patentes ordenadas (mismo orden que sort("_id", 1))
+        self._version: Optional[int] = None  # None = no cargada o invalidada por completo
+        self._verificado_en = 0.0
+        self._lock = asyncio.Lock()
+
+    # --- Carga y vigencia ---
+
+    async def _version_remota(self) -> int:
+        doc = await get_db_collection(COLECCION_METADATOS).find_one(FILTRO_VERSION_VEHICULOS)
+        return doc.get("version", 0) if doc else 0
+
+    async def cargar(self) -> None:
+        """Carga completa de Vehiculos (startup o cambio de versión remoto)."""
+        async with self._lock:
+            version = await self._version_remota()
+            docs = await get_db_collection("Vehiculos").find({}).to_list(length=None)
+            self._por_patente = {doc["_id"]: doc for doc in docs}
+            self._orden = sorted(self._por_patente)
+            self._por_movil = {}
+            for doc in docs:
+                self._indexar_movil(doc)
+            self._version = version
+            self._verificado_en = time.monotonic()
+        logger.info(f"Réplica de flota cargada: {len(docs)} vehículos (versión {version}).")
+
+    async def _asegurar_vigente(self) -> None:
+        if self._version is None:
+            await self.cargar()
+            return
+        if time.monotonic() - self._verificado_en < INTERVALO_VERIFICACION:
+            return
+        self._verificado_en = time.monotonic()
+        if await self._version_remota() != self._version:
+            await self.cargar()
+
+    def _indexar_movil(self, doc: Dict[str, Any]) -> None:
+        movil = valor_canonico(doc, "nro_movil")
+        if movil is not None:
+            self._por_movil[movil] = doc["_id"]
+
+    def _quitar_local(self, patente: str) -> None:
+        anterior = self._por_patente.pop(patente, None)
+        if anterior is None:
+            return
+        self._orden.remove(patente)
+        movil = valor_canonico(anterior, "nro_movil")
+        if movil is not None and self._por_movil.get(movil) == patente:
+            del self._por_movil[movil]
+
+    async def _incrementar_version(self) -> bool:
+        """Incrementa el contador compartido. True si nadie más escribió desde nuestra última versión."""
+        doc = await get_db_collection(COLECCION_METADATOS).find_one_and_update(
+            FILTRO_VERSION_VEHICULOS, INCREMENTO_VERSION, upsert=True, return_document=ReturnDocument.AFTER
+        )
+        if self._version is not None and doc["version"] == self._version + 1:
+            self._version = doc["version"]
+            return True
+        self._version = None  # hubo escrituras ajenas: recarga completa en la próxima lectura
+        return False
+
+    # --- Lecturas ---
+
+    async def version(self) -> int:
+        """Versión vigente de Vehiculos (base de los ETag de los endpoints de vehículos)."""
+        await self._asegurar_vigente()
+        return self._version if self._version is not None else await self._version_remota()
+
+    async def obtener(self, patente: str) -> Optional[Dict[str, Any]]:
+        await self._asegurar_vigente()
+        return self._por_patente.get(patente)
+
+    async def existe(self, patente: str) -> bool:
+        return await self.obtener(patente) is not None
+
+    async def obtener_por_movil(self, nro_movil: Any) -> Optional[Dict[str, Any]]:
+        await self._asegurar_vigente()
+        patente = self._por_movil.get(valor_canonico({"nro_movil": nro_movil}, "nro_movil"))
+        return self._por_patente.get(patente) if patente else None
+
+    async def listar(self, skip: int = 0, limit: int = 100, despues_de: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Vehículos ordenados por patente, con el mismo skip/limit/cursor que el listado de Mongo."""
+        await self._asegurar_vigente()
+        inicio = bisect_right(self._orden, despues_de) if despues_de is not None else 0
+        return [self._por_patente[p] for p in self._orden[inicio + skip:inicio + skip + limit]]
+
+    async def contar(self, solo_activos: bool = False) -> int:
+        await self._asegurar_vigente()
+        if not solo_activos:
+            return len(self._por_patente)
+        return sum(1 for doc in self._por_patente.values() if doc.get("activo") is True)
+
+    async def conteos(self) -> Tuple[int, int]:
+        """(total, activos) con una sola verificación de vigencia y una pasada."""
+        await self._asegurar_vigente()
+        activos = sum(1 for doc in self._por_patente.values() if doc.get("activo") is True)
+        return len(self._por_patente), activos
+
+    # --- Escrituras (después de escribir en Mongo) ---
+
+    async def registrar(self, doc: Dict[str, Any]) -> None:
+        """Alta o modificación con el documento completo ya leído de Mongo."""
+        if await self._incrementar_version():
+            self._quitar_local(doc["_id"])
+            self._por_patente[doc["_id"]] = doc
+            insort(self._orden, doc["_id"])
+            self._indexar_movil(doc)
+
+    async def invalidar(self, patente: str) -> None:
+        """Modificación parcial hecha con update_one: relee solo ese vehículo."""
+        if await self._incrementar_version():
+            doc = await get_db_collection("Vehiculos").find_one({"_id": patente})
+            self._quitar_local(patente)
+            if doc:
+                self._por_patente[patente] = doc
+                insort(self._orden, patente)
+                self._indexar_movil(doc)
+
+    async def invalidar_todo(self) -> None:
+        """Escritura masiva (POST /vehiculos/bulk): recarga completa en la próxima lectura."""
+        await self._incrementar_version()
+        self._version = None
+
+    async def eliminar(self, patente: str) -> None:
+        if await self._incrementar_version():
+            self._quitar_local(patente)
+
+
+replica_flota = ReplicaFlota()
@@ -12,7 +12,9 @@ import gridfs.errors
 from io import BytesIO
 from datetime import datetime
 import logging
-from dependencies import normalize_patente, get_gridfs_bucket, get_db_collection
+from dependencies import normalize_patente, get_gridfs_bucket, get_db_collection, refrescar_alertas_vencimiento, incrementar_version
+from replica_flota import replica_flota
+from esquema_vehiculos import INCREMENTO_REVISION
 import gridfs
 
 logger = logging.getLogger(__name__)
@@ -45,8 +47,7 @@ async def subir_documento(
     try:
         # 1. Verificar si el vehículo existe antes de subir nada
         vehiculos_collection = get_db_collection("Vehiculos")
-        vehiculo = await vehiculos_collection.find_one({"_id": normalized_patente})
-        if not vehiculo:
+        if not await replica_flota.existe(normalized_patente):
             raise HTTPException(404, f"Vehículo {normalized_patente} no encontrado")
 
         # 2. Subir archivo a GridFS
@@ -79,7 +80,8 @@ async def subir_documento(
                     "documentos_digitales.$.nombre_archivo": file.filename,
                     "documentos_digitales.$.fecha_subida": datetime.utcnow(),
                     "documentos_digitales.$.existe_fisicamente": True
-                }
+                },
+                "$inc": INCREMENTO_REVISION
             }
         )
 
@@ -116,6 +118,7 @@ async def subir_documento(
                 doc_data["created_at"] = datetime.utcnow()
                 await doc_collection.insert_one(doc_data)
                 logger.info(f"Documento póliza creado en Documentacion para {normalized_patente}")
+            await incrementar_version("Documentacion")
 
         # INTENTO B: Si no se modificó nada (matched_count == 0), significa que no existía. Lo agregamos (PUSH).
         if result_update.matched_count == 0:
@@ -133,9 +136,12 @@ async def subir_documento(
             
             await vehiculos_collection.update_one(
                 {"_id": normalized_patente},
-                {"$push": {"documentos_digitales": nuevo_doc}}
+                {"$push": {"documentos_digitales": nuevo_doc}, "$inc": INCREMENTO_REVISION}
             )
 
+        await replica_flota.invalidar(normalized_patente)
+        await refrescar_alertas_vencimiento(normalized_patente)
+
         logger.info(f"Vehículo {normalized_patente} actualizado correctamente.")
 
         return {
@@ -2,15 +2,22 @@
 # Eliminamos inicialización top-level de fs → usamos función lazy async
 
 import re  # ← Para validación de patrón en origen
+import json
+import asyncio
+import hashlib
 from dateutil.parser import parse, ParserError
 from datetime import datetime
-from fastapi import APIRouter, Query, HTTPException, Form, UploadFile, File
-from typing import Optional
-from dependencies import normalize_patente, get_db_collection, _client, DB_NAME, CostoManualInput,get_gridfs_bucket
+from fastapi import APIRouter, Query, HTTPException, Form, UploadFile, File, Request
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from dependencies import normalize_patente, get_db_collection, _client, DB_NAME, CostoManualInput,get_gridfs_bucket, registrar_escritura_costo, pide_ndjson, linea_ndjson, respuesta_ndjson
+from dependencies import CostoManualLoteItem, get_mongo_client, en_paralelo, registrar_altas_costos, fusionar_ordenados
 from bson import ObjectId
 import logging
 from motor.motor_asyncio import AsyncIOMotorGridFSBucket
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from fechas_costos import parsear_fecha
+from clasificacion_costos import CAMPOS_IMPORTE, CATEGORIA_MULTA, FILTRO_INCLUIDO, clasificar
+from costos_mensuales import expr_importe
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/costos", tags=["Costos"])
@@ -44,116 +51,177 @@ def safe_parse_date(fecha_raw) -> datetime:
         except:
             return datetime(1970, 1, 1)
 
+# =================================================================
+# PIPELINE DE GASTOS UNIFICADOS (Mantenimiento + Finanzas, esquemas nuevo y legado)
+# =================================================================
+def _existe(campo: str) -> dict:
+    return {"$ne": [{"$type": f"${campo}"}, "missing"]}
+
+def _o(*expresiones, defecto=None) -> dict:
+    """Equivalente de `a or b or defecto` de Python: primer valor que no sea null, "" ni 0."""
+    return {"$switch": {
+        "branches": [
+            {"case": {"$and": [{"$gt": [e, None]}, {"$not": [{"$in": [e, ["", 0, False]]}]}]}, "then": e}
+            for e in expresiones
+        ],
+        "default": defecto,
+    }}
+
+def _texto(expr) -> dict:
+    return {"$trim": {"input": {"$toString": expr}}}
+
+def _etapas_gasto(origen: str, moderno: dict, legado: dict) -> list:
+    """
+    Proyecta una colección al formato de gasto unificado. `moderno` / `legado` son las expresiones
+    de tipo y descripción según el documento tenga campos de costo manual (importe / tipo_costo)
+    o del ETL. La fecha sale de fecha_evento (fechas_costos.py); importe, exclusión y multas, de
+    clasificacion_costos.py (campos guardados al escribir), igual que en los reportes.
+    """
+    es_moderno = {"$or": [_existe("importe"), _existe("tipo_costo")]}
+    coleccion = origen.capitalize()
+    return [
+        {"$project": {
+            "_id": 0,
+            "id": {"$toString": "$_id"},
+            "patente": 1,
+            "_fecha": {"$ifNull": ["$fecha_evento", datetime(1970, 1, 1)]},
+            "tipo": {"$cond": [es_moderno, moderno["tipo"], legado["tipo"]]},
+            "descripcion": {"$cond": [es_moderno, moderno["descripcion"], legado["descripcion"]]},
+            "importe": expr_importe(*CAMPOS_IMPORTE[coleccion]),
+            "origen": {"$literal": origen},
+            "comprobante_file_id": {"$ifNull": ["$comprobante_file_id", None]},
+            "_es_multa": {"$eq": ["$categoria", CATEGORIA_MULTA]},
+        }},
+    ]
+
+ETAPA_FECHA_GASTO = {"$addFields": {"fecha": {"$dateToString": {"format": "%Y-%m-%dT%H:%M:%S", "date": "$_fecha"}}}}
+
+def _etapas_gastos_por_coleccion() -> Dict[str, list]:
+    """Proyección al gasto unificado de cada colección de costos."""
+    mantenimiento = _etapas_gasto(
+        "mantenimiento",
+        moderno={
+            "tipo": {"$ifNull": ["$tipo_costo", "Mantenimiento General"]},
+            "descripcion": _texto({"$ifNull": ["$descripcion", "Sin descripción"]}),
+        },
+        legado={
+            "tipo": _texto(_o("$motivo", "$tipo_registro", defecto="Mantenimiento General")),
+            "descripcion": _texto(_o("$descripcion", "$DESCRIPCIN", defecto="")),
+        },
+    )
+    finanzas = _etapas_gasto(
+        "finanzas",
+        moderno={
+            "tipo": {"$ifNull": ["$tipo_costo", "Multa"]},
+            "descripcion": _texto({"$ifNull": ["$descripcion", "Multa"]}),
+        },
+        legado={
+            "tipo": _texto({"$ifNull": ["$tipo_registro", "Multa"]}),
+            "descripcion": _texto(_o("$motivo", "$MOTIVO", defecto="Sin descripción")),
+        },
+    )
+    return {"Mantenimiento": mantenimiento, "Finanzas": finanzas}
+
+def pipeline_filas_gastos(filtro_gastos: dict) -> list:
+    """
+    Filas de ambas colecciones que cumplen `filtro_gastos` (patente y/o rango de fecha_evento),
+    sin los costos excluidos, normalizadas y ordenadas por fecha (más reciente primero).
+    Para respuestas completas ($facet): el $sort tras $unionWith junta todas las filas en memoria.
+    """
+    filtro = {"$match": {**filtro_gastos, **FILTRO_INCLUIDO}}
+    etapas = _etapas_gastos_por_coleccion()
+    return [
+        filtro,
+        *etapas["Mantenimiento"],
+        {"$unionWith": {"coll": "Finanzas", "pipeline": [filtro, *etapas["Finanzas"]]}},
+        {"$sort": {"_fecha": -1}},
+        ETAPA_FECHA_GASTO,
+        {"$project": {"_fecha": 0}},
+    ]
+
+async def stream_filas_gastos(filtro_gastos: dict) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Las mismas filas y orden que pipeline_filas_gastos, sin $sort bloqueante: cada colección se lee
+    con $match + $sort por fecha_evento al inicio (lo resuelven los índices (patente, fecha_evento) y
+    (fecha_evento), sin juntar filas) y los dos cursores se fusionan en Python a medida que llegan.
+    Una fila sin fecha_evento sale al final en ambos (null es el menor valor del índice; _fecha, 1970).
+    """
+    filtro = {"$match": {**filtro_gastos, **FILTRO_INCLUIDO}}
+    cursores = [
+        get_db_collection(coleccion).aggregate([filtro, {"$sort": {"fecha_evento": -1}}, *etapas, ETAPA_FECHA_GASTO])
+        for coleccion, etapas in _etapas_gastos_por_coleccion().items()
+    ]
+    async for fila in fusionar_ordenados(cursores, clave=lambda fila: fila["_fecha"], descendente=True):
+        del fila["_fecha"]
+        yield fila
+
+def pipeline_gastos_unificados(patente: str) -> list:
+    """Una agregación: filas de pipeline_filas_gastos y totales en un solo documento ($facet)."""
+    return pipeline_filas_gastos({"patente": patente}) + [
+        {"$facet": {
+            "gastos": [{"$project": {"_es_multa": 0, "patente": 0}}],
+            "totales": [{"$group": {
+                "_id": None,
+                "total_general": {"$sum": "$importe"},
+                "total_mantenimiento": {"$sum": {"$cond": [{"$eq": ["$origen", "mantenimiento"]}, "$importe", 0]}},
+                "total_multas": {"$sum": {"$cond": ["$_es_multa", "$importe", 0]}},
+            }}],
+        }},
+    ]
+
+def _totales_unificados(total_general: float, total_mantenimiento: float, total_multas: float) -> dict:
+    return {
+        "total_general": round(total_general, 2),
+        "total_mantenimiento": round(total_mantenimiento, 2),
+        "total_multas": round(total_multas, 2),
+        "total_otras": round(total_general - total_mantenimiento - total_multas, 2)
+    }
+
+async def _stream_gastos_unificados(patente: str) -> AsyncIterator[bytes]:
+    """Una línea por gasto a medida que llega del cursor y al final el registro de totales."""
+    total_general = total_mantenimiento = total_multas = 0.0
+    cantidad = 0
+    async for fila in stream_filas_gastos({"patente": patente}):
+        es_multa = fila.pop("_es_multa", False)
+        fila.pop("patente", None)
+        total_general += fila["importe"]
+        total_mantenimiento += fila["importe"] if fila["origen"] == "mantenimiento" else 0.0
+        total_multas += fila["importe"] if es_multa else 0.0
+        cantidad += 1
+        yield linea_ndjson({"registro": "gasto", **fila})
+    yield linea_ndjson({
+        "registro": "totales", "patente": patente, "cantidad": cantidad,
+        **_totales_unificados(total_general, total_mantenimiento, total_multas)
+    })
+
 @router.get("/unificado/{patente}")
-async def get_gastos_unificados(patente: str):
+async def get_gastos_unificados(
+    patente: str,
+    request: Request,
+    stream: bool = Query(False, description="NDJSON: una línea por gasto y una final con totales (igual que Accept: application/x-ndjson)")
+):
     patente_norm = normalize_patente(patente)
     logger.info(f"Reporte unificado solicitado para: {patente_norm}")
 
+    if pide_ndjson(request, stream):
+        return respuesta_ndjson(_stream_gastos_unificados(patente_norm))
+
     try:
-        mant_collection = get_db_collection("Mantenimiento")
-        fin_collection = get_db_collection("Finanzas")
+        resultado = await get_db_collection("Mantenimiento").aggregate(
+            pipeline_gastos_unificados(patente_norm)
+        ).to_list(length=1)
     except Exception as e:
-        logger.error(f"Error conectando colecciones: {e}")
+        logger.error(f"Error en reporte unificado de {patente_norm}: {e}")
         raise HTTPException(500, "Error de base de datos")
 
-    todos = []
-
-    # ==================== PROCESAR COLECCIÓN MANTENIMIENTO ====================
-    async for doc in mant_collection.find({"patente": patente_norm}).sort("fecha", -1):
-        try:
-            # Campos NUEVOS (costos manuales modernos)
-            if "importe" in doc or "tipo_costo" in doc:
-                fecha = doc.get("fecha")
-                if isinstance(fecha, str):
-                    fecha = safe_parse_date(fecha)
-                fecha_str = fecha.isoformat() if hasattr(fecha, "isoformat") else str(fecha)
-
-                tipo = doc.get("tipo_costo", "Mantenimiento General")
-                monto = float(doc.get("importe", 0) or 0)
-                descripcion = doc.get("descripcion", "Sin descripción").strip()
-                origen = "mantenimiento"
-
-            # Campos ANTIGUOS (legado)
-            else:
-                fecha_str = safe_parse_date(doc.get("fecha", "1970-01-01")).isoformat()
-                tipo = (doc.get("motivo") or doc.get("tipo_registro") or "Mantenimiento General").strip()
-                monto_raw = doc.get("costo_monto") or doc.get("COSTO_MONTO") or 0
-                monto = float(monto_raw) if monto_raw else 0.0
-                descripcion = (doc.get("descripcion") or doc.get("DESCRIPCIN") or "").strip()
-                origen = "mantenimiento"
-
-            if monto <= 0:
-                continue
-            if any(palabra in descripcion.lower() for palabra in ["administrativo", "correccion", "ajuste", "devolucion"]):
-                continue
-
-            todos.append({
-                "id": str(doc["_id"]),
-                "fecha": fecha_str,
-                "tipo": tipo,                   # ← Este es el que muestra en la columna "Tipo"
-                "descripcion": descripcion,
-                "importe": monto,               # ← Cambié "monto" por "importe" para coincidir con frontend
-                "origen": origen,
-                "comprobante_file_id": doc.get("comprobante_file_id")
-            })
-        except Exception as e:
-            logger.warning(f"Error procesando doc mantenimiento {doc.get('_id')}: {e}")
-            continue
-
-    # ==================== PROCESAR COLECCIÓN FINANZAS ====================
-    async for doc in fin_collection.find({"patente": patente_norm}).sort("fecha", -1):
-        try:
-            # Campos NUEVOS (multas manuales)
-            if "importe" in doc or "tipo_costo" in doc:
-                fecha = doc.get("fecha")
-                if isinstance(fecha, str):
-                    fecha = safe_parse_date(fecha)
-                fecha_str = fecha.isoformat() if hasattr(fecha, "isoformat") else str(fecha)
-
-                tipo = doc.get("tipo_costo", "Multa")
-                monto = float(doc.get("importe", 0) or 0)
-                descripcion = doc.get("descripcion", "Multa").strip()
-                origen = "finanzas"
-
-            # Campos ANTIGUOS
-            else:
-                fecha_raw = doc.get("dia") or doc.get("FECHA_INFRACCION") or doc.get("fecha_infraccion") or "1970-01-01"
-                fecha_str = safe_parse_date(fecha_raw).isoformat()
-                tipo = doc.get("tipo_registro", "Multa").strip()
-                monto = float(doc.get("monto") or doc.get("MONTO") or 0)
-                descripcion = (doc.get("motivo") or doc.get("MOTIVO") or "Sin descripción").strip()
-                origen = "finanzas"
-
-            if monto <= 0:
-                continue
-            if any(palabra in descripcion.lower() for palabra in ["administrativo", "correccion", "devolucion", "descuento", "ajuste"]):
-                continue
-
-            todos.append({
-                "id": str(doc["_id"]),
-                "fecha": fecha_str,
-                "tipo": tipo,
-                "descripcion": descripcion,
-                "importe": monto,
-                "origen": origen,
-                "comprobante_file_id": doc.get("comprobante_file_id")
-            })
-        except Exception as e:
-            logger.warning(f"Error procesando doc finanzas {doc.get('_id')}: {e}")
-            continue
-
-    # ==================== CÁLCULOS FINALES ====================
-    total_general = sum(g["importe"] for g in todos)
-    total_mantenimiento = sum(g["importe"] for g in todos if g["origen"] == "mantenimiento")
-    total_multas = sum(g["importe"] for g in todos if "multa" in g["tipo"].lower() or g["tipo"] in ["Multa", "INFRACCION"])
+    todos = resultado[0]["gastos"]
+    totales = resultado[0]["totales"][0] if resultado[0]["totales"] else {}
+    total_general = totales.get("total_general", 0.0)
 
     respuesta = {
         "patente": patente_norm,
         "gastos": todos,  # ← Lista unificada con formato consistente
-        "total_general": round(total_general, 2),
-        "total_mantenimiento": round(total_mantenimiento, 2),
-        "total_multas": round(total_multas, 2),
-        "total_otras": round(total_general - total_mantenimiento - total_multas, 2)
+        **_totales_unificados(total_general, totales.get("total_mantenimiento", 0.0), totales.get("total_multas", 0.0))
     }
 
     logger.info(f"Reporte exitoso {patente_norm}: {len(todos)} items | Total: ${total_general:,.2f}")
@@ -172,9 +240,12 @@ async def crear_costo_manual_json(data: CostoManualInput):
     costo_dict["patente"] = normalized_patente
     costo_dict["comprobante_file_id"] = None
     costo_dict["fecha"] = data.fecha if isinstance(data.fecha, datetime) else datetime.combine(data.fecha, datetime.min.time())  # ← Asegurar datetime si es date
+    costo_dict["fecha_evento"] = costo_dict["fecha"]  # ← Fecha normalizada para los reportes por rango
     
-    collection = get_db_collection("Mantenimiento" if data.origen == "Mantenimiento" else "Finanzas")
-    result = await collection.insert_one(costo_dict)
+    coleccion_nombre = "Mantenimiento" if data.origen == "Mantenimiento" else "Finanzas"
+    costo_dict.update(clasificar(costo_dict, coleccion_nombre))  # ← categoria / excluido para los reportes
+    result = await get_db_collection(coleccion_nombre).insert_one(costo_dict)
+    await registrar_escritura_costo(coleccion_nombre, despues=costo_dict)  # ← Libro Costos + rollup CostosMensuales
     
     logger.info(f"Costo creado: ID {result.inserted_id}")  # ← Logging éxito
     return CreateCostoResponse(
@@ -244,14 +315,17 @@ async def crear_costo_manual(
         "patente": normalized_patente,
         "tipo_costo": tipo_costo,
         "fecha": fecha_parsed,  # ← Guardado como datetime (consistente con safe_parse_date)
+        "fecha_evento": fecha_parsed,  # ← Fecha normalizada para los reportes por rango
         "descripcion": descripcion,
         "importe": importe,
         "origen": origen,
         "comprobante_file_id": file_id
     }
 
-    collection = get_db_collection("Mantenimiento" if origen == "Mantenimiento" else "Finanzas")
-    result = await collection.insert_one(costo_dict)
+    coleccion_nombre = "Mantenimiento" if origen == "Mantenimiento" else "Finanzas"
+    costo_dict.update(clasificar(costo_dict, coleccion_nombre))  # ← categoria / excluido para los reportes
+    result = await get_db_collection(coleccion_nombre).insert_one(costo_dict)
+    await registrar_escritura_costo(coleccion_nombre, despues=costo_dict)  # ← Libro Costos + rollup CostosMensuales
     
     logger.info(f"Costo creado exitosamente: _id={result.inserted_id}, file_id={file_id}")
 
@@ -261,6 +335,156 @@ async def crear_costo_manual(
         file_id=file_id
     )
 
+# =================================================================
+# ENDPOINT: ALTA DE COSTOS EN LOTE (ej: factura mensual del taller con N renglones)
+# =================================================================
+MAX_COSTOS_LOTE = 500
+MAX_COMPROBANTES_LOTE = 50
+MAX_TAMANO_COMPROBANTE = 50 * 1024 * 1024
+TIPOS_COMPROBANTE = ["application/pdf", "image/jpeg", "image/png"]
+
+_VALIDADOR_LOTE = TypeAdapter(List[CostoManualLoteItem])
+
+class CreateCostosLoteResponse(BaseModel):
+    message: str
+    costo_ids: List[str]            # mismo orden que el lote recibido
+    file_ids: List[Optional[str]]   # comprobante de cada fila (None si no tiene)
+    comprobantes_subidos: int       # archivos distintos guardados en GridFS
+
+    model_config = {"extra": "ignore"}
+
+async def _leer_lote(request: Request) -> Tuple[List[CostoManualLoteItem], list]:
+    """Costos validados con CostoManualInput y archivos recibidos (solo multipart)."""
+    comprobantes = []
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form = await request.form()
+        crudo = form.get("costos")
+        if not isinstance(crudo, str):
+            raise HTTPException(422, "Falta el campo 'costos' con el array de costos en JSON.")
+        try:
+            filas = json.loads(crudo)
+        except ValueError:
+            raise HTTPException(422, "El campo 'costos' no es JSON válido.")
+        comprobantes = [archivo for archivo in form.getlist("comprobantes") if not isinstance(archivo, str)]
+    else:
+        try:
+            filas = await request.json()
+        except ValueError:
+            raise HTTPException(422, "El cuerpo debe ser un array JSON de costos.")
+
+    if not isinstance(filas, list) or not 1 <= len(filas) <= MAX_COSTOS_LOTE:
+        raise HTTPException(422, f"Se espera un array de 1 a {MAX_COSTOS_LOTE} costos.")
+    if len(comprobantes) > MAX_COMPROBANTES_LOTE:
+        raise HTTPException(422, f"Máximo {MAX_COMPROBANTES_LOTE} comprobantes por lote.")
+    try:
+        costos = _VALIDADOR_LOTE.validate_python(filas)
+    except ValidationError as e:
+        raise HTTPException(422, e.errors(include_url=False, include_context=False))
+
+    for posicion, costo in enumerate(costos):
+        if costo.comprobante_index is not None and costo.comprobante_index >= len(comprobantes):
+            raise HTTPException(422, f"Costo {posicion}: comprobante_index {costo.comprobante_index} no existe ({len(comprobantes)} archivos recibidos).")
+    return costos, comprobantes
+
+async def _borrar_archivos(bucket: AsyncIOMotorGridFSBucket, file_ids: List[ObjectId]) -> None:
+    await asyncio.gather(*(bucket.delete(file_id) for file_id in file_ids), return_exceptions=True)
+
+async def _subir_comprobantes(
+    bucket: AsyncIOMotorGridFSBucket, comprobantes: list, costos: List[CostoManualLoteItem]
+) -> Dict[int, ObjectId]:
+    """
+    Sube en paralelo los archivos referenciados por algún costo. Los de contenido idéntico (sha256)
+    se guardan una sola vez y sus índices comparten file_id. Devuelve índice de archivo → file_id.
+    """
+    patentes_por_indice: Dict[int, set] = {}
+    for costo in costos:
+        if costo.comprobante_index is not None:
+            patentes_por_indice.setdefault(costo.comprobante_index, set()).add(costo.patente)
+
+    hash_por_indice: Dict[int, str] = {}
+    unicos: Dict[str, Dict[str, Any]] = {}
+    for indice in sorted(patentes_por_indice):
+        archivo = comprobantes[indice]
+        if archivo.size is not None and archivo.size > MAX_TAMANO_COMPROBANTE:
+            raise HTTPException(413, f"Comprobante {indice} ({archivo.filename}) demasiado grande: máximo 50MB.")
+        if archivo.content_type not in TIPOS_COMPROBANTE:
+            raise HTTPException(400, f"Comprobante {indice} ({archivo.filename}): solo PDF, JPG o PNG.")
+        contenido = await archivo.read()
+        huella = hashlib.sha256(contenido).hexdigest()
+        hash_por_indice[indice] = huella
+        unico = unicos.setdefault(huella, {"filename": archivo.filename, "contenido": contenido, "patentes": set()})
+        unico["patentes"] |= patentes_por_indice[indice]
+
+    def _metadata(patentes: set) -> Dict[str, Any]:
+        # metadata.patente solo si el archivo es de un único vehículo: limpieza_gridfs lo borra con él
+        if len(patentes) == 1:
+            return {"patente": next(iter(patentes)), "tipo": "comprobante_gasto"}
+        return {"tipo": "comprobante_gasto"}
+
+    ramas = {
+        huella: bucket.upload_from_stream(unico["filename"], unico["contenido"], metadata=_metadata(unico["patentes"]))
+        for huella, unico in unicos.items()
+    }
+    resultados = await en_paralelo(ramas)
+    subidos = [file_id for file_id in resultados.values() if not isinstance(file_id, Exception)]
+    if len(subidos) < len(resultados):
+        await _borrar_archivos(bucket, subidos)
+        raise HTTPException(500, "No se pudieron guardar los comprobantes del lote.")
+    return {indice: resultados[huella] for indice, huella in hash_por_indice.items()}
+
+@router.post("/manual/batch", response_model=CreateCostosLoteResponse, status_code=201)
+async def crear_costos_lote(request: Request):
+    """
+    Registra varios costos en una sola request. Cuerpo JSON: array de CostoManualInput. Multipart:
+    campo 'costos' con ese array en JSON y archivos 'comprobantes'; cada costo indica el suyo con
+    `comprobante_index` (posición del archivo). Todo el lote se valida antes de escribir, los
+    comprobantes se suben en paralelo sin duplicados y las filas se insertan con un insert_many por
+    colección dentro de una transacción: se guarda el lote completo o nada.
+    """
+    costos, comprobantes = await _leer_lote(request)
+    logger.info(f"Alta en lote: {len(costos)} costos, {len(comprobantes)} comprobantes")
+
+    bucket = await get_gridfs_bucket()
+    archivo_por_indice = await _subir_comprobantes(bucket, comprobantes, costos) if comprobantes else {}
+
+    # === DOCUMENTOS (mismo formato que /manual/json) ===
+    docs: List[Dict[str, Any]] = []
+    docs_por_coleccion: Dict[str, List[Dict[str, Any]]] = {}
+    for costo in costos:
+        file_id = archivo_por_indice.get(costo.comprobante_index)
+        costo_dict = costo.model_dump(exclude={"comprobante_index"})
+        costo_dict["fecha"] = datetime.combine(costo.fecha, datetime.min.time())
+        costo_dict["fecha_evento"] = costo_dict["fecha"]
+        costo_dict["comprobante_file_id"] = str(file_id) if file_id is not None else None
+        coleccion_nombre = "Mantenimiento" if costo.origen == "Mantenimiento" else "Finanzas"
+        costo_dict.update(clasificar(costo_dict, coleccion_nombre))
+        docs.append(costo_dict)
+        docs_por_coleccion.setdefault(coleccion_nombre, []).append(costo_dict)
+
+    # === INSERCIÓN: un insert_many por colección, todo o nada ===
+    try:
+        async with await get_mongo_client().start_session() as session:
+            async with session.start_transaction():
+                for coleccion_nombre, docs_coleccion in docs_por_coleccion.items():
+                    await get_db_collection(coleccion_nombre).insert_many(docs_coleccion, session=session)
+    except Exception as e:
+        logger.error(f"Alta en lote fallida: {e}")
+        await _borrar_archivos(bucket, list(set(archivo_por_indice.values())))
+        raise HTTPException(500, "Error de base de datos: no se registró ningún costo del lote.")
+
+    await asyncio.gather(*(
+        registrar_altas_costos(coleccion_nombre, docs_coleccion)  # ← Libro Costos + rollup CostosMensuales
+        for coleccion_nombre, docs_coleccion in docs_por_coleccion.items()
+    ))
+
+    logger.info(f"Lote registrado: {len(docs)} costos, {len(set(archivo_por_indice.values()))} comprobantes")
+    return CreateCostosLoteResponse(
+        message=f"{len(docs)} costos registrados correctamente",
+        costo_ids=[str(doc["_id"]) for doc in docs],
+        file_ids=[doc["comprobante_file_id"] for doc in docs],
+        comprobantes_subidos=len(set(archivo_por_indice.values())),
+    )
+
 # =================================================================
 # ENDPOINT: EDITAR COSTO MANUAL (reemplazo de comprobante si viene nuevo)
 # =================================================================
@@ -299,43 +523,32 @@ async def editar_gasto_manual(
     except:
         query_obj = {"_id": gasto_id}
 
-    # 3. BÚSQUEDA INTELIGENTE (Primary -> Secondary)
-    collection = primary_coll
-    target_name = primary_name
-    
-    gasto = await collection.find_one(query_obj)
-    
-    if not gasto:
-        # Si no está en la primaria, buscamos en la secundaria (Fallback)
-        logger.info(f"Gasto {gasto_id} no encontrado en {primary_name}. Buscando en {secondary_name}...")
-        collection = secondary_coll
-        target_name = secondary_name
-        gasto = await collection.find_one(query_obj)
-    
-    if not gasto:
-        # Si sigue sin aparecer, realmente no existe
-        raise HTTPException(404, f"Gasto no encontrado en ninguna colección (ID: {gasto_id})")
+    # 3. Datos de actualización por colección: Finanzas usa campos MAYÚSCULAS, Mantenimiento minúsculas
+    fecha_norm = parsear_fecha(fecha)
+    if fecha_norm is None:
+        raise HTTPException(status_code=422, detail=f"Fecha inválida: {fecha}. Usa formato válido (YYYY-MM-DD o similar).")
 
-    # 4. Preparar datos de actualización (Mapeo dinámico según donde lo encontramos)
-    # Si encontramos el gasto en Finanzas, usamos campos MAYÚSCULAS. Si es Mant, minúsculas.
-    if target_name == "Finanzas":
-        update_data = {
+    update_por_coleccion = {
+        "Finanzas": {
             "PATENTE": normalize_patente(patente),
             "TIPO": tipo_costo,
             "FECHA": fecha, # Asume formato compatible o string
             "DETALLE": descripcion,
-            "MONTO": importe
-        }
-    else: # Mantenimiento
-        update_data = {
+            "MONTO": importe,
+            "fecha_evento": fecha_norm
+        },
+        "Mantenimiento": {
             "patente": normalize_patente(patente),
             "tipo_costo": tipo_costo,
             "costo_fecha": fecha,
             "detalle": descripcion,
-            "costo_monto": importe
-        }
+            "costo_monto": importe,
+            "fecha_evento": fecha_norm
+        },
+    }
 
-    # 5. Manejo de archivo (Si viene uno nuevo)
+    # 4. Manejo de archivo (Si viene uno nuevo): se sube antes para que el update sea una sola operación
+    file_id = None
     if comprobante:
         bucket = await get_gridfs_bucket()
         file_content = await comprobante.read()
@@ -344,11 +557,28 @@ async def editar_gasto_manual(
             file_content,
             metadata={"patente": patente, "tipo": "comprobante_gasto"}
         )
-        update_data["comprobante_file_id"] = str(file_id)
+        for update_data in update_por_coleccion.values():
+            update_data["comprobante_file_id"] = str(file_id)
+
+    # 5. ACTUALIZACIÓN DIRECTA (Primary -> Secondary): sin find_one previo; el documento anterior que
+    #    devuelve find_one_and_update dice dónde estaba y alimenta el rollup CostosMensuales
+    target_name = primary_name
+    anterior = await primary_coll.find_one_and_update(query_obj, {"$set": update_por_coleccion[primary_name]})
+
+    if anterior is None:
+        # Si no está en la primaria, probamos en la secundaria (Fallback)
+        logger.info(f"Gasto {gasto_id} no encontrado en {primary_name}. Probando en {secondary_name}...")
+        target_name = secondary_name
+        anterior = await secondary_coll.find_one_and_update(query_obj, {"$set": update_por_coleccion[secondary_name]})
 
-    # 6. Ejecutar Actualización
-    await collection.update_one(query_obj, {"$set": update_data})
+    if anterior is None:
+        # Si sigue sin aparecer, realmente no existe: el comprobante subido queda huérfano y se borra
+        if file_id is not None:
+            await bucket.delete(file_id)
+        raise HTTPException(404, f"Gasto no encontrado en ninguna colección (ID: {gasto_id})")
 
+    # ← Reclasifica el documento editado (tipo / importe / detalle) y actualiza libro y rollup
+    await registrar_escritura_costo(target_name, antes=anterior, despues={**anterior, **update_por_coleccion[target_name]})
     return {"message": f"Gasto actualizado correctamente en {target_name}"}
 
 # ==================== BORRADO UNIVERSAL (CORREGIDO PARA IDs HÍBRIDOS) ====================
@@ -369,7 +599,8 @@ async def borrar_gasto_universal(
         logger.warning(f"Origen inválido intentado: {origen}")
         raise HTTPException(400, "Origen inválido: debe ser 'costos' o 'finanzas'")
 
-    collection = get_db_collection("Mantenimiento" if collection_name == "costos" else "Finanzas")
+    coleccion_nombre = "Mantenimiento" if collection_name == "costos" else "Finanzas"
+    collection = get_db_collection(coleccion_nombre)
     
     # Lógica híbrida para _id (try ObjectId primero, fallback a string si falla)
     filter_query = {}
@@ -381,12 +612,13 @@ async def borrar_gasto_universal(
         filter_query = {"_id": gasto_id}  # Usar directamente como string (UUID u otro)
         logger.info(f"Fallback a string ID (no es ObjectId válido): {gasto_id} ({collection_name}) - Razón: {e}")
     
-    # Ejecución asíncrona del delete
-    result = await collection.delete_one(filter_query)
+    # Ejecución asíncrona del delete (devuelve el documento borrado para descontarlo del rollup)
+    eliminado = await collection.find_one_and_delete(filter_query)
     
-    if result.deleted_count == 0:
+    if eliminado is None:
         logger.warning(f"Gasto no encontrado: {gasto_id} en {collection_name}")
         raise HTTPException(404, "Gasto no encontrado")
+    await registrar_escritura_costo(coleccion_nombre, antes=eliminado)
     
     logger.info(f"Gasto eliminado correctamente: {gasto_id} ({collection_name}) - Fecha: {datetime.now()}")
     return {"message": "Gasto eliminado correctamente"}
\ No newline at end of file
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, HTTPException, status, Path
+from fastapi import APIRouter, HTTPException, status, Path, Request, Response
 from typing import List, Optional
 from datetime import datetime
 from pydantic import BaseModel, Field
 from dateutil.parser import parse
-from dependencies import get_db_collection, normalize_patente
+from dependencies import (
+    get_db_collection, normalize_patente, refrescar_alertas_vencimiento,
+    incrementar_version, version_coleccion, etag_para, responder_si_no_modificado
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -48,11 +51,21 @@ class VencimientoUpdate(BaseModel):
 # =============================================================================
 
 @router.get("/{patente}", response_model=List[DocumentoResponse])
-async def listar_documentos_vehiculo(patente: str = Path(..., description="Patente del vehículo")):
+async def listar_documentos_vehiculo(
+    request: Request,
+    response: Response,
+    patente: str = Path(..., description="Patente del vehículo")
+):
     """
     Lista todos los documentos de vencimiento del vehículo (usado para mostrar y editar fechas).
+    Responde 304 si el If-None-Match coincide con la versión actual de Documentacion.
     """
     normalized_patente = normalize_patente(patente)
+    etag = etag_para("Documentacion", await version_coleccion("Documentacion"), normalized_patente)
+    no_modificado = responder_si_no_modificado(request, response, etag)
+    if no_modificado:
+        return no_modificado
+
     collection = get_db_collection("Documentacion")
 
     documentos = await collection.find(
@@ -136,6 +149,9 @@ async def actualizar_fecha_vencimiento(
         upsert=True
     )
 
+    await incrementar_version("Documentacion")
+    await refrescar_alertas_vencimiento(normalized_patente)
+
     if result.upserted_id:
         logger.info(f"NUEVO documento creado en BD (Upsert): {normalized_patente} - {tipo_busqueda} → {data.fecha_vencimiento}")
     else:
@@ -165,6 +181,9 @@ async def crear_documento(
     doc["patente"] = normalized_patente
 
     result = await collection.insert_one(doc)
+    await incrementar_version("Documentacion")
+    if data.fecha_vencimiento:
+        await refrescar_alertas_vencimiento(normalized_patente)
     logger.info(f"Nuevo documento creado: {normalized_patente} - {data.tipo_documento}")
 
     return {"id": str(result.inserted_id), "message": "Documento creado correctamente"}
\ No newline at end of file
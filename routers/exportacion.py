@@ -0,0 +1,114 @@
+# routers/exportacion.py
+# Exportación contable de costos (Mantenimiento + Finanzas) por rango de fecha_evento.
+# Las filas salen de los mismos cursores que GET /costos/unificado en modo NDJSON (stream_filas_gastos)
+# y se escriben a medida que llegan: el proceso nunca junta el período completo en memoria.
+# CSV: cada fila se envía apenas se lee. XLSX: openpyxl en modo write_only (vuelca las filas a disco)
+# en un hilo del threadpool, por lotes, y el archivo se envía por bloques al terminar, porque el
+# formato no se puede cerrar antes.
+
+import io
+import os
+import csv
+import logging
+import tempfile
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Literal
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from routers.costos import stream_filas_gastos
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/export", tags=["Exportación"])
+
+# Columnas del archivo, en orden (claves de las filas de stream_filas_gastos)
+COLUMNAS_EXPORTACION = ["fecha", "patente", "origen", "tipo", "descripcion", "importe", "id", "comprobante_file_id"]
+
+MEDIA_CSV = "text/csv; charset=utf-8"
+MEDIA_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+TAMANO_BLOQUE = 64 * 1024  # bytes por bloque al enviar el XLSX
+FILAS_POR_LOTE_XLSX = 1000  # filas que se escriben en el libro por cada pasada al threadpool
+
+
+def _valores(fila: Dict[str, Any]) -> List[Any]:
+    return [fila.get(columna) for columna in COLUMNAS_EXPORTACION]
+
+
+def _filas_periodo(desde: datetime, hasta: datetime) -> AsyncIterator[Dict[str, Any]]:
+    # Cursores ordenados por el índice (fecha_evento): sin $sort de toda la flota en Mongo
+    return stream_filas_gastos({"fecha_evento": {"$gte": desde, "$lt": hasta}})
+
+
+async def _stream_csv(desde: datetime, hasta: datetime) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNAS_EXPORTACION)
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")  # BOM: Excel abre el CSV como UTF-8
+
+    async for fila in _filas_periodo(desde, hasta):
+        buffer.seek(0)
+        buffer.truncate(0)
+        writer.writerow(_valores(fila))
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _agregar_filas(hoja, filas: List[List[Any]]) -> None:
+    for fila in filas:
+        hoja.append(fila)
+
+
+async def _stream_xlsx(desde: datetime, hasta: datetime, workbook_cls) -> AsyncIterator[bytes]:
+    # openpyxl serializa y escribe a disco en append(): se corre en el threadpool, no en el event loop
+    libro = workbook_cls(write_only=True)
+    hoja = libro.create_sheet("Costos")
+    lote = [COLUMNAS_EXPORTACION]
+    async for fila in _filas_periodo(desde, hasta):
+        lote.append(_valores(fila))
+        if len(lote) >= FILAS_POR_LOTE_XLSX:
+            await run_in_threadpool(_agregar_filas, hoja, lote)
+            lote = []
+    await run_in_threadpool(_agregar_filas, hoja, lote)
+
+    descriptor, ruta = tempfile.mkstemp(suffix=".xlsx")
+    os.close(descriptor)
+    try:
+        await run_in_threadpool(libro.save, ruta)
+        with open(ruta, "rb") as archivo:
+            while bloque := await run_in_threadpool(archivo.read, TAMANO_BLOQUE):
+                yield bloque
+    finally:
+        os.remove(ruta)
+
+
+@router.get("/costos", summary="Exporta los costos de la flota de un período (CSV o XLSX).")
+async def exportar_costos(
+    desde: str = Query(..., description="Fecha inicio YYYY-MM-DD"),
+    hasta: str = Query(..., description="Fecha fin YYYY-MM-DD (inclusive)"),
+    formato: Literal["csv", "xlsx"] = Query("csv", description="Formato del archivo")
+):
+    """
+    Mismas filas y normalización que GET /costos/unificado/{patente}, para todas las patentes,
+    filtradas por fecha_evento y ordenadas por fecha (más reciente primero).
+    """
+    try:
+        desde_dt = datetime.strptime(desde, "%Y-%m-%d")
+        hasta_dt = datetime.strptime(hasta, "%Y-%m-%d") + timedelta(days=1)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Formato de fecha inválido. Usa YYYY-MM-DD")
+    if desde_dt >= hasta_dt:
+        raise HTTPException(status_code=400, detail="'desde' debe ser anterior o igual a 'hasta'.")
+
+    nombre = f"costos_{desde}_{hasta}.{formato}"
+    headers = {"Content-Disposition": f'attachment; filename="{nombre}"', "Cache-Control": "no-cache"}
+    logger.info(f"Exportación de costos {desde} → {hasta} en {formato}")
+
+    if formato == "csv":
+        return StreamingResponse(_stream_csv(desde_dt, hasta_dt), media_type=MEDIA_CSV, headers=headers)
+
+    try:
+        from openpyxl import Workbook  # solo la usa la exportación XLSX
+    except ImportError:
+        raise HTTPException(status_code=501, detail="Exportación XLSX no disponible: falta instalar openpyxl.")
+    return StreamingResponse(_stream_xlsx(desde_dt, hasta_dt, Workbook), media_type=MEDIA_XLSX, headers=headers)
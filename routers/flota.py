@@ -1,12 +1,19 @@
-from fastapi import APIRouter, HTTPException, Query, status, Response
-from fastapi.responses import FileResponse
-from typing import List, Optional, Any, Dict
+from fastapi import APIRouter, HTTPException, Query, status, Response, Request, BackgroundTasks
+import asyncio
+from fastapi.responses import FileResponse, JSONResponse
+from fastapi.encoders import jsonable_encoder
+from typing import AsyncIterator, List, Optional, Any, Dict, Literal
 from datetime import datetime, timedelta
 import math
 from bson.objectid import ObjectId
 import os
 import re
+import io
+import csv
+import json
 import logging
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from pydantic import BaseModel, Field
 from dependencies import get_db_collection, normalize_patente
 from dateutil.parser import parse
@@ -14,7 +21,7 @@ from dateutil.parser import parse
 logger = logging.getLogger(__name__)
 
 # Importaciones de Pydantic (Asumidas si se usan modelos de Input)
-from pydantic import BaseModel, Field, ConfigDict # 🔑 NECESARIO PARA VEHICULOCREATEINPUT
+from pydantic import BaseModel, Field, ConfigDict, ValidationError # 🔑 NECESARIO PARA VEHICULOCREATEINPUT
 
 # Importaciones desde el módulo de dependencias
 from dependencies import (
@@ -26,7 +33,43 @@ from dependencies import (
     CostoManualDelete,
     # NUEVOS MODELOS DE RESPUESTA AÑADIDOS
     DashboardResponse,
-    ReportePeriodoResponse
+    ReportePeriodoResponse,
+    DatoAgregado,
+    ReporteComparativoInput,
+    ComparativoVehiculo,
+    ReporteComparativoResponse,
+    refrescar_alertas_vencimiento,
+    registrar_escritura_costo,
+    registrar_borrado_masivo_costos,
+    codificar_cursor,
+    decodificar_cursor,
+    incrementar_version,
+    etag_para,
+    responder_si_no_modificado,
+    get_mongo_client,
+    en_paralelo,
+    resultado_rama,
+    libro_costos_completo,
+    pide_ndjson,
+    linea_ndjson,
+    respuesta_ndjson,
+    fusionar_ordenados
+)
+from costos_mensuales import COLECCION_COSTOS_MENSUALES, PROYECCION_COSTO_MANTENIMIENTO, PROYECCION_COSTO_FINANZAS
+from clasificacion_costos import EXCLUSION_SIN_IMPORTE, FILTRO_INCLUIDO
+from libro_costos import COLECCION_COSTOS
+from limpieza_gridfs import (
+    REFERENCIAS_ARCHIVOS, archivos_referenciados, archivos_del_vehiculo,
+    crear_tarea_limpieza, ejecutar_limpieza, obtener_tarea
+)
+from alertas_vencimiento import COLECCION_ALERTAS, normalizar_tipo_vencimiento
+from busqueda_vehiculos import (
+    campos_busqueda, etapas_actualizar_busqueda, tokens_de_busqueda, GRUPO_POR_CAMPO_API
+)
+from replica_flota import replica_flota
+from esquema_vehiculos import (
+    VERSION_ESQUEMA_VEHICULO, CAMPOS_API, CAMPOS_LEGADOS, ETAPA_INCREMENTO_REVISION, claves_legadas, valor_canonico,
+    vehiculo_desde_doc
 )
 
 # Define el router de FastAPI
@@ -67,129 +110,158 @@ class AlertaVencimiento(BaseModel):
     movil_nro: str | None = None
     descripcion_modelo: str | None = None
 
-async def get_vencimientos_criticos_alertas(
+# Umbral de prioridad CRÍTICA por tipo normalizado (tomado de VENCIMIENTO_MAP).
+# Los tipos sin umbral declarado solo son CRÍTICOS cuando ya vencieron (o vencen hoy).
+DIAS_CRITICO_POR_TIPO: Dict[str, int] = {
+    normalizar_tipo_vencimiento(tipo): config["dias_critico"]
+    for tipo, config in VENCIMIENTO_MAP.items()
+}
+
+def _pipeline_vencimientos_criticos(
+    now: datetime,
+    fecha_limite: datetime,
+    patente: str | None
+) -> List[Dict[str, Any]]:
+    """
+    Lectura por rango sobre la colección materializada AlertasVencimiento (índice en
+    fecha_vencimiento): calcula días restantes y prioridad según dias_critico de cada tipo.
+    La deduplicación y los datos del vehículo ya vienen resueltos en la fila; el orden y la
+    paginación los agrega quien llama.
+    """
+    filtro: Dict[str, Any] = {"fecha_vencimiento": {"$lte": fecha_limite}}
+    if patente:
+        filtro["patente"] = patente
+
+    dias_critico_switch = {
+        "$switch": {
+            "branches": [
+                {"case": {"$eq": ["$tipo_documento", tipo]}, "then": dias}
+                for tipo, dias in DIAS_CRITICO_POR_TIPO.items()
+            ],
+            "default": 0
+        }
+    }
+
+    return [
+        {"$match": filtro},
+        {"$addFields": {
+            "dias_restantes": {"$floor": {"$divide": [{"$subtract": ["$fecha_vencimiento", now]}, 86400000]}}
+        }},
+        {"$addFields": {
+            "prioridad_orden": {"$cond": [{"$lte": ["$dias_restantes", dias_critico_switch]}, 0, 1]}
+        }}
+    ]
+
+# Clave de orden de las alertas: también es la clave del cursor (keyset). Solo campos guardados:
+# dias_restantes y la prioridad dependen de la hora del request y moverían una alerta de página
+# entre dos pedidos (siempre al pasar la medianoche); se calculan solo para mostrar.
+# tipo_documento desempata alertas de la misma patente con igual vencimiento.
+ORDEN_ALERTAS = {"fecha_vencimiento": 1, "patente": 1, "tipo_documento": 1}
+
+def _filtro_despues_de_cursor(valores: List[Any], orden: Dict[str, int] = ORDEN_ALERTAS) -> Dict[str, Any]:
+    """$match que deja solo los documentos posteriores (según `orden`, 1 o -1 por campo) al último entregado."""
+    campos = list(orden.keys())
+    condiciones = []
+    for i, campo in enumerate(campos):
+        condicion = {campos[j]: valores[j] for j in range(i)}
+        condicion[campo] = {"$gt" if orden[campo] == 1 else "$lt": valores[i]}
+        condiciones.append(condicion)
+    return {"$or": condiciones}
+
+def _decodificar_cursor_alertas(cursor: str) -> List[Any]:
+    """Valores de ORDEN_ALERTAS del cursor; fecha_vencimiento viaja como texto ISO."""
+    valores = decodificar_cursor(cursor, len(ORDEN_ALERTAS))
+    try:
+        valores[0] = datetime.fromisoformat(valores[0])
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Cursor de paginación inválido.")
+    return valores
+
+def _alerta_desde_fila(fila: Dict[str, Any]) -> Alerta:
+    """Construye la Alerta a partir de una fila de AlertasVencimiento ya priorizada por el pipeline."""
+    tipo_norm = fila["tipo_documento"]
+    dias = int(fila["dias_restantes"])
+
+    if dias < 0:
+        mensaje = f"VENCIDO hace {-dias} días"
+    elif dias == 0:
+        mensaje = "VENCE HOY"
+    else:
+        mensaje = f"Quedan {dias} días"
+
+    return Alerta(
+        patente=fila["patente"],
+        tipo_documento=tipo_norm,
+        fecha_vencimiento=fila["fecha_vencimiento"].isoformat(),
+        dias_restantes=dias,
+        mensaje=f"{mensaje} para {tipo_norm}",
+        prioridad="CRÍTICA" if fila["prioridad_orden"] == 0 else "ALTA",
+        movil_nro=fila.get("movil_nro") or "Sin móvil",
+        descripcion_modelo=fila.get("descripcion_modelo") or "Sin modelo"
+    )
+
+async def get_pagina_alertas_criticas(
     dias_tolerancia: int = 30,
     skip: int = 0,
     limit: int = 10,
-    patente: str | None = None
-) -> List[Alerta]:
-    
-    db_documentacion = get_db_collection("Documentacion")
-    db_vehiculos = get_db_collection("Vehiculos")
+    patente: str | None = None,
+    cursor: str | None = None
+) -> Dict[str, Any]:
+    """
+    Devuelve una página de alertas (una por patente + tipo) y el total exacto en un único
+    viaje a MongoDB ($facet). Con `cursor` la página arranca después de la última alerta
+    entregada (keyset), así que cada página cuesta lo mismo que la primera.
+    """
+    db_alertas = get_db_collection(COLECCION_ALERTAS)
 
     now = datetime.utcnow()
     fecha_limite = now + timedelta(days=dias_tolerancia)
-    
-    alertas_dict: Dict[str, Alerta] = {} 
-
-    filtro_doc = {
-        "tipo_documento": {"$in": ["SEGURO", "Poliza_Detalle", "VTV"]},
-        "fecha_vencimiento": {"$ne": None, "$lte": fecha_limite} 
-    }
-    
-    if patente:
-        filtro_doc["patente"] = normalize_patente(patente)
-
-    cursor_doc = db_documentacion.find(filtro_doc).skip(skip).limit(limit)
-    docs = await cursor_doc.to_list(length=limit)
+    patente_norm = normalize_patente(patente) if patente else None
+
+    etapas_pagina: List[Dict[str, Any]] = []
+    if cursor:
+        etapas_pagina.append({"$match": _filtro_despues_de_cursor(_decodificar_cursor_alertas(cursor))})
+    etapas_pagina += [{"$sort": ORDEN_ALERTAS}, {"$skip": skip}, {"$limit": limit}]
+
+    pipeline = _pipeline_vencimientos_criticos(now, fecha_limite, patente_norm) + [
+        {"$facet": {
+            "alertas": etapas_pagina,
+            "total": [{"$count": "total"}]
+        }}
+    ]
+    resultado = (await db_alertas.aggregate(pipeline).to_list(length=1))[0]
 
-    for doc in docs:
-        patente_doc = doc["patente"]
-        tipo = doc["tipo_documento"]
-        fecha_vto = doc["fecha_vencimiento"]
-        dias = (fecha_vto - now).days
+    filas = resultado["alertas"]
+    next_cursor = None
+    if len(filas) == limit:
+        ultima = filas[-1]
+        next_cursor = codificar_cursor([ultima["fecha_vencimiento"].isoformat(), ultima["patente"], ultima["tipo_documento"]])
 
-        tipo_norm = "SEGURO" if tipo in ["SEGURO", "Poliza_Detalle"] else tipo
+    return {
+        "alertas": [_alerta_desde_fila(fila) for fila in filas],
+        "total": resultado["total"][0]["total"] if resultado["total"] else 0,
+        "next_cursor": next_cursor
+    }
 
-        # 💡 FIX: Evitar falsos positivos si existe una póliza renovada
-        tipos_busqueda = ["SEGURO", "Poliza_Detalle"] if tipo_norm == "SEGURO" else [tipo]
-        doc_vigente = await db_documentacion.find_one({
-            "patente": patente_doc,
-            "tipo_documento": {"$in": tipos_busqueda},
-            "fecha_vencimiento": {"$gt": fecha_limite}
-        })
-        if doc_vigente:
-            continue # Si hay una vigente, ignoramos esta vieja
+async def get_vencimientos_criticos_alertas(
+    dias_tolerancia: int = 30,
+    skip: int = 0,
+    limit: int = 10,
+    patente: str | None = None
+) -> List[Alerta]:
+    """Atajo para dashboard y reportes: solo la lista de alertas, sin total ni cursor."""
+    db_alertas = get_db_collection(COLECCION_ALERTAS)
 
-        if dias <= 0:
-            prioridad = "CRÍTICA"
-            mensaje = f"VENCIDO hace {-dias} días" if dias < 0 else "VENCE HOY"
-        else:
-            prioridad = "ALTA"
-            mensaje = f"Quedan {dias} días"
+    now = datetime.utcnow()
+    fecha_limite = now + timedelta(days=dias_tolerancia)
+    patente_norm = normalize_patente(patente) if patente else None
 
-        veh = await db_vehiculos.find_one({"_id": patente_doc})
-        if veh:
-            movil_nro = veh.get("nro_movil") or veh.get("NRO_MOVIL") or "Sin móvil"
-            desc_modelo = veh.get("descripcion_modelo") or veh.get("DESCRIPCION_MODELO") or "Sin modelo"
-        else:
-            movil_nro = "Sin móvil"
-            desc_modelo = "Sin modelo"
-
-        key = f"{patente_doc}_{tipo_norm}"
-        alertas_dict[key] = Alerta(
-            patente=patente_doc,
-            tipo_documento=tipo_norm,
-            fecha_vencimiento=fecha_vto.isoformat(),
-            dias_restantes=dias,
-            mensaje=f"{mensaje} para {tipo_norm}",
-            prioridad=prioridad,
-            movil_nro=movil_nro,
-            descripcion_modelo=desc_modelo
-        )
+    pipeline = _pipeline_vencimientos_criticos(now, fecha_limite, patente_norm) + [
+        {"$sort": ORDEN_ALERTAS}, {"$skip": skip}, {"$limit": limit}
+    ]
+    filas = await db_alertas.aggregate(pipeline).to_list(length=limit)
 
-    remaining = limit - len(alertas_dict)
-    if remaining > 0:
-        filtro_veh = {}
-        if patente:
-            filtro_veh["_id"] = normalize_patente(patente)
-            
-        cursor_veh = db_vehiculos.find(filtro_veh, 
-            {'_id': 1, 'nro_movil': 1, 'descripcion_modelo': 1, 'documentos_digitales': 1}).skip(skip).limit(remaining)
-        vehiculos = await cursor_veh.to_list(length=remaining)
-
-        for veh in vehiculos:
-            patente_veh = veh.get('_id')
-            movil_nro = veh.get('nro_movil') or veh.get('NRO_MOVIL')
-            desc_modelo = veh.get('descripcion_modelo') or veh.get('DESCRIPCION_MODELO')
-
-            for doc in veh.get('documentos_digitales', []):
-                tipo = doc.get("tipo")
-                fecha_str = doc.get("fecha_vencimiento")
-                if not fecha_str: continue
-
-                try: fecha_vto = parse(fecha_str)
-                except: continue
-
-                tipo_norm = "SEGURO" if "SEGURO" in tipo.upper() or "POLIZA" in tipo.upper() else tipo
-                key = f"{patente_veh}_{tipo_norm}"
-
-                if key in alertas_dict: continue 
-
-                dias = (fecha_vto - now).days
-                if dias > dias_tolerancia: continue
-
-                if dias <= 0:
-                    prioridad = "CRÍTICA"
-                    mensaje = f"VENCIDO hace {-dias} días" if dias < 0 else "VENCE HOY"
-                else:
-                    prioridad = "ALTA"
-                    mensaje = f"Quedan {dias} días"
-
-                alertas_dict[key] = Alerta(
-                    patente=patente_veh,
-                    tipo_documento=tipo_norm,
-                    fecha_vencimiento=fecha_vto.isoformat(),
-                    dias_restantes=dias,
-                    mensaje=f"{mensaje} para {tipo_norm}",
-                    prioridad=prioridad,
-                    movil_nro=movil_nro,
-                    descripcion_modelo=desc_modelo
-                )
-
-    alertas = list(alertas_dict.values())
-    alertas.sort(key=lambda a: (0 if a.prioridad == "CRÍTICA" else 1, a.dias_restantes or 9999))
-    return alertas
+    return [_alerta_desde_fila(fila) for fila in filas]
 
 
 @router.get("/alertas/criticas")
@@ -197,18 +269,10 @@ async def get_alertas_criticas(
     dias_tolerancia: int = Query(30, description="Días para alerta ALTA"),
     skip: int = Query(0, ge=0, description="Número de alertas a saltar"),
     limit: int = Query(10, ge=1, le=200, description="Máximo de alertas por página"),
-    patente: str | None = Query(None, description="Filtrar por patente (normalizada)")
+    patente: str | None = Query(None, description="Filtrar por patente (normalizada)"),
+    cursor: str | None = Query(None, description="Cursor opaco (next_cursor de la página anterior)")
 ):
-    # 💡 FIX: Pedimos todas sin paginación temporalmente para saber el total real sin duplicados
-    todas_alertas = await get_vencimientos_criticos_alertas(dias_tolerancia, 0, 1000, patente)
-    
-    total = len(todas_alertas)
-    alertas_paginadas = todas_alertas[skip : skip + limit]
-
-    return {
-        "alertas": alertas_paginadas,
-        "total": total
-    }
+    return await get_pagina_alertas_criticas(dias_tolerancia, skip, limit, patente, cursor)
 
 # =========================================================================
 # 2. ENDPOINTS: VEHÍCULOS (CRUD)
@@ -229,6 +293,44 @@ class VencimientoUpdate(BaseModel):
             except Exception: raise ValueError("Fecha inválida. Usa formato YYYY-MM-DD")
         raise ValueError("Fecha debe ser string o datetime")
 
+def _documento_vehiculo_nuevo(data: "VehiculoCreateInput", tipo_registro: str) -> Dict[str, Any]:
+    """Documento canónico completo (con search_tokens) para el alta de un vehículo."""
+    vehiculo_doc = {
+        "_id": normalize_patente(data.patente),
+        "patente_original": data.patente.upper(),
+        "activo": data.activo,
+        "documentos_digitales": [],
+        "tipo_registro": tipo_registro,
+        "schema_version": VERSION_ESQUEMA_VEHICULO,
+    }
+    datos_input = data.model_dump(exclude={"patente", "activo"})
+    vehiculo_doc.update({campo: valor_canonico(datos_input, campo) for campo in datos_input})
+    vehiculo_doc.update(campos_busqueda(vehiculo_doc))
+    return vehiculo_doc
+
+def _pipeline_actualizar_vehiculo(update_fields: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Update con pipeline para campos parciales de un vehículo: valores canónicos como $literal,
+    search_tokens recalculado en la misma operación, claves legadas del campo eliminadas y la
+    revisión incrementada (esquema_vehiculos.operacion_migrar no pisa la edición).
+    """
+    # Los campos son los canónicos (esquema_vehiculos); activo no tiene variante legada
+    valores = {
+        campo: (valor_canonico(update_fields, campo) if campo in CAMPOS_LEGADOS else valor)
+        for campo, valor in update_fields.items()
+    }
+    grupos_busqueda = {
+        GRUPO_POR_CAMPO_API[campo]: valor for campo, valor in update_fields.items() if campo in GRUPO_POR_CAMPO_API
+    }
+    pipeline = [
+        {"$set": {campo: {"$literal": valor} for campo, valor in valores.items()}}
+    ] + etapas_actualizar_busqueda(grupos_busqueda)
+    # En documentos sin migrar, la clave legada (ej: NRO_MOVIL) ganaría sobre el valor recién escrito
+    legadas = claves_legadas(list(valores))
+    if legadas:
+        pipeline.append({"$unset": legadas})
+    return pipeline + [ETAPA_INCREMENTO_REVISION]
+
 class VehiculoCreateInput(BaseModel):
     patente: str = Field(..., description="Patente original del vehículo (Ej: AA123ZZ).")
     activo: bool = Field(True, description="Estado de actividad del vehículo.")
@@ -249,54 +351,168 @@ async def create_vehiculo(data: VehiculoCreateInput):
     db_vehiculos = get_db_collection("Vehiculos")
     patente_normalizada = normalize_patente(data.patente)
     
-    if await db_vehiculos.find_one({"_id": patente_normalizada}):
+    if await replica_flota.existe(patente_normalizada):
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail=f"Ya existe un vehículo con la patente {data.patente.upper()}."
         )
     
-    vehiculo_doc = {
-        "_id": patente_normalizada,
-        "patente_original": data.patente.upper(),
-        "activo": data.activo,
-        "ANIO": data.anio,
-        "COLOR": data.color,
-        "MARCA": data.marca,       
-        "MODELO": data.modelo,     
-        "TIPO": data.tipo,         
-        "DESCRIPCION_MODELO": data.descripcion_modelo,
-        "NRO_MOVIL": data.nro_movil,
-        "TIPO_COMBUSTIBLE": data.tipo_combustible,
-        "documentos_digitales": [],
-        "tipo_registro": "MANUAL_CREADO",
-    }
+    vehiculo_doc = _documento_vehiculo_nuevo(data, "MANUAL_CREADO")
     
     try:
         await db_vehiculos.insert_one(vehiculo_doc)
+    except DuplicateKeyError:
+        # Alta concurrente entre la verificación en la réplica y el insert
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Ya existe un vehículo con la patente {data.patente.upper()}."
+        )
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error al insertar: {str(e)}")
-    
-    new_vehiculo = await db_vehiculos.find_one({"_id": patente_normalizada})
-    
-    if not new_vehiculo:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Vehículo insertado pero no encontrado inmediatamente después.")
-
-    vehiculo_data = {
-        "patente": new_vehiculo.get("_id"), 
-        "patente_original": new_vehiculo.get("patente_original"),
-        "activo": new_vehiculo.get("activo", False),
-        "anio": new_vehiculo.get("ANIO"),
-        "color": new_vehiculo.get("COLOR"),
-        "marca": new_vehiculo.get("MARCA") or new_vehiculo.get("marca"), 
-        "modelo": new_vehiculo.get("MODELO") or new_vehiculo.get("DESCRIPCION_MODELO") or new_vehiculo.get("modelo"), 
-        "tipo": new_vehiculo.get("TIPO") or new_vehiculo.get("tipo"),    
-        "descripcion_modelo": new_vehiculo.get("DESCRIPCION_MODELO"),
-        "nro_movil": new_vehiculo.get("NRO_MOVIL"),
-        "tipo_combustible": new_vehiculo.get("TIPO_COMBUSTIBLE"),
-        "documentos_digitales": new_vehiculo.get("documentos_digitales", []),
-    }
-    
-    return Vehiculo(**vehiculo_data)
+
+    # El documento insertado es exactamente vehiculo_doc: la respuesta se arma sin releer
+    await replica_flota.registrar(vehiculo_doc)
+    return Vehiculo(**vehiculo_desde_doc(vehiculo_doc))
+
+# --- ALTA MASIVA (POST /vehiculos/bulk) ---
+
+MAX_FILAS_BULK = 2000
+
+class ResultadoFilaBulk(BaseModel):
+    fila: int = Field(..., description="Número de fila (1 = primera fila de datos).")
+    patente: Optional[str] = None
+    estado: str = Field(..., description="creado | actualizado | sin_cambios | no_encontrado | error")
+    detalle: Optional[str] = None
+
+class ResultadoBulkVehiculos(BaseModel):
+    total: int
+    creados: int
+    actualizados: int
+    no_encontrados: int
+    errores: int
+    resultados: List[ResultadoFilaBulk]
+
+def _filas_bulk(cuerpo: bytes, content_type: str) -> List[Dict[str, Any]]:
+    """Parsea el cuerpo NDJSON o CSV (coma o punto y coma). Las celdas vacías se omiten."""
+    texto = cuerpo.decode("utf-8-sig")
+    if "csv" in content_type:
+        lineas = texto.splitlines()
+        try:
+            dialecto = csv.Sniffer().sniff(lineas[0], delimiters=",;") if lineas else csv.excel
+        except csv.Error:
+            dialecto = csv.excel
+        return [
+            {clave.strip(): valor.strip() for clave, valor in fila.items() if clave and valor and valor.strip()}
+            for fila in csv.DictReader(io.StringIO(texto), dialect=dialecto)
+        ]
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        filas = []
+        for numero, linea in enumerate(texto.splitlines(), start=1):
+            if not linea.strip():
+                continue
+            try:
+                fila = json.loads(linea)
+            except json.JSONDecodeError as e:
+                raise HTTPException(status_code=400, detail=f"Línea {numero} no es JSON válido: {e.msg}")
+            filas.append({k: v for k, v in fila.items() if v is not None} if isinstance(fila, dict) else fila)
+        return filas
+    raise HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail="Content-Type debe ser application/x-ndjson o text/csv"
+    )
+
+@router.post("/vehiculos/bulk", response_model=ResultadoBulkVehiculos, summary="Alta/actualización masiva de vehículos desde NDJSON o CSV.")
+async def bulk_vehiculos(request: Request):
+    """
+    Cada fila tiene la forma de VehiculoCreateInput. Patentes nuevas se insertan completas
+    ($setOnInsert, no pisan un alta concurrente); las existentes reciben solo los campos
+    informados, con el mismo pipeline que el PATCH. Todo va en un único bulk_write no ordenado.
+    """
+    filas = _filas_bulk(await request.body(), request.headers.get("content-type", "").lower())
+    if len(filas) > MAX_FILAS_BULK:
+        raise HTTPException(status_code=413, detail=f"Máximo {MAX_FILAS_BULK} vehículos por lote (recibidos {len(filas)}).")
+
+    resultados: List[ResultadoFilaBulk] = []
+    operaciones: List[UpdateOne] = []
+    resultado_por_operacion: List[ResultadoFilaBulk] = []
+    refrescar_alertas: List[str] = []
+    vistas: set = set()
+
+    for numero, fila in enumerate(filas, start=1):
+        try:
+            data = VehiculoCreateInput.model_validate(fila)
+        except ValidationError as e:
+            errores = "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+            patente_fila = fila.get("patente") if isinstance(fila, dict) else None
+            resultados.append(ResultadoFilaBulk(fila=numero, patente=patente_fila, estado="error", detalle=errores))
+            continue
+
+        patente_norm = normalize_patente(data.patente)
+        if patente_norm in vistas:
+            resultados.append(ResultadoFilaBulk(fila=numero, patente=patente_norm, estado="error", detalle="Patente repetida en el lote."))
+            continue
+        vistas.add(patente_norm)
+
+        resultado = ResultadoFilaBulk(fila=numero, patente=patente_norm, estado="creado")
+        if await replica_flota.existe(patente_norm):
+            campos = data.model_dump(exclude_unset=True, exclude={"patente"})
+            if not campos:
+                resultado.estado = "sin_cambios"
+                resultados.append(resultado)
+                continue
+            resultado.estado = "actualizado"
+            operaciones.append(UpdateOne({"_id": patente_norm}, _pipeline_actualizar_vehiculo(campos)))
+            if "nro_movil" in campos or "descripcion_modelo" in campos:
+                refrescar_alertas.append(patente_norm)
+        else:
+            doc = _documento_vehiculo_nuevo(data, "IMPORTACION_BULK")
+            doc.pop("_id")
+            operaciones.append(UpdateOne({"_id": patente_norm}, {"$setOnInsert": doc}, upsert=True))
+        resultados.append(resultado)
+        resultado_por_operacion.append(resultado)
+
+    if operaciones:
+        try:
+            result = await get_db_collection("Vehiculos").bulk_write(operaciones, ordered=False)
+            detalles = result.bulk_api_result
+        except BulkWriteError as e:
+            detalles = e.details
+        for error in detalles.get("writeErrors", []):
+            resultado = resultado_por_operacion[error["index"]]
+            resultado.estado = "error"
+            resultado.detalle = error.get("errmsg")
+        # Un alta sin upsert significa que otro proceso la creó entre la verificación y el bulk_write
+        insertados = {u["index"] for u in detalles.get("upserted", [])}
+        for indice, resultado in enumerate(resultado_por_operacion):
+            if resultado.estado == "creado" and indice not in insertados:
+                resultado.estado = "sin_cambios"
+                resultado.detalle = "Ya existía: no se modificó."
+        # Cada actualización y cada alta que encontró el documento suman un match. Si faltan, alguna
+        # patente de la réplica se borró antes del bulk_write: se identifican por _id
+        actualizadas = [r for r in resultado_por_operacion if r.estado == "actualizado"]
+        esperados = len(actualizadas) + sum(1 for r in resultado_por_operacion if r.estado == "sin_cambios")
+        if detalles.get("nMatched", 0) < esperados:
+            existentes = set(await get_db_collection("Vehiculos").distinct(
+                "_id", {"_id": {"$in": [r.patente for r in actualizadas]}}
+            ))
+            for resultado in actualizadas:
+                if resultado.patente not in existentes:
+                    resultado.estado = "no_encontrado"
+                    resultado.detalle = "El vehículo no existe (se eliminó durante la importación)."
+
+        await replica_flota.invalidar_todo()
+        for patente_norm in refrescar_alertas:
+            await refrescar_alertas_vencimiento(patente_norm)
+
+    resultados.sort(key=lambda r: r.fila)
+    return ResultadoBulkVehiculos(
+        total=len(filas),
+        creados=sum(1 for r in resultados if r.estado == "creado"),
+        actualizados=sum(1 for r in resultados if r.estado == "actualizado"),
+        no_encontrados=sum(1 for r in resultados if r.estado == "no_encontrado"),
+        errores=sum(1 for r in resultados if r.estado == "error"),
+        resultados=resultados,
+    )
 
 class VehiculoPatchInput(BaseModel):
     activo: Optional[bool] = None
@@ -315,41 +531,25 @@ async def update_vehiculo(patente: str, data: VehiculoPatchInput):
     db_vehiculos = get_db_collection("Vehiculos")
     patente_normalizada = normalize_patente(patente)
     update_fields = data.model_dump(exclude_none=True, exclude_unset=True) 
-
-    update_doc = {"$set": {}}
-    field_mapping = {
-        'activo': 'activo', 'anio': 'ANIO', 'color': 'COLOR', 
-        'marca': 'MARCA', 'modelo': 'MODELO', 'tipo': 'TIPO', 
-        'descripcion_modelo': 'DESCRIPCION_MODELO', 'nro_movil': 'NRO_MOVIL', 
-        'tipo_combustible': 'TIPO_COMBUSTIBLE',
-    }
-
-    for pydantic_field, db_field in field_mapping.items():
-        if pydantic_field in update_fields:
-            update_doc['$set'][db_field] = update_fields[pydantic_field]
             
-    if not update_doc['$set']:
-         updated_doc = await db_vehiculos.find_one({"_id": patente_normalizada}) 
+    if not update_fields:
+         updated_doc = await replica_flota.obtener(patente_normalizada)
          if not updated_doc:
              raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Vehículo con patente {patente} no encontrado.")
     else:
-        update_result = await db_vehiculos.update_one( 
+        # Escritura y lectura del resultado en una sola operación atómica
+        updated_doc = await db_vehiculos.find_one_and_update(
             {"_id": patente_normalizada},
-            update_doc
+            _pipeline_actualizar_vehiculo(update_fields),
+            return_document=ReturnDocument.AFTER
         )
-        if update_result.matched_count == 0:
+        if not updated_doc:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Vehículo con patente {patente} no encontrado.")
-        updated_doc = await db_vehiculos.find_one({"_id": patente_normalizada}) 
-
-    vehiculo_data = {
-        "patente": updated_doc.get("_id"), "patente_original": updated_doc.get("patente_original"), "activo": updated_doc.get("activo", False), 
-        "anio": updated_doc.get("ANIO"), "color": updated_doc.get("COLOR"), "marca": updated_doc.get("MARCA") or updated_doc.get("marca"), 
-        "modelo": updated_doc.get("MODELO") or updated_doc.get("DESCRIPCION_MODELO") or updated_doc.get("modelo"), 
-        "tipo": updated_doc.get("TIPO") or updated_doc.get("tipo"), "descripcion_modelo": updated_doc.get("DESCRIPCION_MODELO"),
-        "nro_movil": updated_doc.get("NRO_MOVIL"), "tipo_combustible": updated_doc.get("TIPO_COMBUSTIBLE"),
-        "documentos_digitales": updated_doc.get("documentos_digitales", []),
-    }
-    return Vehiculo(**vehiculo_data)
+        await replica_flota.registrar(updated_doc)
+        if 'nro_movil' in update_fields or 'descripcion_modelo' in update_fields:
+            await refrescar_alertas_vencimiento(patente_normalizada)
+
+    return Vehiculo(**vehiculo_desde_doc(updated_doc))
 
 # 💡 FIX CLAVE: Este endpoint ahora guarda en Documentacion
 @router.put("/vencimientos/{patente}/{tipo_documento}")
@@ -375,67 +575,143 @@ async def actualizar_vencimiento_digital(
             "fecha_vencimiento": data.fecha_vencimiento
         })
 
+    await incrementar_version("Documentacion")
+    await refrescar_alertas_vencimiento(normalized_patente)
+
     logger.info(f"Fecha de vencimiento actualizada en Documentacion: {patente} - {tipo_documento}")
     return {"message": "Fecha de vencimiento actualizada correctamente"}
 
+# Orden del listado filtrado: relevancia y luego patente (clave del cursor)
+ORDEN_VEHICULOS_FILTRO = {"_relevancia": 1, "_id": 1}
+
+# Campos que acepta ?fields= (los de la respuesta Vehiculo)
+CAMPOS_VEHICULO = ("patente",) + CAMPOS_API
+
+def _proyeccion_vehiculo(campos: List[str]) -> Dict[str, int]:
+    """Proyección Mongo para los campos pedidos; incluye las claves legadas que lee vehiculo_desde_doc."""
+    claves = {"schema_version"}
+    for campo in campos:
+        if campo == "patente":
+            continue  # _id siempre viene
+        claves.add(campo)
+        claves.update(CAMPOS_LEGADOS.get(campo, ()))
+        if campo == "modelo":
+            claves.update(("descripcion_modelo",) + CAMPOS_LEGADOS["descripcion_modelo"])
+    return {clave: 1 for clave in claves}
+
+# Lo que muestra el listado de la flota (view=summary)
+CAMPOS_VISTA_RESUMEN = ["patente", "nro_movil", "modelo", "descripcion_modelo", "activo"]
+
+def _campos_solicitados(view: str, fields: Optional[str]) -> Optional[List[str]]:
+    """Campos pedidos por ?fields= o ?view=summary; None = vista completa validada con Vehiculo."""
+    if fields:
+        campos = [c.strip() for c in fields.split(",") if c.strip()]
+        desconocidos = [c for c in campos if c not in CAMPOS_VEHICULO]
+        if desconocidos:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Campos desconocidos en 'fields': {', '.join(desconocidos)}. Válidos: {', '.join(CAMPOS_VEHICULO)}"
+            )
+        return ["patente"] + [c for c in dict.fromkeys(campos) if c != "patente"]
+    if view == "summary":
+        return CAMPOS_VISTA_RESUMEN
+    return None
+
+def _sin_nan(valor: Any) -> Any:
+    """El ETL deja NaN en columnas numéricas vacías; en JSON van como null."""
+    return None if isinstance(valor, float) and math.isnan(valor) else valor
+
 @router.get("/vehiculos", response_model=List[Vehiculo], summary="Lista todos los vehículos con opcional filtrado y paginación.")
 async def get_vehiculos(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    filtro: Optional[str] = Query(None, description="Filtro por patente, móvil o modelo")
+    filtro: Optional[str] = Query(None, description="Filtro por patente, móvil o modelo"),
+    cursor: Optional[str] = Query(None, description="Cursor opaco de la página anterior (header X-Next-Cursor)"),
+    view: Literal["full", "summary"] = Query("full", description="summary: solo patente, móvil, modelo y activo"),
+    fields: Optional[str] = Query(None, description="Campos a devolver separados por coma (tiene prioridad sobre view)")
 ):
     try:
+        # ETag: versión de Vehiculos + parámetros; si el cliente ya tiene esta página, 304 sin consultar nada más
+        etag = etag_para("Vehiculos", await replica_flota.version(), str(request.url.query))
+        no_modificado = responder_si_no_modificado(request, response, etag)
+        if no_modificado:
+            return no_modificado
+
         db_vehiculos = get_db_collection("Vehiculos")
         query: Dict[str, Any] = {}
+
+        # Vista parcial: la respuesta no pasa por los modelos Pydantic; en la búsqueda la proyección viaja a Mongo
+        campos = _campos_solicitados(view, fields)
+        proyeccion = None
+        if campos is not None:
+            proyeccion = _proyeccion_vehiculo(campos)
         
-        if filtro:
-            regex_query = {"$regex": filtro, "$options": "i"}
-            query["$or"] = [
-                {"_id": regex_query},
-                {"patente_original": regex_query},
-                {"NRO_MOVIL": regex_query},
-                {"DESCRIPCION_MODELO": regex_query},
-                {"MARCA": regex_query},  
-                {"MODELO": regex_query}, 
-                {"TIPO": regex_query}    
+        tokens = tokens_de_busqueda(filtro) if filtro else []
+        if tokens:
+            # Búsqueda indexada: cada palabra buscada debe ser un token del vehículo (índice multikey).
+            # Relevancia estable: patente exacta, luego móvil exacto, luego el resto; desempata _id.
+            query["search_tokens"] = {"$all": tokens}
+            filtro_patente = normalize_patente(filtro)
+            pipeline = [
+                {"$match": query},
+                {"$addFields": {"_relevancia": {"$switch": {
+                    "branches": [
+                        {"case": {"$eq": ["$_id", filtro_patente]}, "then": 0},
+                        {"case": {"$eq": [{"$toString": "$nro_movil"}, filtro.strip()]}, "then": 1},
+                    ],
+                    "default": 2
+                }}}},
             ]
-
-        cursor = db_vehiculos.find(query).skip(skip).limit(limit)
-        docs_list = await cursor.to_list(length=limit) 
+            if cursor:
+                pipeline.append({"$match": _filtro_despues_de_cursor(decodificar_cursor(cursor, len(ORDEN_VEHICULOS_FILTRO)), ORDEN_VEHICULOS_FILTRO)})
+            pipeline += [
+                {"$sort": ORDEN_VEHICULOS_FILTRO},
+                {"$skip": skip},
+                {"$limit": limit}
+            ]
+            if proyeccion:
+                pipeline.append({"$project": {**proyeccion, "_relevancia": 1}})
+            docs_list = await db_vehiculos.aggregate(pipeline).to_list(length=limit)
+        else:
+            # Sin filtro se sirve de la réplica en memoria; el cursor es la última patente entregada
+            despues_de = decodificar_cursor(cursor, 1)[0] if cursor else None
+            docs_list = await replica_flota.listar(skip, limit, despues_de)
+
+        # Página completa → puede haber más: el cliente sigue con ?cursor=<X-Next-Cursor>
+        if len(docs_list) == limit:
+            ultimo = docs_list[-1]
+            response.headers["X-Next-Cursor"] = codificar_cursor(
+                [ultimo["_relevancia"], ultimo["_id"]] if tokens else [ultimo["_id"]]
+            )
         
         vehiculos_list = []
         for doc in docs_list: 
-            nro_movil = doc.get("NRO_MOVIL") or doc.get("nro_movil", "N/A")
-            descripcion_modelo = doc.get("DESCRIPCION_MODELO") or doc.get("descripcion_modelo", "Sin Modelo")
-            anio = doc.get("ANIO") or doc.get("anio", 0)
-            color = doc.get("COLOR") or doc.get("color", "N/A")
-            
-            vehiculo_data = {
-                "patente": doc.get("_id"), 
-                "patente_original": doc.get("patente_original", "N/A"),
-                "activo": doc.get("activo", False), 
-                "anio": anio,
-                "color": color, 
-                "marca": doc.get("MARCA") or doc.get("marca"), 
-                "modelo": doc.get("MODELO") or doc.get("modelo") or "Sin Modelo", 
-                "tipo": doc.get("TIPO") or doc.get("tipo"),    
-                "descripcion_modelo": descripcion_modelo,
-                "nro_movil": str(nro_movil), 
-                "tipo_combustible": doc.get("TIPO_COMBUSTIBLE", "N/A"),
-                "documentos_digitales": doc.get("documentos_digitales", []),
-            }
-            vehiculos_list.append(Vehiculo(**vehiculo_data))
-        
+            vehiculo_data = vehiculo_desde_doc(doc)
+            if campos is None:
+                vehiculos_list.append(Vehiculo(**vehiculo_data))
+            else:
+                vehiculos_list.append({c: _sin_nan(vehiculo_data[c]) for c in campos})
+
+        if campos is not None:
+            # Se devuelve la respuesta directamente: hay que copiar X-Next-Cursor / ETag del sub-response
+            return JSONResponse(content=jsonable_encoder(vehiculos_list, custom_encoder={ObjectId: str}), headers=dict(response.headers))
         return vehiculos_list
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
 @router.get("/vehiculos/{patente}", response_model=Vehiculo, summary="Obtiene el detalle de un vehículo.")
-async def get_vehiculo_by_patente(patente: str):
-    db_vehiculos = get_db_collection("Vehiculos")
+async def get_vehiculo_by_patente(patente: str, request: Request, response: Response):
     patente_norm = normalize_patente(patente)
+    etag = etag_para("Vehiculos", await replica_flota.version(), patente_norm)
+    no_modificado = responder_si_no_modificado(request, response, etag)
+    if no_modificado:
+        return no_modificado
 
-    vehiculo = await db_vehiculos.find_one({"_id": patente_norm})
+    vehiculo = await replica_flota.obtener(patente_norm)
 
     if not vehiculo:
         raise HTTPException(
@@ -443,63 +719,157 @@ async def get_vehiculo_by_patente(patente: str):
             detail=f"Vehículo con patente {patente_norm} no encontrado"
         )
     
-    vehiculo_data = {
-        "patente": vehiculo.get("_id"),
-        "patente_original": vehiculo.get("patente_original"),
-        "activo": vehiculo.get("activo", True),
-        "anio": vehiculo.get("anio") or vehiculo.get("ANIO"),
-        "color": vehiculo.get("color") or vehiculo.get("COLOR"),
-        "nro_movil": vehiculo.get("nro_movil") or vehiculo.get("NRO_MOVIL"),
-        "tipo_combustible": vehiculo.get("tipo_combustible") or vehiculo.get("TIPO_COMBUSTIBLE"),
-        "marca": vehiculo.get("marca") or vehiculo.get("MARCA"), 
-        "tipo": vehiculo.get("tipo") or vehiculo.get("TIPO"),    
-        "modelo": (
-            vehiculo.get("modelo") or 
-            vehiculo.get("MODELO") or 
-            vehiculo.get("descripcion_modelo") or 
-            vehiculo.get("DESCRIPCION_MODELO")
-        ),
-        "descripcion_modelo": (
-            vehiculo.get("descripcion_modelo") or 
-            vehiculo.get("DESCRIPCION_MODELO") or 
-            vehiculo.get("MODELO")
-        ),
-        "documentos_digitales": vehiculo.get("documentos_digitales", [])
-    }
-
-    return Vehiculo(**vehiculo_data)
-
-@router.delete("/vehiculos/{patente}", status_code=status.HTTP_204_NO_CONTENT, summary="Elimina un vehículo y sus registros asociados.")
-async def delete_vehiculo(patente: str):
+    return Vehiculo(**vehiculo_desde_doc(vehiculo))
+
+# Colecciones con registros por patente que se borran junto con el vehículo (incluye las derivadas
+# de costos: el rollup CostosMensuales y los asientos del libro Costos también llevan patente)
+COLECCIONES_CASCADA = [
+    "Documentacion", "Mantenimiento", "Finanzas", "Componentes", "Flota_Estado", COLECCION_ALERTAS,
+    COLECCION_COSTOS_MENSUALES, COLECCION_COSTOS,
+]
+
+@router.delete("/vehiculos/{patente}", status_code=status.HTTP_202_ACCEPTED, summary="Elimina un vehículo y sus registros asociados.")
+async def delete_vehiculo(patente: str, background_tasks: BackgroundTasks):
+    """
+    Borra el vehículo y su cascada en una transacción (todo o nada). Los archivos GridFS se
+    borran después en segundo plano: la respuesta trae el id de la tarea para GET /limpiezas/{id}.
+    """
     patente_norm = normalize_patente(patente)
     db_vehiculos = get_db_collection("Vehiculos")
 
-    delete_result = await db_vehiculos.delete_one({"_id": patente_norm})
-    if delete_result.deleted_count == 0:
-        raise HTTPException(status_code=404, detail=f"Vehículo con patente {patente} no encontrado.")
+    # Lecturas de archivos referenciados en paralelo, antes de la transacción
+    referencias = await asyncio.gather(*[
+        archivos_referenciados(patente_norm, collection_name) for collection_name in REFERENCIAS_ARCHIVOS
+    ])
 
-    for collection_name in ["Documentacion", "Mantenimiento", "Finanzas", "Componentes", "Flota_Estado"]:
-        collection = get_db_collection(collection_name)
-        await collection.delete_many({"patente": patente_norm}) 
+    # Una transacción no admite operaciones en paralelo sobre la misma sesión: los deletes van en serie
+    async with await get_mongo_client().start_session() as session:
+        async with session.start_transaction():
+            vehiculo = await db_vehiculos.find_one_and_delete({"_id": patente_norm}, session=session)
+            if not vehiculo:
+                raise HTTPException(status_code=404, detail=f"Vehículo con patente {patente} no encontrado.")
+            for collection_name in COLECCIONES_CASCADA:
+                await get_db_collection(collection_name).delete_many({"patente": patente_norm}, session=session)
 
-    return Response(status_code=status.HTTP_204_NO_CONTENT)
+    await replica_flota.eliminar(patente_norm)
+    await incrementar_version("Documentacion")
+
+    file_ids = archivos_del_vehiculo(vehiculo) + [file_id for ids in referencias for file_id in ids]
+    tarea_id = await crear_tarea_limpieza(patente_norm, file_ids)
+    background_tasks.add_task(ejecutar_limpieza, tarea_id)
+
+    return {
+        "message": f"Vehículo {patente_norm} eliminado. Limpieza de archivos en curso.",
+        "tarea_limpieza_id": tarea_id,
+        "estado_url": f"/limpiezas/{tarea_id}",
+    }
+
+@router.get("/limpiezas/{tarea_id}", summary="Estado de la limpieza de archivos de un vehículo eliminado.")
+async def get_estado_limpieza(tarea_id: str):
+    tarea = await obtener_tarea(tarea_id)
+    if not tarea:
+        raise HTTPException(status_code=404, detail=f"Tarea de limpieza {tarea_id} no encontrada.")
+    tarea["_id"] = str(tarea["_id"])
+    return tarea
 
 # =========================================================================
 # 3. ENDPOINTS: REPORTES DE VEHÍCULO Y COSTOS
 # =========================================================================
 
+# Orden del detalle del reporte: más reciente primero. _clave es el _id como texto (el ETL usa UUID y
+# la API ObjectId) para que el cursor compare valores del mismo tipo.
+ORDEN_DETALLE_COSTOS = {"_fecha_ms": -1, "origen": -1, "_clave": -1}
+
+def _filas_reporte(filtro_rango: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Etapas comunes de los reportes: Mantenimiento + Finanzas ($unionWith) sin los costos excluidos
+    por la clasificación (clasificacion_costos.py), proyectadas a la fila de costo.
+    """
+    filtro = {**filtro_rango, **FILTRO_INCLUIDO}
+    return [
+        {"$match": filtro},
+        {"$project": PROYECCION_COSTO_MANTENIMIENTO},
+        {"$unionWith": {"coll": "Finanzas", "pipeline": [
+            {"$match": filtro},
+            {"$project": PROYECCION_COSTO_FINANZAS},
+        ]}},
+    ]
+
+async def _detalle_coleccion(coleccion: str, filtro_rango: Dict[str, Any], etapas_cursor: List[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Filas de una colección en ORDEN_DETALLE_COSTOS sin $sort bloqueante: Mongo las entrega por
+    fecha_evento con el índice (patente, fecha_evento) y las de un mismo instante (en general, un mismo
+    día) se ordenan acá por _clave, que el índice no tiene. Solo ese grupo de empates queda en memoria.
+    """
+    proyeccion = PROYECCION_COSTO_MANTENIMIENTO if coleccion == "Mantenimiento" else PROYECCION_COSTO_FINANZAS
+    pipeline = [
+        {"$match": {**filtro_rango, **FILTRO_INCLUIDO}},
+        {"$sort": {"fecha_evento": -1}},
+        {"$project": proyeccion},
+        *etapas_cursor,
+    ]
+    empates: List[Dict[str, Any]] = []
+    async for fila in get_db_collection(coleccion).aggregate(pipeline):
+        if empates and fila["_fecha_ms"] != empates[0]["_fecha_ms"]:
+            for empate in sorted(empates, key=lambda f: f["_clave"], reverse=True):
+                yield empate
+            empates = []
+        empates.append(fila)
+    for empate in sorted(empates, key=lambda f: f["_clave"], reverse=True):
+        yield empate
+
+def _costo_item(fila: Dict[str, Any]) -> CostoItem:
+    return CostoItem(_id=fila["_clave"], tipo=fila["tipo"], fecha=fila["fecha"], descripcion=fila["descripcion"],
+                     importe=fila["importe"], origen=fila["origen"])
+
+async def _stream_reporte_vehiculo(
+    patente: str, filtro_rango: Dict[str, Any], etapas_cursor: List[Dict[str, Any]]
+) -> AsyncIterator[bytes]:
+    """
+    Una línea por fila de detalle a medida que llega y al final totales y alertas. Las dos colecciones
+    se leen por separado y se fusionan por (_fecha_ms, origen): el origen desempata entre ellas, así
+    que el orden es el mismo ORDEN_DETALLE_COSTOS de la paginación.
+    """
+    total_mantenimiento = total_infracciones = 0.0
+    cantidad = 0
+    detalles = [_detalle_coleccion(coleccion, filtro_rango, etapas_cursor) for coleccion in ("Mantenimiento", "Finanzas")]
+    async for fila in fusionar_ordenados(detalles, clave=lambda f: (f["_fecha_ms"], f["origen"]), descendente=True):
+        total_mantenimiento += fila["importe"] if fila["origen"] == "Mantenimiento" else 0.0
+        total_infracciones += fila["importe"] if fila["es_multa"] else 0.0
+        cantidad += 1
+        yield linea_ndjson({"registro": "costo", **_costo_item(fila).model_dump(by_alias=True, exclude_none=True)})
+
+    try:
+        alertas = [a.model_dump() for a in await get_vencimientos_criticos_alertas(60, patente=patente) if a.patente == patente]
+    except Exception as e:
+        logger.warning(f"Alertas del reporte de {patente} no disponibles: {e}")
+        alertas = []
+    yield linea_ndjson({
+        "registro": "totales",
+        "patente": patente,
+        "total_general": round(total_mantenimiento + total_infracciones, 2),
+        "total_mantenimiento": round(total_mantenimiento, 2),
+        "total_infracciones": round(total_infracciones, 2),
+        "cantidad_registros": cantidad,
+        "alertas": alertas,
+    })
+
 @router.get("/vehiculos/{patente}/reporte", response_model=ReporteCostosResponse)
 async def get_reporte_vehiculo(
     patente: str,
+    request: Request,
     start_date: str = Query(..., description="Fecha inicio YYYY-MM-DD"),
-    end_date: str = Query(..., description="Fecha fin YYYY-MM-DD")
+    end_date: str = Query(..., description="Fecha fin YYYY-MM-DD"),
+    limit: int = Query(100, ge=1, le=1000, description="Filas de detalle por página"),
+    cursor: Optional[str] = Query(None, description="Cursor opaco (next_cursor de la página anterior)"),
+    stream: bool = Query(False, description="NDJSON con todo el detalle (sin limit) y una línea final de totales (igual que Accept: application/x-ndjson)")
 ):
+    """
+    Totales del período calculados en Mongo ($group) y una página del detalle ordenada por fecha
+    descendente. Los totales no dependen de la página: el cliente pide más filas con `cursor`.
+    En modo NDJSON el detalle completo se envía a medida que lo entrega el cursor de Motor.
+    """
     patente_norm = normalize_patente(patente)
-    
-    db_vehiculos = get_db_collection("Vehiculos")
-    vehiculo = await db_vehiculos.find_one({"_id": patente_norm}) 
-    if not vehiculo:
-        raise HTTPException(status_code=404, detail=f"Vehículo {patente_norm} no encontrado")
 
     try:
         start_dt = datetime.strptime(start_date, "%Y-%m-%d")
@@ -507,145 +877,246 @@ async def get_reporte_vehiculo(
     except ValueError:
         raise HTTPException(status_code=400, detail="Formato de fecha inválido. Usa YYYY-MM-DD")
 
-    costos_list: List[CostoItem] = []
-    total_mantenimiento = 0.0
-    total_infracciones = 0.0
-
-    def parse_fecha_segura(doc):
-        candidatos = [
-            doc.get("fecha"), doc.get("dia"), doc.get("fecha_infraccion"), doc.get("FECHA_INFRACCIN")
-        ]
-        for valor in candidatos:
-            if not valor or valor in ["N/A", "null", ""]: continue
-            if isinstance(valor, datetime): return valor.isoformat()[:10]
-            if isinstance(valor, str):
-                valor = valor.strip()
-                match = re.match(r"(\d{1,2})[/-](\d{1,2})[/-](\d{4})", valor)
-                if match:
-                    d, m, a = match.groups()
-                    try: return f"{a}-{int(m):02d}-{int(d):02d}"
-                    except: pass
-                if "T" in valor: return valor[:10]
-                if re.match(r"\d{4}-\d{2}-\d{2}", valor): return valor[:10]
-        return "1900-01-01"  
-
-
-    db_mantenimiento = get_db_collection("Mantenimiento")
-    cursor_mantenimiento = db_mantenimiento.find({
-        "patente": patente_norm,
-        "fecha": {"$gte": start_dt, "$lte": end_dt}
+    # fecha_evento (fechas_costos.py) normaliza las fechas de ambas colecciones: el rango se filtra en
+    # Mongo con el índice (patente, fecha_evento) y solo viajan las filas de la ventana pedida.
+    filtro_rango = {"patente": patente_norm, "fecha_evento": {"$gte": start_dt, "$lte": end_dt}}
+
+    etapas_cursor: List[Dict[str, Any]] = []
+    if cursor:
+        etapas_cursor.append({"$match": _filtro_despues_de_cursor(
+            decodificar_cursor(cursor, len(ORDEN_DETALLE_COSTOS)), ORDEN_DETALLE_COSTOS
+        )})
+
+    if pide_ndjson(request, stream):
+        # El 404 tiene que salir antes de empezar a enviar el cuerpo
+        if not await replica_flota.existe(patente_norm):
+            raise HTTPException(status_code=404, detail=f"Vehículo {patente_norm} no encontrado")
+        return respuesta_ndjson(_stream_reporte_vehiculo(patente_norm, filtro_rango, etapas_cursor))
+
+    etapas_pagina = etapas_cursor + [{"$sort": ORDEN_DETALLE_COSTOS}]
+
+    # Un solo viaje: Mantenimiento + Finanzas ($unionWith), totales y página de detalle ($facet)
+    pipeline = _filas_reporte(filtro_rango) + [
+        {"$facet": {
+            "totales": [{"$group": {
+                "_id": None,
+                "total_mantenimiento": {"$sum": {"$cond": [{"$eq": ["$origen", "Mantenimiento"]}, "$importe", 0]}},
+                "total_infracciones": {"$sum": {"$cond": ["$es_multa", "$importe", 0]}},
+                "cantidad": {"$sum": 1},
+            }}],
+            "detalles": etapas_pagina + [{"$limit": limit}],
+        }},
+    ]
+    # Existencia del vehículo, costos y alertas son independientes: se piden a la vez. Las alertas son
+    # opcionales (si fallan el reporte sale sin ellas); existencia y costos son obligatorios.
+    ramas = await en_paralelo({
+        "existe": replica_flota.existe(patente_norm),
+        "costos": get_db_collection("Mantenimiento").aggregate(pipeline).to_list(length=1),
+        "alertas": get_vencimientos_criticos_alertas(60, patente=patente_norm),
     })
-    docs_mantenimiento = await cursor_mantenimiento.to_list(length=None) 
-
-    for doc in docs_mantenimiento:
-        monto = float(doc.get("costo_monto") or 0)
-        fecha_iso = parse_fecha_segura(doc)
-        total_mantenimiento += monto
-        costos_list.append(CostoItem(
-        _id=str(doc["_id"]), tipo=TIPO_POR_ORIGEN["Mantenimiento"], fecha=fecha_iso,
-        descripcion=doc.get("DESCRIPCIÓN", "Servicio técnico"), importe=monto, origen="Mantenimiento"
-    ))
-
-    db_finanzas = get_db_collection("Finanzas")
-    cursor_finanzas = db_finanzas.find({"patente": patente_norm})
-    docs_finanzas = await cursor_finanzas.to_list(length=None)
-
-    for doc in docs_finanzas:
-        try:
-            fecha_iso = parse_fecha_segura(doc)
-            try: fecha_dt = datetime.strptime(fecha_iso, "%Y-%m-%d")
-            except: continue 
-
-            if not (start_dt <= fecha_dt <= end_dt): continue
-
-            monto = float(doc.get("MONTO") or doc.get("monto") or 0)
-            motivo = str(doc.get("motivo") or doc.get("MOTIVO") or "").upper()
-            tipo_registro = doc.get("tipo_registro", "").upper()
-
-            if any(palabra in motivo for palabra in ["MULTA", "INFRACCION", "EXCESO", "VELOCIDAD", "VIA PROHIBIDA"]):
-                total_infracciones += monto
-                tipo_final = "Multa"
-            elif tipo_registro == "INFRACCION":
-                total_infracciones += monto
-                tipo_final = "Multa"
-            else:
-                tipo_final = doc.get("tipo_costo", "Otros")
-
-            costos_list.append(CostoItem(
-                _id=str(doc["_id"]), tipo=tipo_final, fecha=fecha_iso,
-                descripcion=(doc.get("motivo") or doc.get("ACTA") or "Gasto financiero")[:100],
-                importe=monto, origen="Finanzas"
-            ))
+    if not resultado_rama(ramas, "existe"):
+        raise HTTPException(status_code=404, detail=f"Vehículo {patente_norm} no encontrado")
+    resultado = resultado_rama(ramas, "costos")[0]
 
-        except Exception as e:
-            continue
+    totales = resultado["totales"][0] if resultado["totales"] else {}
+    total_mantenimiento = totales.get("total_mantenimiento", 0.0)
+    total_infracciones = totales.get("total_infracciones", 0.0)
 
-    costos_list.sort(key=lambda x: x.fecha or "1900-01-01", reverse=True)
+    filas = resultado["detalles"]
+    costos_list = [_costo_item(fila) for fila in filas]
+    next_cursor = None
+    if len(filas) == limit:
+        ultima = filas[-1]
+        next_cursor = codificar_cursor([ultima[campo] for campo in ORDEN_DETALLE_COSTOS])
 
-    todas_alertas = await get_vencimientos_criticos_alertas(60, patente=patente_norm)
-    alertas = [a for a in todas_alertas if a.patente == patente_norm]
+    alertas = [a for a in resultado_rama(ramas, "alertas", []) if a.patente == patente_norm]
 
     return ReporteCostosResponse(
         patente=patente_norm,
         total_general=round(total_mantenimiento + total_infracciones, 2),
         total_mantenimiento=round(total_mantenimiento, 2),
         total_infracciones=round(total_infracciones, 2),
-        detalles=costos_list, alertas=alertas
+        cantidad_registros=totales.get("cantidad", 0),
+        detalles=costos_list, next_cursor=next_cursor, alertas=alertas
     )
 
 # -------------------------------------------------------------------------
-# 3.2. GET /dashboard (Resumen de la Flota)
+# 3.1. GET /reportes/periodo (Costos de toda la flota por categoría)
 # -------------------------------------------------------------------------
 
-async def get_resumen_costos_dashboard(dias_historia: int = 365) -> Dict[str, float]: 
-    db_mant = get_db_collection("Mantenimiento")
-    db_finanzas = get_db_collection("Finanzas")
+# Agrupamiento común de los reportes de flota: subtotal por (patente, categoría) con los importes
+# de mantenimiento e infracciones de cada grupo
+def _grupo_costos_por_categoria(por_patente: bool, campo_categoria: str) -> Dict[str, Any]:
+    return {"$group": {
+        "_id": {"patente": "$patente" if por_patente else None, "categoria": f"${campo_categoria}"},
+        "total": {"$sum": "$importe"},
+        "mantenimiento": {"$sum": {"$cond": [{"$eq": ["$origen", "Mantenimiento"]}, "$importe", 0]}},
+        "infracciones": {"$sum": {"$cond": ["$es_multa", "$importe", 0]}},
+    }}
+
+def _pipeline_costos_por_categoria(filtro: Dict[str, Any], por_patente: bool) -> List[Dict[str, Any]]:
+    """
+    Mantenimiento + Finanzas ($unionWith) filtrados por `filtro` y agrupados por categoría
+    (y patente si `por_patente`), con los subtotales de mantenimiento e infracciones de cada grupo.
+    """
+    return _filas_reporte(filtro) + [_grupo_costos_por_categoria(por_patente, "tipo")]
+
+async def _costos_por_categoria(
+    desde_dt: datetime, hasta_dt: datetime, por_patente: bool, patentes: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Grupos de _pipeline_costos_por_categoria. Con el libro Costos completo se agrupa ahí (una colección,
+    índice por fecha, importe y categoría ya resueltos); si no, sobre Mantenimiento + Finanzas.
+    """
+    if await libro_costos_completo():
+        filtro: Dict[str, Any] = {"fecha": {"$gte": desde_dt, "$lte": hasta_dt}, **FILTRO_INCLUIDO}
+        if patentes is not None:
+            filtro["patente"] = {"$in": patentes}
+        pipeline = [{"$match": filtro}, _grupo_costos_por_categoria(por_patente, "categoria")]
+        return await get_db_collection(COLECCION_COSTOS).aggregate(pipeline).to_list(length=None)
+
+    filtro = {"fecha_evento": {"$gte": desde_dt, "$lte": hasta_dt}}
+    if patentes is not None:
+        filtro["patente"] = {"$in": patentes}
+    pipeline = _pipeline_costos_por_categoria(filtro, por_patente)
+    return await get_db_collection("Mantenimiento").aggregate(pipeline).to_list(length=None)
+
+@router.get("/reportes/periodo", response_model=ReportePeriodoResponse, summary="Costos de la flota por categoría en un período.")
+async def get_reporte_periodo(
+    desde: str = Query(..., description="Fecha inicio YYYY-MM-DD"),
+    hasta: str = Query(..., description="Fecha fin YYYY-MM-DD"),
+    group_by: Optional[Literal["patente", "area", "responsable"]] = Query(
+        None, description="Agrupa además por patente, área o responsable del vehículo"
+    )
+):
+    """
+    Una sola agregación (libro Costos, o Mantenimiento + Finanzas) filtrada por fecha y
+    agrupada por (patente, categoría) en Mongo. Área y responsable se resuelven después contra la
+    réplica de flota, sobre los grupos ya reducidos (no fila por fila).
+    """
+    try:
+        desde_dt = datetime.strptime(desde, "%Y-%m-%d")
+        hasta_dt = datetime.strptime(hasta, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Formato de fecha inválido. Usa YYYY-MM-DD")
+    if desde_dt > hasta_dt:
+        raise HTTPException(status_code=400, detail="'desde' debe ser anterior o igual a 'hasta'.")
+
+    grupos = await _costos_por_categoria(desde_dt, hasta_dt, por_patente=group_by is not None)
+
+    totales: Dict[tuple, float] = {}
+    total_mantenimiento = total_infracciones = 0.0
+    for fila in grupos:
+        grupo = fila["_id"]["patente"]
+        if group_by in ("area", "responsable"):
+            vehiculo = await replica_flota.obtener(grupo)
+            grupo = (valor_canonico(vehiculo, group_by) if vehiculo else None) or "Sin asignar"
+        clave = (grupo, fila["_id"]["categoria"] or "Otros")
+        totales[clave] = totales.get(clave, 0.0) + fila["total"]
+        total_mantenimiento += fila["mantenimiento"]
+        total_infracciones += fila["infracciones"]
+
+    datos = [
+        DatoAgregado(grupo=grupo, categoria=categoria, total=round(total, 2))
+        for (grupo, categoria), total in totales.items()
+    ]
+    datos.sort(key=lambda d: (d.grupo or "", -d.total))
 
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=dias_historia)
-    start_date_iso = start_date.isoformat()
-    end_date_iso = end_date.isoformat()
+    return ReportePeriodoResponse(
+        fecha_inicio=desde,
+        fecha_fin=hasta,
+        datos_agregados=datos,
+        total_general=round(sum(totales.values()), 2),
+        total_mantenimiento=round(total_mantenimiento, 2),
+        total_infracciones=round(total_infracciones, 2),
+    )
 
-    pipeline_mant = [
-        { "$match": { "fecha": { "$gte": start_date, "$lte": end_date } } },
-        { "$group": { "_id": None, "total": { "$sum": "$costo_monto" } } }
-    ]
-    resumen_mant_result = await db_mant.aggregate(pipeline_mant).to_list(length=None) 
-    total_mantenimiento = resumen_mant_result[0]["total"] if resumen_mant_result and resumen_mant_result[0].get("total") is not None else 0.0
-
-    pipeline_infracciones = [
-        { 
-            "$match": { 
-                "tipo_registro": "Infraccion",
-                "dia": { "$gte": start_date_iso, "$lte": end_date_iso }
-            }
-        },
-        { "$group": { "_id": None, "total": { "$sum": "$MONTO" } } }
+@router.post("/reportes/comparativo", response_model=ReporteComparativoResponse, summary="Compara los costos de varios vehículos en un período.")
+async def post_reporte_comparativo(data: ReporteComparativoInput):
+    """
+    Una agregación para todas las patentes ($match patente $in + fecha) agrupada por
+    (patente, categoría). El armado de la respuesta es una sola pasada sobre los grupos, así que
+    comparar 100 vehículos cuesta lo mismo que uno; no se calculan alertas ni se relee Vehiculos.
+    """
+    if data.desde > data.hasta:
+        raise HTTPException(status_code=400, detail="'desde' debe ser anterior o igual a 'hasta'.")
+    desde_dt = datetime.combine(data.desde, datetime.min.time())
+    hasta_dt = datetime.combine(data.hasta, datetime.max.time())
+
+    grupos = await _costos_por_categoria(desde_dt, hasta_dt, por_patente=True, patentes=data.patentes)
+
+    acumulado: Dict[str, Dict[str, Any]] = {
+        patente: {"categorias": [], "mantenimiento": 0.0, "infracciones": 0.0} for patente in data.patentes
+    }
+    for fila in grupos:
+        item = acumulado[fila["_id"]["patente"]]
+        item["categorias"].append(DatoAgregado(categoria=fila["_id"]["categoria"] or "Otros", total=round(fila["total"], 2)))
+        item["mantenimiento"] += fila["mantenimiento"]
+        item["infracciones"] += fila["infracciones"]
+
+    vehiculos = []
+    for patente, item in acumulado.items():
+        item["categorias"].sort(key=lambda d: -d.total)
+        vehiculos.append(ComparativoVehiculo(
+            patente=patente,
+            total_general=round(sum(d.total for d in item["categorias"]), 2),
+            total_mantenimiento=round(item["mantenimiento"], 2),
+            total_infracciones=round(item["infracciones"], 2),
+            por_categoria=item["categorias"],
+        ))
+
+    return ReporteComparativoResponse(
+        fecha_inicio=data.desde.isoformat(),
+        fecha_fin=data.hasta.isoformat(),
+        vehiculos=vehiculos,
+        no_encontradas=[p for p in data.patentes if not await replica_flota.existe(p)],
+    )
+
+# -------------------------------------------------------------------------
+# 3.2. GET /dashboard (Resumen de la Flota)
+# -------------------------------------------------------------------------
+
+async def get_resumen_costos_dashboard(dias_historia: int = 365) -> Dict[str, float]: 
+    """
+    Totales del período leídos del rollup CostosMensuales (decenas de filas por mes) en lugar de
+    recorrer Mantenimiento y Finanzas. La granularidad es mensual: incluye el mes de inicio completo.
+    """
+    mes_desde = (datetime.now() - timedelta(days=dias_historia)).strftime("%Y-%m")
+    pipeline = [
+        {"$match": {"mes": {"$gte": mes_desde}}},
+        {"$group": {
+            "_id": None,
+            "total_mantenimiento": {"$sum": {"$cond": [{"$eq": ["$origen", "Mantenimiento"]}, "$total", 0]}},
+            "total_infracciones": {"$sum": "$total_infracciones"},
+        }},
     ]
-    resumen_infr_result = await db_finanzas.aggregate(pipeline_infracciones).to_list(length=None) 
-    total_infracciones = resumen_infr_result[0]["total"] if resumen_infr_result and resumen_infr_result[0].get("total") is not None else 0.0
-    
+    resultado = await get_db_collection(COLECCION_COSTOS_MENSUALES).aggregate(pipeline).to_list(length=1)
+    totales = resultado[0] if resultado else {}
+
     return {
-        "total_mantenimiento": round(total_mantenimiento, 2),
-        "total_infracciones": round(total_infracciones, 2),
+        "total_mantenimiento": round(totales.get("total_mantenimiento", 0.0), 2),
+        "total_infracciones": round(totales.get("total_infracciones", 0.0), 2),
     }
 
 @router.get("/dashboard", response_model=DashboardResponse, summary="Obtiene un resumen de la flota para el dashboard.")
 async def get_dashboard_data():
-    db_vehiculos = get_db_collection("Vehiculos")
-
-    total_vehiculos = await db_vehiculos.count_documents({})
-    vehiculos_activos = await db_vehiculos.count_documents({"activo": True})
-    
-    resumen_costos = await get_resumen_costos_dashboard(dias_historia=365)
-    alertas_criticas = await get_vencimientos_criticos_alertas(dias_tolerancia=30)
+    # Ramas independientes en paralelo: la latencia es la de la más lenta. Conteos obligatorios;
+    # costos y alertas degradan a vacío si su consulta falla.
+    ramas = await en_paralelo({
+        "conteos": replica_flota.conteos(),
+        "costos": get_resumen_costos_dashboard(dias_historia=365),
+        "alertas": get_vencimientos_criticos_alertas(dias_tolerancia=30, limit=5),
+    })
+    total_vehiculos, vehiculos_activos = resultado_rama(ramas, "conteos")
+    resumen_costos = resultado_rama(ramas, "costos", {"total_mantenimiento": 0.0, "total_infracciones": 0.0})
+    alertas_criticas = resultado_rama(ramas, "alertas", [])
     
     total_general = resumen_costos["total_mantenimiento"] + resumen_costos["total_infracciones"]
     
     return DashboardResponse(
         total_vehiculos=total_vehiculos,
         vehiculos_activos=vehiculos_activos,
-        alertas_criticas_count=len(alertas_criticas),
+        ultimas_alertas=alertas_criticas,
         total_mantenimiento=resumen_costos["total_mantenimiento"],
         total_infracciones=resumen_costos["total_infracciones"],
         total_general=round(total_general, 2),
@@ -668,9 +1139,10 @@ async def delete_costo_manual(
     except: raise HTTPException(status_code=400, detail="ID inválido.")
 
     collection = get_db_collection(origen)
-    delete_result = await collection.delete_one({"_id": obj_id})
-    if delete_result.deleted_count == 0:
+    eliminado = await collection.find_one_and_delete({"_id": obj_id})
+    if eliminado is None:
         raise HTTPException(status_code=404, detail="Registro no encontrado.")
+    await registrar_escritura_costo(origen, antes=eliminado)
 
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
@@ -692,7 +1164,7 @@ def download_file(path_relativo: str = Query(..., description="Ruta relativa del
 # 6. ENDPOINT: LIMPIEZA MASIVA DE COSTOS BASURA 
 # =========================================================================
 
-@router.post("/costos/limpiar-basura", status_code=status.HTTP_200_OK, summary="Elimina en bulk todos los costos con monto 0 (basura del ETL).")
+@router.post("/costos/limpiar-basura", status_code=status.HTTP_200_OK, summary="Elimina en bulk todos los costos sin importe (basura del ETL).")
 async def limpiar_costos_basura(
     origen: Optional[str] = Query(None, description="Opcional: 'Finanzas' o 'Mantenimiento' para limitar la limpieza a una colección."),
     dry_run: bool = Query(False, description="Si True, simula la limpieza y solo cuenta cuántos se eliminarían (sin borrar).")
@@ -706,12 +1178,14 @@ async def limpiar_costos_basura(
     
     for col_name in colecciones:
         collection = get_db_collection(col_name)
-        filtro = {"costo_monto": 0} if col_name == "Mantenimiento" else {"MONTO": 0} 
+        # Misma regla que excluye estos costos de los reportes (importe <= 0 en cualquiera de sus campos)
+        filtro = {"excluido": EXCLUSION_SIN_IMPORTE}
         
         if dry_run:
             count = await collection.count_documents(filtro) 
             detalles[col_name] = count
         else:
+            await registrar_borrado_masivo_costos(col_name, filtro)
             resultado = await collection.delete_many(filtro)
             eliminados = resultado.deleted_count
             detalles[col_name] = eliminados
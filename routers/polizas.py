@@ -1,8 +1,14 @@
 # routers/polizas.py
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, status
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, status, Request, Response
 from fastapi.responses import StreamingResponse
-from dependencies import get_db_collection, get_gridfs_bucket, normalize_patente
+from dependencies import (
+    get_db_collection, get_gridfs_bucket, normalize_patente,
+    incrementar_version, version_coleccion, etag_para, responder_si_no_modificado
+)
+from replica_flota import replica_flota
+from esquema_vehiculos import ETAPA_INCREMENTO_REVISION
 from bson import ObjectId
+from pymongo import ReturnDocument
 from datetime import datetime
 import logging
 from pydantic import BaseModel, Field
@@ -36,7 +42,12 @@ class PolizaFinancieraUpdate(BaseModel):
 # ENDPOINTS DE ARCHIVOS (GridFS)
 # ==========================================
 @router.get("/", response_model=list[PolizaResponse])
-async def listar_polizas():
+async def listar_polizas(request: Request, response: Response):
+    etag = etag_para("polizas_seguros", await version_coleccion("polizas_seguros"))
+    no_modificado = responder_si_no_modificado(request, response, etag)
+    if no_modificado:
+        return no_modificado
+
     collection = get_db_collection("polizas_seguros")
     polizas = await collection.find().sort("fecha_subida", -1).to_list(100)
     return [
@@ -82,6 +93,7 @@ async def agregar_poliza(
     }
 
     result = await collection.insert_one(poliza_doc)
+    await incrementar_version("polizas_seguros")
 
     return PolizaResponse(
         id=str(result.inserted_id),
@@ -120,15 +132,16 @@ async def modificar_poliza(
         update_data["filename"] = file.filename
         update_data["file_id"] = str(new_file_id)
 
-    result = await collection.update_one(
+    poliza = await collection.find_one_and_update(
         {"_id": ObjectId(poliza_id)},
-        {"$set": update_data}
+        {"$set": update_data},
+        return_document=ReturnDocument.AFTER
     )
 
-    if result.modified_count == 0:
+    if not poliza:
         raise HTTPException(404, "Póliza no encontrada")
+    await incrementar_version("polizas_seguros")
 
-    poliza = await collection.find_one({"_id": ObjectId(poliza_id)})
     return {
         "id": str(poliza["_id"]),
         "empresa": poliza["empresa"],
@@ -149,6 +162,7 @@ async def eliminar_poliza(poliza_id: str):
 
     await bucket.delete(ObjectId(poliza["file_id"]))
     await collection.delete_one({"_id": ObjectId(poliza_id)})
+    await incrementar_version("polizas_seguros")
 
     return {"message": "Póliza eliminada correctamente"}
 
@@ -159,39 +173,28 @@ async def eliminar_poliza(poliza_id: str):
 async def actualizar_poliza_financiera(patente: str, data: PolizaFinancieraUpdate):
     patente_norm = normalize_patente(patente)
     db_vehiculos = get_db_collection("Vehiculos")
+    datos = data.model_dump()
 
-    # Intentamos actualizar el documento existente
-    result = await db_vehiculos.update_one(
+    # Una sola operación atómica: actualiza los elementos SEGURO/Poliza_Detalle del array o,
+    # si no hay ninguno, agrega uno nuevo (antes eran dos update_one y un lector podía ver el intermedio)
+    documentos = {"$ifNull": ["$documentos_digitales", []]}
+    es_seguro = {"$in": ["$$d.tipo", ["SEGURO", "Poliza_Detalle"]]}
+    vehiculo = await db_vehiculos.find_one_and_update(
         {"_id": patente_norm},
-        {
-            "$set": {
-                "documentos_digitales.$[elem].suma_asegurada": data.suma_asegurada,
-                "documentos_digitales.$[elem].costo_mensual": data.costo_mensual,
-                "documentos_digitales.$[elem].costo_semestral": data.costo_semestral,
-                "documentos_digitales.$[elem].monto_franquicia": data.monto_franquicia
-            }
-        },
-        array_filters=[{"elem.tipo": {"$in": ["SEGURO", "Poliza_Detalle"]}}]
+        [{"$set": {"documentos_digitales": {"$cond": [
+            {"$anyElementTrue": [{"$map": {"input": documentos, "as": "d", "in": es_seguro}}]},
+            {"$map": {
+                "input": documentos, "as": "d",
+                "in": {"$cond": [es_seguro, {"$mergeObjects": ["$$d", {"$literal": datos}]}, "$$d"]}
+            }},
+            {"$concatArrays": [documentos, [{"$literal": {"tipo": "SEGURO", **datos}}]]}
+        ]}}}, ETAPA_INCREMENTO_REVISION],
+        return_document=ReturnDocument.AFTER
     )
 
-    # Si no se modificó nada, podría ser porque no existe el array o no tiene el elemento "SEGURO"
-    if result.matched_count == 0:
+    if not vehiculo:
         raise HTTPException(status_code=404, detail="Vehículo no encontrado")
 
-    if result.modified_count == 0:
-        await db_vehiculos.update_one(
-            {"_id": patente_norm},
-            {
-                "$push": {
-                    "documentos_digitales": {
-                        "tipo": "SEGURO",
-                        "suma_asegurada": data.suma_asegurada,
-                        "costo_mensual": data.costo_mensual,
-                        "costo_semestral": data.costo_semestral,
-                        "monto_franquicia": data.monto_franquicia
-                    }
-                }
-            }
-        )
+    await replica_flota.registrar(vehiculo)
 
     return {"message": "Datos financieros de la póliza actualizados correctamente"}
\ No newline at end of file
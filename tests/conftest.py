@@ -0,0 +1,223 @@
+# tests/conftest.py
+# Los endpoints se prueban de punta a punta (httpx + ASGI) contra mongomock envuelto con la parte de
+# la API de Motor que usan los routers. El cliente falso reemplaza dependencies._client, así que
+# get_db_collection, get_mongo_client y las transacciones pasan por acá. Los huecos de mongomock que
+# usa el código (bulk_write con operaciones de pymongo 4.x, etapa $unset) se cubren a nivel de clase,
+# así también los ven los scripts sincrónicos (migraciones, backfills).
+
+import os
+import sys
+import asyncio
+from typing import Any
+
+import httpx
+import mongomock
+import pytest
+from pymongo import DeleteOne, InsertOne, ReplaceOne, UpdateOne
+from pymongo.results import BulkWriteResult
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dependencies  # noqa: E402
+
+
+def _etapas_compatibles(update):
+    """mongomock no implementa la etapa $unset en updates con pipeline: se traduce a su $project equivalente."""
+    if not isinstance(update, list):
+        return update
+    return [
+        {"$project": {clave: 0 for clave in ([etapa["$unset"]] if isinstance(etapa["$unset"], str) else etapa["$unset"])}}
+        if "$unset" in etapa else etapa
+        for etapa in update
+    ]
+
+
+def _bulk_write(self, operaciones, ordered=True, **kwargs):
+    """bulk_write de mongomock no entiende las operaciones de pymongo 4.x: se aplican una por una."""
+    resultado = {"nInserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": [], "writeErrors": []}
+    for indice, op in enumerate(operaciones):
+        if isinstance(op, (UpdateOne, ReplaceOne)):
+            if isinstance(op, UpdateOne):
+                r = self.update_one(op._filter, op._doc, upsert=op._upsert)
+            else:
+                r = self.replace_one(op._filter, op._doc, upsert=op._upsert)
+            if r.upserted_id is not None:
+                resultado["upserted"].append({"index": indice, "_id": r.upserted_id})
+            else:
+                resultado["nMatched"] += r.matched_count
+                resultado["nModified"] += r.modified_count
+        elif isinstance(op, DeleteOne):
+            resultado["nRemoved"] += self.delete_one(op._filter).deleted_count
+        elif isinstance(op, InsertOne):
+            self.insert_one(op._doc)
+            resultado["nInserted"] += 1
+        else:
+            raise NotImplementedError(type(op))
+    return BulkWriteResult(resultado, True)
+
+
+def _con_etapas_compatibles(metodo):
+    def _metodo(self, filtro, update, *args, **kwargs):
+        return metodo(self, filtro, _etapas_compatibles(update), *args, **kwargs)
+    return _metodo
+
+
+mongomock.Collection.bulk_write = _bulk_write
+for _nombre in ("update_one", "update_many", "find_one_and_update"):
+    setattr(mongomock.Collection, _nombre, _con_etapas_compatibles(getattr(mongomock.Collection, _nombre)))
+
+
+class CursorAsync:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, n):
+        self._cursor = self._cursor.limit(n)
+        return self
+
+    async def to_list(self, length=None):
+        docs = list(self._cursor)
+        return docs if length is None else docs[:length]
+
+    def __aiter__(self):
+        return self._iterar()
+
+    async def _iterar(self):
+        for doc in self._cursor:
+            yield doc
+
+
+class ColeccionAsync:
+    """Métodos async de Motor sobre una colección de mongomock (session se ignora)."""
+
+    def __init__(self, coleccion):
+        self._coleccion = coleccion
+
+    def __getattr__(self, nombre):
+        metodo = getattr(self._coleccion, nombre)
+
+        async def _async(*args, session=None, **kwargs):
+            return metodo(*args, **kwargs)
+        return _async
+
+    async def bulk_write(self, operaciones, ordered=True, session=None):
+        return self._coleccion.bulk_write(operaciones, ordered=ordered)
+
+    def find(self, *args, session=None, **kwargs):
+        return CursorAsync(self._coleccion.find(*args, **kwargs))
+
+    def aggregate(self, pipeline, session=None, **kwargs):
+        return CursorAsync(iter(self._coleccion.aggregate(pipeline)))
+
+
+class BaseAsync:
+    def __init__(self, db):
+        self._db = db
+
+    def __getitem__(self, nombre):
+        return ColeccionAsync(self._db[nombre])
+
+
+class _Contexto:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class SesionFalsa(_Contexto):
+    def start_transaction(self):
+        return _Contexto()
+
+
+class ClienteAsync:
+    def __init__(self):
+        self.sync = mongomock.MongoClient()
+
+    def __getitem__(self, nombre):
+        return BaseAsync(self.sync[nombre])
+
+    async def start_session(self):
+        return SesionFalsa()
+
+
+class BucketFalso:
+    """GridFS mínimo: un documento en fs.files por archivo (sin chunks)."""
+
+    def __init__(self, db):
+        self._files = db["fs.files"]
+
+    async def upload_from_stream(self, filename, contenido, metadata=None):
+        result = self._files.insert_one({"filename": filename, "length": len(contenido), "metadata": metadata or {}})
+        return result.inserted_id
+
+    async def delete(self, file_id):
+        from gridfs.errors import NoFile
+        if not self._files.delete_one({"_id": file_id}).deleted_count:
+            raise NoFile(file_id)
+
+
+@pytest.fixture
+def cliente_mongo(monkeypatch):
+    import main  # noqa: F401  (carga los routers antes de reemplazar get_gridfs_bucket en ellos)
+    cliente = ClienteAsync()
+    monkeypatch.setattr(dependencies, "_client", cliente)
+
+    async def _bucket():
+        return BucketFalso(cliente.sync[dependencies.DB_NAME])
+    monkeypatch.setattr(dependencies, "get_gridfs_bucket", _bucket)
+    for modulo in ("routers.costos", "routers.flota", "limpieza_gridfs"):
+        if modulo in sys.modules and hasattr(sys.modules[modulo], "get_gridfs_bucket"):
+            monkeypatch.setattr(sys.modules[modulo], "get_gridfs_bucket", _bucket)
+
+    from replica_flota import replica_flota
+    monkeypatch.setattr(replica_flota, "_version", None)
+    return cliente
+
+
+@pytest.fixture
+def db(cliente_mongo):
+    """Base sincrónica (mongomock) para preparar y verificar datos."""
+    return cliente_mongo.sync[dependencies.DB_NAME]
+
+
+@pytest.fixture
+def app(cliente_mongo):
+    import main
+    return main.app
+
+
+@pytest.fixture
+def alertas_refrescadas(cliente_mongo, monkeypatch):
+    """
+    Patentes cuyas alertas refrescaría la API: el refresco real ($unionWith, $merge) no corre en
+    mongomock y se prueba aparte (test_alertas_vencimiento.py).
+    """
+    patentes = []
+
+    async def _refrescar(patente):
+        patentes.append(patente)
+    for modulo in ("routers.flota", "routers.archivos", "routers.documentacion"):
+        monkeypatch.setattr(sys.modules[modulo], "refrescar_alertas_vencimiento", _refrescar)
+    return patentes
+
+
+def pedir(app, metodo: str, url: str, **kwargs: Any) -> httpx.Response:
+    """Request contra la app ASGI (sin startup: la conexión ya es el cliente falso)."""
+    async def _pedir():
+        from replica_flota import replica_flota
+        replica_flota._lock = asyncio.Lock()  # cada asyncio.run crea un loop nuevo
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://test") as cliente:
+            return await cliente.request(metodo, url, **kwargs)
+    return asyncio.run(_pedir())
+
+
+def ejecutar(corrutina) -> Any:
+    return asyncio.run(corrutina)
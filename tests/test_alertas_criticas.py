@@ -0,0 +1,82 @@
+# tests/test_alertas_criticas.py
+# Lectura paginada de AlertasVencimiento (GET /alertas/criticas): total, orden y cursor keyset.
+from datetime import datetime, timedelta
+
+import routers.flota as flota
+from alertas_vencimiento import COLECCION_ALERTAS
+from conftest import pedir
+
+
+def _cargar_alertas(db, ahora):
+    filas = [
+        ("AB123CD", "VTV", 3), ("AB123CD", "SEGURO", 3), ("CD456EF", "VTV", -2), ("EF789GH", "SEGURO", 10),
+        ("GH012IJ", "SEGURO", 20), ("IJ345KL", "SEGURO", 3), ("KL678MN", "VTV", 90),
+    ]
+    db[COLECCION_ALERTAS].insert_many([
+        {"patente": patente, "tipo_documento": tipo, "fecha_vencimiento": ahora + timedelta(days=dias),
+         "movil_nro": "12", "descripcion_modelo": "Kangoo"}
+        for patente, tipo, dias in filas
+    ])
+
+
+def _paginas(app, limit, al_pedir=None):
+    claves, cursor, pedidos = [], None, 0
+    while True:
+        if al_pedir:
+            al_pedir(pedidos)
+        url = f"/alertas/criticas?limit={limit}" + (f"&cursor={cursor}" if cursor else "")
+        respuesta = pedir(app, "GET", url)
+        assert respuesta.status_code == 200, respuesta.text
+        datos = respuesta.json()
+        claves += [(a["patente"], a["tipo_documento"]) for a in datos["alertas"]]
+        pedidos += 1
+        cursor = datos["next_cursor"]
+        if not cursor:
+            return claves, datos["total"]
+
+
+def test_alertas_criticas_total_y_prioridad(app, db):
+    _cargar_alertas(db, datetime.utcnow())
+
+    datos = pedir(app, "GET", "/alertas/criticas?limit=10").json()
+
+    assert datos["total"] == 6  # la de 90 días queda fuera de la tolerancia de 30
+    vencida = next(a for a in datos["alertas"] if a["patente"] == "CD456EF")
+    assert vencida["prioridad"] == "CRÍTICA" and vencida["mensaje"].startswith("VENCIDO")
+    assert next(a for a in datos["alertas"] if a["patente"] == "GH012IJ")["prioridad"] == "ALTA"
+
+
+def test_alertas_criticas_cursor_recorre_todas_sin_repetir(app, db):
+    _cargar_alertas(db, datetime.utcnow())
+
+    completa = [(a["patente"], a["tipo_documento"]) for a in pedir(app, "GET", "/alertas/criticas?limit=50").json()["alertas"]]
+    paginada, total = _paginas(app, limit=2)
+
+    assert paginada == completa
+    assert len(set(paginada)) == total == 6
+
+
+def test_alertas_criticas_cursor_estable_al_cambiar_el_dia(app, db, monkeypatch):
+    ahora = datetime.utcnow()
+    _cargar_alertas(db, ahora)
+
+    class _Reloj(datetime):
+        desfase = timedelta(0)
+
+        @classmethod
+        def utcnow(cls):
+            return ahora + cls.desfase
+
+    def _pasar_medianoche(pedidos):
+        _Reloj.desfase = timedelta(days=pedidos)  # cada página se pide un día después de la anterior
+    monkeypatch.setattr(flota, "datetime", _Reloj)
+
+    paginada, _ = _paginas(app, limit=2, al_pedir=_pasar_medianoche)
+
+    assert len(paginada) == len(set(paginada))
+    vencen_antes = {("AB123CD", "VTV"), ("AB123CD", "SEGURO"), ("CD456EF", "VTV"), ("IJ345KL", "SEGURO"), ("EF789GH", "SEGURO")}
+    assert vencen_antes <= set(paginada)
+
+
+def test_alertas_criticas_cursor_invalido(app, db):
+    assert pedir(app, "GET", "/alertas/criticas?cursor=no-es-un-cursor").status_code == 400
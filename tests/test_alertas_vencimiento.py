@@ -0,0 +1,46 @@
+# tests/test_alertas_vencimiento.py
+# Materialización de AlertasVencimiento: tipos normalizados y refresco incremental por patente.
+# mongomock no ejecuta $unionWith ni $merge: el refresco se verifica con el pipeline que envía.
+from datetime import datetime, timedelta
+
+import conftest
+import dependencies
+from alertas_vencimiento import COLECCION_ALERTAS, normalizar_tipo_vencimiento, pipeline_materializar_alertas
+from conftest import ejecutar
+
+
+def test_tipos_de_poliza_se_unifican_como_seguro():
+    assert [normalizar_tipo_vencimiento(t) for t in ("SEGURO", "Poliza_Detalle", "POLIZA_SEGURO_DIGITAL", "VTV")] == \
+        ["SEGURO", "SEGURO", "SEGURO", "VTV"]
+
+
+def test_marca_de_las_filas_es_un_parametro():
+    marca = datetime(2026, 5, 1, 12, 0)
+    assert pipeline_materializar_alertas("AB123CD", actualizado_en=marca)[-1]["$project"]["actualizado_en"] == {"$literal": marca}
+    assert pipeline_materializar_alertas("AB123CD")[-1]["$project"]["actualizado_en"] == "$$NOW"
+
+
+def test_refresco_escribe_con_su_marca_y_borra_las_filas_viejas(cliente_mongo, db, monkeypatch):
+    ahora = datetime.utcnow()
+    db[COLECCION_ALERTAS].insert_many([
+        {"_id": "AB123CD_VTV", "patente": "AB123CD", "tipo_documento": "VTV", "actualizado_en": ahora - timedelta(days=1)},
+        {"_id": "CD456EF_VTV", "patente": "CD456EF", "tipo_documento": "VTV", "actualizado_en": ahora - timedelta(days=1)},
+    ])
+    pipelines = []
+    aggregate_original = conftest.ColeccionAsync.aggregate
+
+    def _aggregate(self, pipeline, session=None, **kwargs):
+        if pipeline and "$merge" in pipeline[-1]:
+            pipelines.append(pipeline)
+            return conftest.CursorAsync(iter([]))
+        return aggregate_original(self, pipeline, session=session, **kwargs)
+    monkeypatch.setattr(conftest.ColeccionAsync, "aggregate", _aggregate)
+
+    ejecutar(dependencies.refrescar_alertas_vencimiento("AB123CD"))
+
+    (pipeline,) = pipelines
+    assert pipeline[-1]["$merge"]["into"] == COLECCION_ALERTAS
+    marca = pipeline[-2]["$project"]["actualizado_en"]["$literal"]
+    assert marca >= ahora
+    # La fila que no volvió a materializarse se borra; las de otras patentes no se tocan
+    assert [doc["_id"] for doc in db[COLECCION_ALERTAS].find()] == ["CD456EF_VTV"]
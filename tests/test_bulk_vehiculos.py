@@ -0,0 +1,75 @@
+# tests/test_bulk_vehiculos.py
+# Alta/actualización masiva (POST /vehiculos/bulk): estado por fila de altas, actualizaciones y errores.
+import json
+
+from conftest import pedir
+
+
+def _ndjson(*filas):
+    return "\n".join(json.dumps(fila) for fila in filas).encode()
+
+
+def _bulk(app, cuerpo, content_type="application/x-ndjson"):
+    respuesta = pedir(app, "POST", "/vehiculos/bulk", content=cuerpo, headers={"Content-Type": content_type})
+    assert respuesta.status_code == 200, respuesta.text
+    return respuesta.json()
+
+
+def _estados(datos):
+    return [(r["fila"], r["patente"], r["estado"]) for r in datos["resultados"]]
+
+
+def test_bulk_altas_actualizaciones_y_errores(app, db):
+    db["Vehiculos"].insert_one({"_id": "AB123CD", "patente_original": "AB123CD", "activo": True,
+                                "marca": "Renault", "schema_version": 1})
+
+    datos = _bulk(app, _ndjson(
+        {"patente": "cd-456-ef", "marca": "Fiat", "anio": 2020},
+        {"patente": "AB123CD", "color": "Blanco"},
+        {"patente": "CD456EF", "marca": "Ford"},
+        {"patente": "EF789GH", "anio": "no es un año"},
+    ))
+
+    assert _estados(datos) == [
+        (1, "CD456EF", "creado"), (2, "AB123CD", "actualizado"), (3, "CD456EF", "error"), (4, "EF789GH", "error"),
+    ]
+    assert (datos["total"], datos["creados"], datos["actualizados"], datos["errores"]) == (4, 1, 1, 2)
+    nuevo = db["Vehiculos"].find_one({"_id": "CD456EF"})
+    assert (nuevo["marca"], nuevo["anio"], nuevo["patente_original"]) == ("Fiat", 2020, "CD-456-EF")
+    existente = db["Vehiculos"].find_one({"_id": "AB123CD"})
+    assert (existente["marca"], existente["color"], existente["revision"]) == ("Renault", "Blanco", 1)
+
+
+def test_bulk_csv_y_filas_sin_cambios(app, db):
+    db["Vehiculos"].insert_one({"_id": "AB123CD", "patente_original": "AB123CD", "activo": True, "schema_version": 1})
+
+    datos = _bulk(app, "patente;marca;anio\nAB123CD;;\nGH012IJ;Peugeot;2018\n".encode(), "text/csv")
+
+    assert _estados(datos) == [(1, "AB123CD", "sin_cambios"), (2, "GH012IJ", "creado")]
+    assert db["Vehiculos"].find_one({"_id": "GH012IJ"})["marca"] == "Peugeot"
+
+
+def test_bulk_actualizacion_de_un_vehiculo_borrado_es_no_encontrado(app, db):
+    db["Vehiculos"].insert_many([
+        {"_id": patente, "patente_original": patente, "activo": True, "schema_version": 1}
+        for patente in ("AB123CD", "CD456EF")
+    ])
+    assert pedir(app, "GET", "/vehiculos").status_code == 200  # carga la réplica
+    db["Vehiculos"].delete_one({"_id": "CD456EF"})  # borrado que la réplica todavía no vio
+
+    datos = _bulk(app, _ndjson({"patente": "AB123CD", "color": "Rojo"}, {"patente": "CD456EF", "color": "Gris"}))
+
+    assert _estados(datos) == [(1, "AB123CD", "actualizado"), (2, "CD456EF", "no_encontrado")]
+    assert (datos["actualizados"], datos["no_encontrados"]) == (1, 1)
+    assert db["Vehiculos"].count_documents({"_id": "CD456EF"}) == 0
+
+
+def test_bulk_rechaza_lotes_grandes_y_tipos_desconocidos(app, monkeypatch):
+    import routers.flota as flota
+    monkeypatch.setattr(flota, "MAX_FILAS_BULK", 1)
+
+    respuesta = pedir(app, "POST", "/vehiculos/bulk", content=_ndjson({"patente": "AB123CD"}, {"patente": "CD456EF"}),
+                      headers={"Content-Type": "application/x-ndjson"})
+    assert respuesta.status_code == 413
+    respuesta = pedir(app, "POST", "/vehiculos/bulk", content=b"{}", headers={"Content-Type": "application/json"})
+    assert respuesta.status_code == 415
@@ -0,0 +1,45 @@
+# tests/test_busqueda_vehiculos.py
+# GET /vehiculos?filtro= sobre el campo indexado search_tokens.
+from busqueda_vehiculos import campos_busqueda, tokens_campo, tokens_de_busqueda
+from conftest import pedir
+
+
+def _vehiculo(db, patente, **campos):
+    doc = {"_id": patente, "patente_original": patente, "activo": True, "schema_version": 1, **campos}
+    db["Vehiculos"].insert_one({**doc, **campos_busqueda(doc)})
+
+
+def test_tokens_de_patente_y_de_texto():
+    assert {"ab", "123", "b12", "ab123cd"} <= set(tokens_campo("patente", "AB123CD"))
+    assert tokens_campo("marca", "Citroën") == ["c", "ci", "cit", "citr", "citro", "citroe", "citroen"]
+    assert tokens_campo("modelo", "N/A") == []
+    assert tokens_de_busqueda("  Kangoo kangoo 12 ") == ["kangoo", "12"]
+
+
+def test_filtro_busca_por_patente_movil_y_modelo(app, db):
+    _vehiculo(db, "AB123CD", nro_movil="12", marca="Renault", modelo="Kangoo")
+    _vehiculo(db, "CD456EF", nro_movil="123", marca="Fiat", modelo="Strada")
+    _vehiculo(db, "EF789GH", nro_movil="7", marca="Renault", modelo="Kangoo Express")
+
+    def _patentes(filtro):
+        respuesta = pedir(app, "GET", "/vehiculos", params={"filtro": filtro})
+        assert respuesta.status_code == 200, respuesta.text
+        return [v["_id"] for v in respuesta.json()]  # Vehiculo se serializa con alias (_id)
+
+    assert _patentes("renault kang") == ["AB123CD", "EF789GH"]
+    assert _patentes("express") == ["EF789GH"]
+    # Relevancia: patente exacta, después móvil exacto, después el resto
+    assert _patentes("123") == ["CD456EF", "AB123CD"]
+    assert _patentes("ab123cd") == ["AB123CD"]
+    assert _patentes("peugeot") == []
+
+
+def test_patch_recalcula_los_tokens_en_la_misma_escritura(app, db):
+    _vehiculo(db, "AB123CD", nro_movil="12", marca="Renault", modelo="Kangoo")
+
+    respuesta = pedir(app, "PATCH", "/vehiculos/AB123CD", json={"modelo": "Master"})
+    assert respuesta.status_code == 200, respuesta.text
+
+    tokens = set(db["Vehiculos"].find_one({"_id": "AB123CD"})["search_tokens"])
+    assert {"master", "renault", "12"} <= tokens
+    assert "kangoo" not in tokens
@@ -0,0 +1,47 @@
+# tests/test_clasificacion_costos.py
+# Clasificación al escribir (categoria / excluido) y backfill de los documentos existentes.
+from bson import ObjectId
+
+from clasificacion_costos import backfill_coleccion, clasificacion_guardada, clasificar
+from versiones import COLECCION_METADATOS, filtro_version
+
+
+def test_clasificar_multas_exclusiones_y_categorias():
+    assert clasificar({"MONTO": 500, "motivo": "Infracción por exceso de velocidad"}, "Finanzas") == \
+        {"categoria": "Multa", "excluido": None}
+    assert clasificar({"importe": 80.0, "tipo_costo": "Seguro", "descripcion": "Cuota marzo"}, "Finanzas") == \
+        {"categoria": "Seguro", "excluido": None}
+    assert clasificar({"MONTO": "30", "DETALLE": "Devolución de patente"}, "Finanzas") == \
+        {"categoria": "Otros", "excluido": "no_es_gasto"}
+    assert clasificar({"costo_monto": 0, "descripcion": "Cambio de aceite"}, "Mantenimiento") == \
+        {"categoria": "Mantenimiento", "excluido": "sin_importe"}
+    assert clasificar({"COSTO_MONTO": "no numérico"}, "Mantenimiento")["excluido"] == "sin_importe"
+    # El importe del ETL tiene prioridad sobre el de la carga manual
+    assert clasificar({"costo_monto": 0, "importe": 100.0}, "Mantenimiento")["excluido"] == "sin_importe"
+
+
+def test_clasificacion_guardada_de_un_documento_sin_clasificar():
+    assert clasificacion_guardada({"MONTO": 10, "motivo": "Multa"}, "Finanzas") == {"categoria": "Otros", "excluido": None}
+    assert clasificacion_guardada({"categoria": "Multa", "excluido": "no_es_gasto"}, "Finanzas") == \
+        {"categoria": "Multa", "excluido": "no_es_gasto"}
+
+
+def test_backfill_clasifica_solo_los_pendientes(db):
+    ya_clasificado = {"_id": ObjectId(), "MONTO": 0, "motivo": "Multa", "categoria": "Seguro", "excluido": None}
+    db["Finanzas"].insert_many([
+        {"_id": "uuid-1", "MONTO": 200, "motivo": "Multa por vía prohibida"},
+        {"_id": ObjectId(), "MONTO": 50, "TIPO": "Patente"},
+        ya_clasificado,
+    ])
+
+    assert backfill_coleccion(db, "Finanzas", dry_run=True) == 2
+    assert backfill_coleccion(db, "Finanzas", lote=1) == 2
+
+    assert db["Finanzas"].find_one({"_id": "uuid-1"})["categoria"] == "Multa"
+    assert db["Finanzas"].find_one({"TIPO": "Patente"})["categoria"] == "Patente"
+    assert db["Finanzas"].find_one({"_id": ya_clasificado["_id"]})["categoria"] == "Seguro"  # sin --todos no se toca
+    assert db[COLECCION_METADATOS].find_one(filtro_version("Finanzas"))["version"] == 1
+
+    assert backfill_coleccion(db, "Finanzas", todos=True) == 1  # ahora sí: monto 0 y motivo de multa
+    assert db["Finanzas"].find_one({"_id": ya_clasificado["_id"]}) | {"_id": None} == \
+        {**ya_clasificado, "_id": None, "categoria": "Multa", "excluido": "sin_importe"}
@@ -0,0 +1,63 @@
+# tests/test_costos_lote.py
+import json
+
+from conftest import pedir
+from costos_mensuales import COLECCION_COSTOS_MENSUALES
+from libro_costos import COLECCION_COSTOS
+
+FACTURA = b"%PDF-1.4 factura del taller"
+OTRA_FACTURA = b"%PDF-1.4 otro comprobante"
+
+
+def _costo(patente, importe, comprobante_index=None):
+    return {"patente": patente, "tipo_costo": "Reparación", "fecha": "2025-03-15", "descripcion": "Renglón de factura",
+            "importe": importe, "origen": "Mantenimiento", "comprobante_index": comprobante_index}
+
+
+def _cargar_lote(app, costos, archivos):
+    return pedir(app, "POST", "/costos/manual/batch", data={"costos": json.dumps(costos)}, files=[
+        ("comprobantes", (f"comprobante_{i}.pdf", contenido, "application/pdf")) for i, contenido in enumerate(archivos)
+    ])
+
+
+def test_lote_deduplica_comprobantes_e_inserta_todo(app, db):
+    respuesta = _cargar_lote(
+        app, [_costo("AB123CD", 100, 0), _costo("AB123CD", 50, 1), _costo("ZZ999ZZ", 30, 2)],
+        [FACTURA, FACTURA, OTRA_FACTURA],
+    )
+
+    assert respuesta.status_code == 201, respuesta.text
+    cuerpo = respuesta.json()
+    assert cuerpo["comprobantes_subidos"] == 2
+    assert cuerpo["file_ids"][0] == cuerpo["file_ids"][1] != cuerpo["file_ids"][2]
+    assert db["fs.files"].count_documents({}) == 2
+    assert db["Mantenimiento"].count_documents({}) == 3
+    assert db[COLECCION_COSTOS].count_documents({}) == 3
+    fila = db[COLECCION_COSTOS_MENSUALES].find_one({"_id": "AB123CD|2025-03|Mantenimiento|Mantenimiento"})
+    assert fila["total"] == 150.0 and fila["cantidad"] == 2
+
+
+def test_lote_rechaza_indice_de_comprobante_inexistente(app, db):
+    respuesta = _cargar_lote(app, [_costo("AB123CD", 100, 3)], [FACTURA])
+    assert respuesta.status_code == 422
+    assert db["Mantenimiento"].count_documents({}) == 0
+
+
+def test_borrar_vehiculo_conserva_comprobante_compartido(app, db):
+    db["Vehiculos"].insert_many([{"_id": "AB123CD"}, {"_id": "ZZ999ZZ"}])
+    respuesta = _cargar_lote(
+        app, [_costo("AB123CD", 100, 0), _costo("ZZ999ZZ", 40, 0), _costo("AB123CD", 20, 1)],
+        [FACTURA, OTRA_FACTURA],
+    )
+    assert respuesta.status_code == 201, respuesta.text
+    compartido, propio = respuesta.json()["file_ids"][0], respuesta.json()["file_ids"][2]
+
+    respuesta = pedir(app, "DELETE", "/vehiculos/AB123CD")
+    assert respuesta.status_code == 202, respuesta.text
+
+    restantes = {str(doc["_id"]) for doc in db["fs.files"].find()}
+    assert compartido in restantes
+    assert propio not in restantes
+    estado = pedir(app, "GET", respuesta.json()["estado_url"]).json()
+    assert estado["estado"] == "completada"
+    assert estado["archivos_compartidos"] == 1
@@ -0,0 +1,76 @@
+# tests/test_costos_mensuales.py
+# El rollup que dejan las escrituras incrementales tiene que ser el mismo que daría reconstruirlo.
+# La reconstrucción real es un pipeline ($unionWith, $convert) que mongomock no ejecuta: acá se
+# calcula con fila_costo, que aplica la misma regla fila por fila.
+from datetime import datetime
+
+from bson import ObjectId
+
+from conftest import pedir
+from costos_mensuales import COLECCION_COSTOS_MENSUALES, fila_costo, id_costo_mensual
+
+PATENTE = "AB123CD"
+
+
+def _reconstruccion(db):
+    filas = {}
+    for origen in ("Mantenimiento", "Finanzas"):
+        for doc in db[origen].find():
+            fila = fila_costo(doc, origen)
+            if not fila:
+                continue
+            clave = id_costo_mensual(fila["patente"], fila["mes"], fila["origen"], fila["categoria"])
+            total, infracciones, cantidad = filas.get(clave, (0.0, 0.0, 0))
+            filas[clave] = (total + fila["importe"], infracciones + (fila["importe"] if fila["es_multa"] else 0.0), cantidad + 1)
+    return filas
+
+
+def _rollup(db):
+    return {fila["_id"]: (fila["total"], fila["total_infracciones"], fila["cantidad"])
+            for fila in db[COLECCION_COSTOS_MENSUALES].find()}
+
+
+def _cargar_rollup(db):
+    db[COLECCION_COSTOS_MENSUALES].insert_many([
+        {"_id": clave, "total": total, "total_infracciones": infracciones, "cantidad": cantidad}
+        for clave, (total, infracciones, cantidad) in _reconstruccion(db).items()
+    ])
+
+
+def test_escrituras_incrementales_igual_a_reconstruir(app, db):
+    mantenimiento_id, multa_id = ObjectId(), ObjectId()
+    db["Mantenimiento"].insert_one({"_id": mantenimiento_id, "patente": PATENTE, "costo_monto": 100.0,
+                                    "fecha_evento": datetime(2025, 3, 1), "categoria": "Mantenimiento", "excluido": None})
+    db["Finanzas"].insert_one({"_id": multa_id, "patente": PATENTE, "MONTO": 60.0, "motivo": "Multa por exceso de velocidad",
+                               "fecha_evento": datetime(2025, 3, 2), "categoria": "Multa", "excluido": None})
+    _cargar_rollup(db)
+
+    alta = pedir(app, "POST", "/costos/manual/json", json={
+        "patente": PATENTE, "tipo_costo": "Seguro", "fecha": "2025-04-05", "descripcion": "Cuota", "importe": 30.0, "origen": "Finanzas",
+    })
+    assert alta.status_code == 200, alta.text
+    edicion = pedir(app, "PATCH", f"/monto/mantenimiento/{mantenimiento_id}", json={"monto": 150.0})
+    assert edicion.status_code == 200, edicion.text
+    baja = pedir(app, "DELETE", f"/costos/manual/{multa_id}?origen=Finanzas")
+    assert baja.status_code == 204, baja.text
+
+    assert _rollup(db) == _reconstruccion(db)
+    assert _rollup(db) == {
+        f"{PATENTE}|2025-03|Mantenimiento|Mantenimiento": (150.0, 0.0, 1),
+        f"{PATENTE}|2025-04|Finanzas|Seguro": (30.0, 0.0, 1),
+    }
+
+
+def test_baja_de_un_costo_sin_clasificar_descuenta_la_fila_de_la_reconstruccion(app, db):
+    # Documento anterior al backfill de clasificacion_costos.py: la reconstrucción lo cuenta como
+    # incluido y en "Otros" aunque el motivo diga multa; la baja lo tiene que restar de esa fila.
+    legado_id = ObjectId()
+    db["Finanzas"].insert_one({"_id": legado_id, "patente": PATENTE, "MONTO": 45.0, "motivo": "MULTA VIA PROHIBIDA",
+                               "fecha_evento": datetime(2025, 3, 9)})
+    _cargar_rollup(db)
+    assert _rollup(db) == {f"{PATENTE}|2025-03|Finanzas|Otros": (45.0, 0.0, 1)}
+
+    respuesta = pedir(app, "DELETE", f"/costos/manual/{legado_id}?origen=Finanzas")
+
+    assert respuesta.status_code == 204, respuesta.text
+    assert _rollup(db) == {}
@@ -0,0 +1,47 @@
+# tests/test_costos_unificados.py
+# GET /costos/unificado/{patente}: filas y totales en una sola agregación ($facet).
+# mongomock no ejecuta $unionWith: la agregación de Mantenimiento devuelve un resultado fijo.
+import routers.costos as costos
+from conftest import CursorAsync, pedir
+
+
+def _con_resultado(monkeypatch, resultado):
+    pipelines = []
+
+    class _Mantenimiento:
+        def aggregate(self, pipeline):
+            pipelines.append(pipeline)
+            return CursorAsync(iter([resultado]))
+    monkeypatch.setattr(costos, "get_db_collection", lambda nombre: _Mantenimiento())
+    return pipelines
+
+
+def test_unificado_una_agregacion_con_filas_y_totales(app, monkeypatch):
+    gasto = {"id": "1", "tipo": "Service", "descripcion": "Aceite", "importe": 100.0, "origen": "mantenimiento",
+             "comprobante_file_id": None, "fecha": "2025-03-01T00:00:00"}
+    pipelines = _con_resultado(monkeypatch, {
+        "gastos": [gasto],
+        "totales": [{"_id": None, "total_general": 250.555, "total_mantenimiento": 100.0, "total_multas": 120.0}],
+    })
+
+    respuesta = pedir(app, "GET", "/costos/unificado/ab-123-cd")
+
+    assert respuesta.status_code == 200, respuesta.text
+    assert respuesta.json() == {
+        "patente": "AB123CD", "gastos": [gasto], "total_general": 250.56, "total_mantenimiento": 100.0,
+        "total_multas": 120.0, "total_otras": 30.56,
+    }
+    (pipeline,) = pipelines
+    assert pipeline[0]["$match"]["patente"] == "AB123CD"
+    union = next(etapa["$unionWith"] for etapa in pipeline if "$unionWith" in etapa)
+    assert union["coll"] == "Finanzas" and union["pipeline"][0] == pipeline[0]  # mismo filtro en ambas colecciones
+    assert set(pipeline[-1]["$facet"]) == {"gastos", "totales"}
+
+
+def test_unificado_sin_gastos_devuelve_totales_en_cero(app, monkeypatch):
+    _con_resultado(monkeypatch, {"gastos": [], "totales": []})
+
+    datos = pedir(app, "GET", "/costos/unificado/AB123CD").json()
+
+    assert datos["gastos"] == []
+    assert (datos["total_general"], datos["total_mantenimiento"], datos["total_multas"], datos["total_otras"]) == (0, 0, 0, 0)
@@ -0,0 +1,54 @@
+# tests/test_dashboard_reporte.py
+# Endpoints compuestos (ramas en paralelo): lo que calcula cada rama tiene que llegar a la respuesta.
+from datetime import datetime
+
+from conftest import CursorAsync, pedir
+from costos_mensuales import COLECCION_COSTOS_MENSUALES
+from dependencies import Alerta
+
+PATENTE = "AB123CD"
+
+
+def test_dashboard_incluye_totales_de_costos(app, db):
+    db["Vehiculos"].insert_many([
+        {"_id": PATENTE, "patente": PATENTE, "activo": True},
+        {"_id": "ZZ999ZZ", "patente": "ZZ999ZZ", "activo": False},
+    ])
+    mes = datetime.now().strftime("%Y-%m")
+    db[COLECCION_COSTOS_MENSUALES].insert_many([
+        {"patente": PATENTE, "mes": mes, "origen": "Mantenimiento", "categoria": "Mantenimiento",
+         "total": 100.0, "total_infracciones": 0.0, "cantidad": 1},
+        {"patente": PATENTE, "mes": mes, "origen": "Finanzas", "categoria": "Multa",
+         "total": 40.0, "total_infracciones": 40.0, "cantidad": 1},
+    ])
+
+    respuesta = pedir(app, "GET", "/dashboard")
+
+    assert respuesta.status_code == 200, respuesta.text
+    datos = respuesta.json()
+    assert (datos["total_vehiculos"], datos["vehiculos_activos"]) == (2, 1)
+    assert (datos["total_mantenimiento"], datos["total_infracciones"], datos["total_general"]) == (100.0, 40.0, 140.0)
+
+
+def test_reporte_vehiculo_incluye_alertas(app, db, monkeypatch):
+    import routers.flota as flota
+    db["Vehiculos"].insert_one({"_id": PATENTE, "patente": PATENTE, "activo": True})
+    alerta = Alerta(patente=PATENTE, tipo_documento="SEGURO", fecha_vencimiento="2025-04-01", dias_restantes=5,
+                    mensaje="Vence en 5 días", prioridad="ALTA")
+
+    async def _alertas(dias_tolerancia, patente=None, **kwargs):
+        return [alerta]
+    monkeypatch.setattr(flota, "get_vencimientos_criticos_alertas", _alertas)
+
+    # La agregación de costos ($unionWith + $facet) no corre en mongomock: se responde su resultado
+    class _Mantenimiento:
+        def aggregate(self, pipeline):
+            return CursorAsync(iter([{"totales": [], "detalles": []}]))
+    get_db_collection = flota.get_db_collection
+    monkeypatch.setattr(flota, "get_db_collection",
+                        lambda nombre: _Mantenimiento() if nombre == "Mantenimiento" else get_db_collection(nombre))
+
+    respuesta = pedir(app, "GET", f"/vehiculos/{PATENTE}/reporte?start_date=2025-03-01&end_date=2025-03-31")
+
+    assert respuesta.status_code == 200, respuesta.text
+    assert [a["tipo_documento"] for a in respuesta.json()["alertas"]] == ["SEGURO"]
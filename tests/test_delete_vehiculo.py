@@ -0,0 +1,63 @@
+# tests/test_delete_vehiculo.py
+from datetime import datetime
+
+from bson import ObjectId
+
+from conftest import pedir
+from costos_mensuales import COLECCION_COSTOS_MENSUALES
+from libro_costos import COLECCION_COSTOS
+
+
+def _cargar_vehiculo_con_costos(db, patente):
+    db["Vehiculos"].insert_one({"_id": patente, "activo": True})
+    mantenimiento_id, finanzas_id = ObjectId(), ObjectId()
+    db["Mantenimiento"].insert_one({"_id": mantenimiento_id, "patente": patente, "costo_monto": 100.0,
+                                    "fecha_evento": datetime(2025, 3, 1)})
+    db["Finanzas"].insert_one({"_id": finanzas_id, "patente": patente, "MONTO": 50.0, "tipo_registro": "INFRACCION",
+                               "fecha_evento": datetime(2025, 3, 2)})
+    db[COLECCION_COSTOS].insert_many([
+        {"_id": f"Mantenimiento:{mantenimiento_id}", "patente": patente, "origen": "Mantenimiento", "importe": 100.0},
+        {"_id": f"Finanzas:{finanzas_id}", "patente": patente, "origen": "Finanzas", "importe": 50.0},
+    ])
+    db[COLECCION_COSTOS_MENSUALES].insert_one({"_id": f"{patente}|2025-03|Finanzas|Multa", "patente": patente,
+                                               "mes": "2025-03", "total": 50.0, "cantidad": 1})
+
+
+def test_delete_vehiculo_borra_costos_derivados(app, db):
+    _cargar_vehiculo_con_costos(db, "AB123CD")
+    _cargar_vehiculo_con_costos(db, "ZZ999ZZ")
+
+    respuesta = pedir(app, "DELETE", "/vehiculos/AB123CD")
+
+    assert respuesta.status_code == 202, respuesta.text
+    assert db["Vehiculos"].find_one({"_id": "AB123CD"}) is None
+    for coleccion in ("Mantenimiento", "Finanzas", COLECCION_COSTOS, COLECCION_COSTOS_MENSUALES):
+        assert db[coleccion].count_documents({"patente": "AB123CD"}) == 0, coleccion
+        assert db[coleccion].count_documents({"patente": "ZZ999ZZ"}) > 0, coleccion
+
+
+def test_delete_vehiculo_inexistente(app, db):
+    respuesta = pedir(app, "DELETE", "/vehiculos/NOEXISTE")
+    assert respuesta.status_code == 404
+
+
+def test_delete_vehiculo_limpia_archivos_en_segundo_plano(app, db):
+    digital, poliza, faltante = (db["fs.files"].insert_one({"filename": nombre}).inserted_id
+                                 for nombre in ("cedula.pdf", "poliza.pdf", "borrado.pdf"))
+    db["fs.files"].delete_one({"_id": faltante})
+    db["Vehiculos"].insert_one({"_id": "AB123CD", "documentos_digitales": [{"tipo": "CEDULA", "file_id": str(digital)}]})
+    db["Documentacion"].insert_many([
+        {"patente": "AB123CD", "tipo_documento": "SEGURO", "file_id": str(poliza)},
+        {"patente": "AB123CD", "tipo_documento": "VTV", "file_id": str(faltante)},
+    ])
+
+    respuesta = pedir(app, "DELETE", "/vehiculos/AB123CD")
+
+    assert respuesta.status_code == 202, respuesta.text
+    assert db["fs.files"].count_documents({}) == 0
+    assert db["Documentacion"].count_documents({"patente": "AB123CD"}) == 0
+    estado = pedir(app, "GET", respuesta.json()["estado_url"]).json()
+    # El archivo que ya no estaba cuenta como liberado: la tarea termina sin errores
+    assert (estado["estado"], estado["archivos_total"], estado["archivos_borrados"], estado["errores"]) == \
+        ("completada", 3, 3, [])
+    assert pedir(app, "GET", "/limpiezas/000000000000000000000000").status_code == 404
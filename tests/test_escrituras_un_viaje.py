@@ -0,0 +1,82 @@
+# tests/test_escrituras_un_viaje.py
+# Escrituras de un solo viaje: la respuesta sale del documento escrito (find_one_and_update / insert)
+# y los reintentos no duplican datos. (El update de la póliza financiera usa $anyElementTrue, que
+# mongomock no implementa.)
+from datetime import datetime
+
+from bson import ObjectId
+
+from conftest import pedir
+from replica_flota import replica_flota
+
+
+def test_alta_de_vehiculo_y_alta_repetida(app, db):
+    alta = pedir(app, "POST", "/vehiculos", json={"patente": "ab-123-cd", "marca": "Renault", "nro_movil": "12"})
+    assert alta.status_code == 201, alta.text
+    assert (alta.json()["_id"], alta.json()["MARCA"], alta.json()["nro_movil"]) == ("AB123CD", "Renault", "12")
+    assert db["Vehiculos"].find_one({"_id": "AB123CD"})["search_tokens"]
+
+    assert pedir(app, "POST", "/vehiculos", json={"patente": "AB123CD"}).status_code == 409
+
+
+def test_alta_concurrente_es_409(app, db, monkeypatch):
+    db["Vehiculos"].insert_one({"_id": "AB123CD", "activo": True})
+
+    async def _no_existe(patente):  # la réplica todavía no vio el alta del otro proceso
+        return False
+    monkeypatch.setattr(replica_flota, "existe", _no_existe)
+
+    assert pedir(app, "POST", "/vehiculos", json={"patente": "AB123CD"}).status_code == 409
+
+
+def test_patch_devuelve_el_documento_escrito(app, db):
+    db["Vehiculos"].insert_one({"_id": "AB123CD", "activo": True, "schema_version": 1, "marca": "Renault", "COLOR": "Gris"})
+
+    respuesta = pedir(app, "PATCH", "/vehiculos/AB123CD", json={"color": "Blanco", "activo": False})
+
+    assert respuesta.status_code == 200, respuesta.text
+    assert (respuesta.json()["COLOR"], respuesta.json()["activo"], respuesta.json()["MARCA"]) == ("Blanco", False, "Renault")
+    assert "COLOR" not in db["Vehiculos"].find_one({"_id": "AB123CD"})
+    assert pedir(app, "PATCH", "/vehiculos/ZZ999ZZ", json={"color": "Rojo"}).status_code == 404
+
+
+def test_modificar_poliza_sin_cambios_no_es_404(app, db):
+    poliza_id = db["polizas_seguros"].insert_one({
+        "empresa": "La Segunda", "numero_poliza": "123", "filename": "p.pdf", "file_id": str(ObjectId()),
+        "fecha_subida": datetime(2025, 1, 1),
+    }).inserted_id
+
+    for _ in range(2):
+        respuesta = pedir(app, "PUT", f"/polizas/{poliza_id}", data={"empresa": " La Segunda ", "numero_poliza": "123"})
+        assert respuesta.status_code == 200, respuesta.text
+    assert respuesta.json()["empresa"] == "La Segunda"
+    assert pedir(app, "PUT", f"/polizas/{ObjectId()}", data={"empresa": "X", "numero_poliza": "1"}).status_code == 404
+
+
+def _edicion(origen="Finanzas", importe=80.0):
+    return {"patente": "AB123CD", "tipo_costo": "Service", "fecha": "2025-03-10", "descripcion": "Editado",
+            "importe": importe, "origen": origen}
+
+
+def test_editar_gasto_busca_en_la_otra_coleccion(app, db):
+    gasto_id = db["Mantenimiento"].insert_one({
+        "patente": "AB123CD", "costo_monto": 50.0, "fecha_evento": datetime(2025, 3, 1),
+        "categoria": "Mantenimiento", "excluido": None,
+    }).inserted_id
+
+    # El frontend dice Finanzas pero el gasto está en Mantenimiento
+    respuesta = pedir(app, "PUT", f"/costos/manual/{gasto_id}", data=_edicion())
+
+    assert respuesta.status_code == 200, respuesta.text
+    assert "Mantenimiento" in respuesta.json()["message"]
+    doc = db["Mantenimiento"].find_one({"_id": gasto_id})
+    assert (doc["costo_monto"], doc["fecha_evento"]) == (80.0, datetime(2025, 3, 10))
+    assert db["Finanzas"].count_documents({}) == 0
+
+
+def test_editar_gasto_inexistente_borra_el_comprobante_subido(app, db):
+    respuesta = pedir(app, "PUT", f"/costos/manual/{ObjectId()}", data=_edicion(),
+                      files={"comprobante": ("factura.pdf", b"%PDF-1.4", "application/pdf")})
+
+    assert respuesta.status_code == 404
+    assert db["fs.files"].count_documents({}) == 0
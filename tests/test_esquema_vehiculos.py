@@ -0,0 +1,55 @@
+# tests/test_esquema_vehiculos.py
+# Migración de Vehiculos al esquema canónico (python esquema_vehiculos.py) y mapper de lectura.
+from conftest import pedir
+from esquema_vehiculos import (
+    VERSION_ESQUEMA_VEHICULO, filtro_pendientes, migrar_vehiculos, operacion_migrar, vehiculo_desde_doc
+)
+
+
+def _vehiculo_legado(db, patente="AB123CD", **campos):
+    db["Vehiculos"].insert_one({"_id": patente, "patente_original": patente, "activo": True,
+                                "NRO_MOVIL": 12.0, "nro_movil": "9", "ANIO": "2019", "MARCA": " Renault ",
+                                "modelo": "Kangoo", "COLOR": float("nan"), **campos})
+
+
+def test_migracion_deja_el_documento_canonico(db):
+    _vehiculo_legado(db)
+
+    assert migrar_vehiculos(db) == 1
+
+    doc = db["Vehiculos"].find_one({"_id": "AB123CD"})
+    assert doc["schema_version"] == VERSION_ESQUEMA_VEHICULO
+    assert (doc["nro_movil"], doc["anio"], doc["marca"]) == ("12", 2019, "Renault")
+    assert not {"NRO_MOVIL", "ANIO", "MARCA", "COLOR", "color"} & set(doc)
+    assert "12" in doc["search_tokens"]
+    assert db["Vehiculos"].count_documents(filtro_pendientes()) == 0
+    assert migrar_vehiculos(db) == 0  # reanudable: no queda nada pendiente
+
+
+def test_mapper_lee_igual_documentos_migrados_y_sin_migrar(db):
+    _vehiculo_legado(db)
+    sin_migrar = vehiculo_desde_doc(db["Vehiculos"].find_one({"_id": "AB123CD"}))
+    migrar_vehiculos(db)
+    migrado = vehiculo_desde_doc(db["Vehiculos"].find_one({"_id": "AB123CD"}))
+
+    assert sin_migrar == migrado
+    assert migrado["nro_movil"] == "12" and migrado["patente"] == "AB123CD"
+
+
+def test_migracion_no_pisa_una_edicion_concurrente(app, db):
+    _vehiculo_legado(db)
+    leido = db["Vehiculos"].find_one({"_id": "AB123CD"})  # la migración lee el lote...
+
+    respuesta = pedir(app, "PATCH", "/vehiculos/AB123CD", json={"marca": "Fiat", "color": "Blanco"})  # ...la API edita...
+    assert respuesta.status_code == 200, respuesta.text
+    result = db["Vehiculos"].bulk_write([operacion_migrar(leido)])  # ...y la migración escribe lo que leyó
+
+    assert result.modified_count == 0
+    doc = db["Vehiculos"].find_one({"_id": "AB123CD"})
+    assert (doc["marca"], doc["color"]) == ("Fiat", "Blanco")
+    assert db["Vehiculos"].count_documents(filtro_pendientes()) == 1  # queda para la próxima corrida
+
+    migrar_vehiculos(db)
+    doc = db["Vehiculos"].find_one({"_id": "AB123CD"})
+    assert (doc["marca"], doc["color"], doc["nro_movil"]) == ("Fiat", "Blanco", "12")
+    assert doc["schema_version"] == VERSION_ESQUEMA_VEHICULO
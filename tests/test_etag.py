@@ -0,0 +1,46 @@
+# tests/test_etag.py
+# Respuestas condicionales: ETag por versión de colección, 304 con If-None-Match y revalidación tras escribir.
+from datetime import datetime
+
+from conftest import pedir
+
+
+def _vehiculo(db, patente="AB123CD"):
+    db["Vehiculos"].insert_one({"_id": patente, "patente_original": patente, "activo": True,
+                                "schema_version": 1, "marca": "Renault"})
+
+
+def test_listado_304_con_if_none_match(app, db):
+    _vehiculo(db)
+    primera = pedir(app, "GET", "/vehiculos?limit=10")
+    etag = primera.headers["ETag"]
+    assert primera.status_code == 200 and primera.headers["Cache-Control"] == "no-cache"
+
+    repetida = pedir(app, "GET", "/vehiculos?limit=10", headers={"If-None-Match": etag})
+    assert repetida.status_code == 304
+    assert repetida.content == b"" and repetida.headers["ETag"] == etag
+    # Lista de ETags y prefijo débil (W/) también valen
+    assert pedir(app, "GET", "/vehiculos?limit=10", headers={"If-None-Match": f'"otro", W/{etag}'}).status_code == 304
+    # Otra query string es otra representación
+    assert pedir(app, "GET", "/vehiculos?limit=5", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_escritura_cambia_el_etag(app, db):
+    _vehiculo(db)
+    etag = pedir(app, "GET", "/vehiculos/AB123CD").headers["ETag"]
+
+    assert pedir(app, "PATCH", "/vehiculos/AB123CD", json={"color": "Rojo"}).status_code == 200
+
+    respuesta = pedir(app, "GET", "/vehiculos/AB123CD", headers={"If-None-Match": etag})
+    assert respuesta.status_code == 200
+    assert respuesta.headers["ETag"] != etag
+    assert respuesta.json()["COLOR"] == "Rojo"
+
+
+def test_documentacion_304(app, db):
+    db["Documentacion"].insert_one({"patente": "AB123CD", "tipo_documento": "VTV", "fecha_vencimiento": datetime(2026, 1, 1)})
+    primera = pedir(app, "GET", "/documentacion/ab-123-cd")
+    assert primera.status_code == 200 and len(primera.json()) == 1
+
+    assert pedir(app, "GET", "/documentacion/AB123CD", headers={"If-None-Match": primera.headers["ETag"]}).status_code == 304
+    assert pedir(app, "GET", "/documentacion/CD456EF", headers={"If-None-Match": primera.headers["ETag"]}).status_code == 200
@@ -0,0 +1,37 @@
+# tests/test_exportacion.py
+import io
+import threading
+
+from openpyxl import load_workbook
+
+import routers.exportacion as exportacion
+from conftest import pedir
+
+
+def test_exportar_xlsx_escribe_filas_fuera_del_event_loop(app, monkeypatch):
+    cantidad = exportacion.FILAS_POR_LOTE_XLSX * 2 + 5
+    filtros, hilos = [], []
+
+    async def _filas(filtro):
+        filtros.append(filtro)
+        for i in range(cantidad):
+            yield {"fecha": f"2025-03-01T00:00:{i % 60:02d}", "patente": "AB123CD", "origen": "mantenimiento",
+                   "tipo": "Service", "descripcion": f"fila {i}", "importe": float(i), "id": str(i)}
+    monkeypatch.setattr(exportacion, "stream_filas_gastos", _filas)
+
+    agregar_filas = exportacion._agregar_filas
+
+    def _agregar_filas(hoja, filas):
+        hilos.append(threading.get_ident())
+        agregar_filas(hoja, filas)
+    monkeypatch.setattr(exportacion, "_agregar_filas", _agregar_filas)
+
+    respuesta = pedir(app, "GET", "/export/costos?desde=2025-03-01&hasta=2025-03-31&formato=xlsx")
+
+    assert respuesta.status_code == 200, respuesta.text
+    filas = list(load_workbook(io.BytesIO(respuesta.content), read_only=True)["Costos"].iter_rows(values_only=True))
+    assert list(filas[0]) == exportacion.COLUMNAS_EXPORTACION
+    assert len(filas) == cantidad + 1
+    assert filas[-1][4] == f"fila {cantidad - 1}"
+    assert len(hilos) == 3 and threading.get_ident() not in hilos
+    assert set(filtros[0]["fecha_evento"]) == {"$gte", "$lt"}
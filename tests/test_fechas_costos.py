@@ -0,0 +1,48 @@
+# tests/test_fechas_costos.py
+# fecha_evento: una fecha BSON por costo, resuelta al escribir desde el campo y formato de cada origen.
+from datetime import datetime
+from uuid import uuid4
+
+from bson import ObjectId
+
+from conftest import pedir
+from fechas_costos import backfill_coleccion, fecha_evento, parsear_fecha
+
+
+def test_parsear_fecha_en_los_formatos_de_cada_origen():
+    assert parsear_fecha(datetime(2025, 3, 1, 10, 30)) == datetime(2025, 3, 1, 10, 30)
+    assert parsear_fecha("05/03/2025") == datetime(2025, 3, 5)
+    assert parsear_fecha("5-3-2025 14:00") == datetime(2025, 3, 5)
+    assert parsear_fecha("03/2025") == datetime(2025, 3, 1)  # multas CABA: mes/año
+    assert parsear_fecha("2025-03-05T10:00:00Z") == datetime(2025, 3, 5, 10)
+    assert [parsear_fecha(v) for v in ("", "N/A", "NaT", "31/02/2025", "ayer", 20250305)] == [None] * 6
+
+
+def test_fecha_evento_prioriza_la_edicion_manual():
+    assert fecha_evento({"fecha": datetime(2024, 1, 1), "FECHA": "10/03/2025"}) == datetime(2025, 3, 10)
+    assert fecha_evento({"FECHA": "sin fecha", "fecha_infraccion": "02/2025"}) == datetime(2025, 2, 1)
+    assert fecha_evento({"descripcion": "sin fechas"}) is None
+
+
+def test_backfill_reanudable_con_ids_mezclados(db):
+    db["Finanzas"].insert_many([
+        {"_id": str(uuid4()), "fecha_infraccion": "01/03/2025"},
+        {"_id": str(uuid4()), "dia": "basura"},
+        {"_id": ObjectId(), "FECHA": "2025-04-02"},
+        {"_id": ObjectId(), "fecha_evento": datetime(2020, 1, 1)},  # ya normalizado: no se toca
+    ])
+
+    assert backfill_coleccion(db, "Finanzas", lote=1) == 3
+    fechas = sorted((doc["fecha_evento"] for doc in db["Finanzas"].find()), key=lambda f: (f is not None, f))
+    assert fechas == [None, datetime(2020, 1, 1), datetime(2025, 3, 1), datetime(2025, 4, 2)]
+    assert backfill_coleccion(db, "Finanzas") == 0  # el que no tiene fecha queda en null y no se reprocesa
+
+
+def test_alta_manual_guarda_fecha_evento(app, db):
+    respuesta = pedir(app, "POST", "/costos/manual/json", json={
+        "patente": "AB123CD", "tipo_costo": "Service", "fecha": "2025-03-05", "descripcion": "Service", "importe": 10.0,
+        "origen": "Mantenimiento",
+    })
+
+    assert respuesta.status_code == 200, respuesta.text
+    assert db["Mantenimiento"].find_one({"patente": "AB123CD"})["fecha_evento"] == datetime(2025, 3, 5)
@@ -0,0 +1,26 @@
+# tests/test_indices.py
+# Registro declarativo de índices: el arranque los crea y verificar_indices.py detecta faltantes y redundantes.
+import dependencies
+from conftest import ejecutar
+from verificar_indices import _clave, faltantes, indices_existentes, redundantes
+
+
+def test_asegurar_indices_crea_todo_el_registro(cliente_mongo, db):
+    ejecutar(dependencies.asegurar_indices())
+    ejecutar(dependencies.asegurar_indices())  # idempotente
+
+    for coleccion, indices in dependencies.INDICES_REQUERIDOS.items():
+        existentes = indices_existentes(db[coleccion])
+        assert faltantes(coleccion, existentes) == [], coleccion
+        assert sorted(existentes.values()) == sorted(_clave(indice["keys"]) for indice in indices)
+
+
+def test_verificacion_reporta_faltantes_y_redundantes(cliente_mongo, db):
+    db["Documentacion"].create_index([("patente", 1)])
+    db["Documentacion"].create_index([("patente", 1), ("tipo_documento", 1)])
+
+    existentes = indices_existentes(db["Documentacion"])
+
+    assert faltantes("Documentacion", existentes) == [{"keys": [("tipo_documento", 1), ("fecha_vencimiento", 1)]}]
+    assert redundantes(existentes, unicos=set()) == [("patente_1", "patente_1_tipo_documento_1")]
+    assert redundantes(existentes, unicos={"patente_1"}) == []
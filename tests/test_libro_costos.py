@@ -0,0 +1,82 @@
+# tests/test_libro_costos.py
+# Libro Costos: backfill reanudable, marca de libro completo y reportes de flota leídos del libro.
+from datetime import datetime
+from uuid import uuid4
+
+from bson import ObjectId
+
+from conftest import ejecutar, pedir
+from dependencies import libro_costos_completo
+from libro_costos import (
+    COLECCION_COSTOS, completar_libro_costos, id_asiento, marcar_libro_completo, reconstruir_libro_costos
+)
+
+
+def _cargar_origenes(db):
+    db["Mantenimiento"].insert_many([
+        {"_id": str(uuid4()), "patente": "AB123CD", "costo_monto": 100.0, "fecha_evento": datetime(2025, 3, 1),
+         "categoria": "Mantenimiento", "excluido": None},
+        {"_id": ObjectId(), "patente": "CD456EF", "costo_monto": 40.0, "fecha_evento": datetime(2025, 3, 9),
+         "categoria": "Mantenimiento", "excluido": None},
+    ])
+    db["Finanzas"].insert_many([
+        {"_id": str(uuid4()), "patente": "AB123CD", "MONTO": 60.0, "motivo": "Multa por exceso de velocidad",
+         "fecha_evento": datetime(2025, 3, 2), "categoria": "Multa", "excluido": None},
+        {"_id": ObjectId(), "patente": "AB123CD", "MONTO": 0, "fecha_evento": datetime(2025, 3, 3),
+         "categoria": "Otros", "excluido": "sin_importe"},
+        {"_id": ObjectId(), "patente": "CD456EF", "MONTO": 25.0, "fecha_evento": datetime(2024, 12, 1),
+         "categoria": "Seguro", "excluido": None},
+    ])
+
+
+def test_backfill_copia_todo_y_marca_el_libro_completo(cliente_mongo, db):
+    _cargar_origenes(db)
+    assert not ejecutar(libro_costos_completo())
+
+    assert completar_libro_costos(db, lote=1) == 5  # lotes de uno: UUID y ObjectId mezclados
+    assert ejecutar(libro_costos_completo())
+    assert db[COLECCION_COSTOS].count_documents({}) == 5
+    assert completar_libro_costos(db) == 0  # reanudable: nada pendiente
+
+    multa = db["Finanzas"].find_one({"categoria": "Multa"})
+    asiento = db[COLECCION_COSTOS].find_one({"_id": id_asiento("Finanzas", multa["_id"])})
+    assert (asiento["patente"], asiento["importe"], asiento["es_multa"], asiento["fecha"]) == \
+        ("AB123CD", 60.0, True, datetime(2025, 3, 2))
+
+
+def test_reportes_de_flota_leen_el_libro_completo(app, db):
+    _cargar_origenes(db)
+    completar_libro_costos(db)
+    alta = pedir(app, "POST", "/costos/manual/json", json={
+        "patente": "AB123CD", "tipo_costo": "Seguro", "fecha": "2025-03-20", "descripcion": "Cuota", "importe": 30.0,
+        "origen": "Finanzas",
+    })
+    assert alta.status_code == 200, alta.text
+    db["Mantenimiento"].delete_many({})  # el reporte ya no mira las colecciones de origen
+    db["Finanzas"].delete_many({})
+
+    periodo = pedir(app, "GET", "/reportes/periodo?desde=2025-03-01&hasta=2025-03-31&group_by=patente")
+    assert periodo.status_code == 200, periodo.text
+    datos = periodo.json()
+    assert sorted((d["grupo"], d["categoria"], d["total"]) for d in datos["datos_agregados"]) == [
+        ("AB123CD", "Mantenimiento", 100.0), ("AB123CD", "Multa", 60.0), ("AB123CD", "Seguro", 30.0),
+        ("CD456EF", "Mantenimiento", 40.0),
+    ]
+    assert (datos["total_general"], datos["total_mantenimiento"], datos["total_infracciones"]) == (230.0, 140.0, 60.0)
+
+    comparativo = pedir(app, "POST", "/reportes/comparativo", json={
+        "patentes": ["CD456EF"], "desde": "2024-12-01", "hasta": "2025-03-31",
+    })
+    assert comparativo.status_code == 200, comparativo.text
+    (vehiculo,) = comparativo.json()["vehiculos"]
+    assert (vehiculo["total_general"], vehiculo["total_mantenimiento"]) == (65.0, 40.0)
+
+
+def test_reconstruccion_rehace_el_libro_y_lo_marca_completo(cliente_mongo, db):
+    marcar_libro_completo(db, False)
+    db[COLECCION_COSTOS].insert_one({"_id": "Finanzas:viejo", "patente": "ZZ999ZZ"})
+    _cargar_origenes(db)
+
+    assert reconstruir_libro_costos(db) == 5
+    assert db[COLECCION_COSTOS].count_documents({"_id": "Finanzas:viejo"}) == 0
+    assert ejecutar(libro_costos_completo())
@@ -0,0 +1,50 @@
+# tests/test_paginacion_vehiculos.py
+# Cursor keyset de GET /vehiculos (header X-Next-Cursor): ida y vuelta sin duplicados ni huecos.
+from busqueda_vehiculos import campos_busqueda
+from conftest import pedir
+
+PATENTES = ["AA001AA", "AB123CD", "AC555ZZ", "BA100XY", "CD456EF", "EF789GH", "GH012IJ"]
+
+
+def _cargar_flota(db):
+    for i, patente in enumerate(PATENTES):
+        doc = {"_id": patente, "patente_original": patente, "activo": True, "schema_version": 1,
+               "nro_movil": str(i), "marca": "Renault" if i % 2 else "Fiat"}
+        db["Vehiculos"].insert_one({**doc, **campos_busqueda(doc)})
+
+
+def _recorrer(app, limit, **params):
+    patentes, cursor, paginas = [], None, 0
+    while True:
+        consulta = {**params, "limit": limit, **({"cursor": cursor} if cursor else {})}
+        respuesta = pedir(app, "GET", "/vehiculos", params=consulta)
+        assert respuesta.status_code == 200, respuesta.text
+        patentes += [v["_id"] for v in respuesta.json()]
+        paginas += 1
+        cursor = respuesta.headers.get("X-Next-Cursor")
+        if not cursor:
+            return patentes, paginas
+
+
+def test_cursor_recorre_la_flota_sin_duplicados(app, db):
+    _cargar_flota(db)
+
+    patentes, paginas = _recorrer(app, 3)
+
+    assert patentes == PATENTES
+    assert paginas == 3  # 3 + 3 + 1: la última página incompleta no trae cursor
+
+
+def test_cursor_con_filtro_sigue_el_orden_de_relevancia(app, db):
+    _cargar_flota(db)
+    completo = [v["_id"] for v in pedir(app, "GET", "/vehiculos", params={"filtro": "renault"}).json()]
+
+    patentes, _ = _recorrer(app, 2, filtro="renault")
+
+    assert patentes == completo == ["AB123CD", "BA100XY", "EF789GH"]
+
+
+def test_cursor_invalido_es_400(app, db):
+    _cargar_flota(db)
+    for cursor in ("no-es-base64!", "WzEsIDJd"):  # el segundo es [1, 2]: largo equivocado
+        assert pedir(app, "GET", "/vehiculos", params={"cursor": cursor}).status_code == 400
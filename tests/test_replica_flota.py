@@ -0,0 +1,56 @@
+# tests/test_replica_flota.py
+# Réplica en memoria de Vehiculos: índices, escrituras propias sin recarga y recarga por versión ajena.
+import replica_flota as modulo
+from conftest import ejecutar, pedir
+from esquema_vehiculos import FILTRO_VERSION_VEHICULOS
+from replica_flota import replica_flota
+from versiones import COLECCION_METADATOS, INCREMENTO_VERSION
+
+
+def _vehiculos(db):
+    db["Vehiculos"].insert_many([
+        {"_id": "CD456EF", "activo": True, "schema_version": 1, "nro_movil": "7"},
+        {"_id": "AB123CD", "activo": False, "NRO_MOVIL": 12.0},
+    ])
+
+
+def test_lecturas_desde_la_replica(cliente_mongo, db):
+    _vehiculos(db)
+
+    assert [doc["_id"] for doc in ejecutar(replica_flota.listar(0, 10))] == ["AB123CD", "CD456EF"]
+    assert [doc["_id"] for doc in ejecutar(replica_flota.listar(0, 10, despues_de="AB123CD"))] == ["CD456EF"]
+    assert ejecutar(replica_flota.obtener_por_movil(12))["_id"] == "AB123CD"  # clave legada normalizada
+    assert ejecutar(replica_flota.conteos()) == (2, 1)
+
+
+def test_escritura_propia_actualiza_sin_recargar(app, db, alertas_refrescadas, monkeypatch):
+    _vehiculos(db)
+    ejecutar(replica_flota.cargar())
+    cargas = []
+    cargar_original = modulo.ReplicaFlota.cargar
+
+    async def _cargar(self):
+        cargas.append(1)
+        await cargar_original(self)
+    monkeypatch.setattr(modulo.ReplicaFlota, "cargar", _cargar)
+
+    respuesta = pedir(app, "PATCH", "/vehiculos/CD456EF", json={"nro_movil": "70"})
+
+    assert respuesta.status_code == 200, respuesta.text
+    assert ejecutar(replica_flota.obtener_por_movil("70"))["_id"] == "CD456EF"
+    assert ejecutar(replica_flota.obtener_por_movil("7")) is None
+    assert cargas == []
+    assert alertas_refrescadas == ["CD456EF"]  # el móvil se copia en las alertas
+
+
+def test_escritura_ajena_recarga_al_verificar_la_version(cliente_mongo, db, monkeypatch):
+    _vehiculos(db)
+    ejecutar(replica_flota.cargar())
+
+    # Otro worker (o el ETL) escribe y sube la versión: la réplica la ve en la próxima verificación
+    db["Vehiculos"].insert_one({"_id": "EF789GH", "activo": True})
+    db[COLECCION_METADATOS].update_one(FILTRO_VERSION_VEHICULOS, INCREMENTO_VERSION, upsert=True)
+    assert not ejecutar(replica_flota.existe("EF789GH"))  # dentro del intervalo de verificación
+
+    monkeypatch.setattr(modulo, "INTERVALO_VERIFICACION", 0.0)
+    assert ejecutar(replica_flota.existe("EF789GH"))
@@ -0,0 +1,43 @@
+# tests/test_reporte_comparativo.py
+# POST /reportes/comparativo: una agregación para todas las patentes y totales por vehículo.
+# mongomock no ejecuta $unionWith: la agregación de Mantenimiento devuelve grupos fijos.
+import routers.flota as flota
+from conftest import CursorAsync, pedir
+
+
+def test_comparativo_totales_por_vehiculo_y_no_encontradas(app, db, monkeypatch):
+    db["Vehiculos"].insert_one({"_id": "AB123CD", "activo": True})
+    pipelines = []
+
+    class _Mantenimiento:
+        def aggregate(self, pipeline):
+            pipelines.append(pipeline)
+            return CursorAsync(iter([
+                {"_id": {"patente": "AB123CD", "categoria": "Service"}, "total": 80.0, "mantenimiento": 80.0, "infracciones": 0.0},
+                {"_id": {"patente": "AB123CD", "categoria": "Multa"}, "total": 120.0, "mantenimiento": 0.0, "infracciones": 120.0},
+            ]))
+    get_db_collection = flota.get_db_collection
+    monkeypatch.setattr(flota, "get_db_collection",
+                        lambda nombre: _Mantenimiento() if nombre == "Mantenimiento" else get_db_collection(nombre))
+
+    respuesta = pedir(app, "POST", "/reportes/comparativo", json={
+        "patentes": ["ab-123-cd", "AB123CD", "CD456EF"], "desde": "2025-01-01", "hasta": "2025-03-31",
+    })
+
+    assert respuesta.status_code == 200, respuesta.text
+    datos = respuesta.json()
+    assert [v["patente"] for v in datos["vehiculos"]] == ["AB123CD", "CD456EF"]  # normalizadas y sin duplicar
+    ab, cd = datos["vehiculos"]
+    assert (ab["total_general"], ab["total_mantenimiento"], ab["total_infracciones"]) == (200.0, 80.0, 120.0)
+    assert [d["categoria"] for d in ab["por_categoria"]] == ["Multa", "Service"]
+    assert (cd["total_general"], cd["por_categoria"]) == (0.0, [])
+    assert datos["no_encontradas"] == ["CD456EF"]
+    (pipeline,) = pipelines  # una sola agregación para todas las patentes
+    assert pipeline[0]["$match"]["patente"] == {"$in": ["AB123CD", "CD456EF"]}
+
+
+def test_comparativo_valida_el_cuerpo(app):
+    cuerpo = {"patentes": ["AB123CD"], "desde": "2025-03-31", "hasta": "2025-03-01"}
+    assert pedir(app, "POST", "/reportes/comparativo", json=cuerpo).status_code == 400
+    cuerpo = {"patentes": ["  "], "desde": "2025-03-01", "hasta": "2025-03-31"}
+    assert pedir(app, "POST", "/reportes/comparativo", json=cuerpo).status_code == 422
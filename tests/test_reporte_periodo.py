@@ -0,0 +1,63 @@
+# tests/test_reporte_periodo.py
+# GET /reportes/periodo: armado de la respuesta sobre los grupos (patente, categoría) de Mongo.
+# mongomock no ejecuta $unionWith: la agregación de Mantenimiento devuelve grupos fijos.
+import routers.flota as flota
+from conftest import CursorAsync, pedir
+
+
+def _grupo(patente, categoria, total, mantenimiento=0.0, infracciones=0.0):
+    return {"_id": {"patente": patente, "categoria": categoria}, "total": total,
+            "mantenimiento": mantenimiento, "infracciones": infracciones}
+
+
+def _con_grupos(monkeypatch, grupos):
+    pipelines = []
+
+    class _Mantenimiento:
+        def aggregate(self, pipeline):
+            pipelines.append(pipeline)
+            return CursorAsync(iter(grupos))
+    get_db_collection = flota.get_db_collection
+    monkeypatch.setattr(flota, "get_db_collection",
+                        lambda nombre: _Mantenimiento() if nombre == "Mantenimiento" else get_db_collection(nombre))
+    return pipelines
+
+
+def test_periodo_agrupa_por_area_con_la_replica(app, db, monkeypatch):
+    db["Vehiculos"].insert_many([
+        {"_id": "AB123CD", "activo": True, "AREA": "Logística"},
+        {"_id": "CD456EF", "activo": True, "area": "Logística"},
+        {"_id": "EF789GH", "activo": True},
+    ])
+    _con_grupos(monkeypatch, [
+        _grupo("AB123CD", "Service", 100.0, mantenimiento=100.0),
+        _grupo("CD456EF", "Service", 50.0, mantenimiento=50.0),
+        _grupo("CD456EF", "Multa", 30.0, infracciones=30.0),
+        _grupo("EF789GH", None, 20.0),
+        _grupo("ZZ999ZZ", "Service", 5.0, mantenimiento=5.0),  # patente dada de baja
+    ])
+
+    respuesta = pedir(app, "GET", "/reportes/periodo?desde=2025-03-01&hasta=2025-03-31&group_by=area")
+
+    assert respuesta.status_code == 200, respuesta.text
+    datos = respuesta.json()
+    assert [(d["grupo"], d["categoria"], d["total"]) for d in datos["datos_agregados"]] == [
+        ("Logística", "Service", 150.0), ("Logística", "Multa", 30.0),
+        ("Sin asignar", "Otros", 20.0), ("Sin asignar", "Service", 5.0),
+    ]
+    assert (datos["total_general"], datos["total_mantenimiento"], datos["total_infracciones"]) == (205.0, 155.0, 30.0)
+
+
+def test_periodo_sin_group_by_agrupa_solo_por_categoria(app, monkeypatch):
+    pipelines = _con_grupos(monkeypatch, [_grupo(None, "Service", 12.5, mantenimiento=12.5)])
+
+    datos = pedir(app, "GET", "/reportes/periodo?desde=2025-03-01&hasta=2025-03-31").json()
+
+    assert [(d["grupo"], d["categoria"], d["total"]) for d in datos["datos_agregados"]] == [(None, "Service", 12.5)]
+    assert pipelines[0][-1]["$group"]["_id"]["patente"] is None
+
+
+def test_periodo_valida_las_fechas(app):
+    assert pedir(app, "GET", "/reportes/periodo?desde=2025-03-31&hasta=2025-03-01").status_code == 400
+    assert pedir(app, "GET", "/reportes/periodo?desde=31/03/2025&hasta=2025-04-01").status_code == 400
+    assert pedir(app, "GET", "/reportes/periodo?desde=2025-03-01&hasta=2025-03-31&group_by=marca").status_code == 422
@@ -0,0 +1,77 @@
+# tests/test_reporte_vehiculo.py
+# Reporte por vehículo: totales del período en Mongo y detalle paginado con cursor keyset.
+import routers.flota as flota
+from conftest import CursorAsync, pedir
+from dependencies import codificar_cursor, decodificar_cursor
+
+PATENTE = "AB123CD"
+
+
+def _filas_detalle():
+    # Mismo instante en ambos orígenes y varias filas por instante: los empates los resuelve (origen, _clave)
+    return [
+        {"_fecha_ms": fecha, "origen": origen, "_clave": clave, "tipo": "Service", "fecha": "2025-03-01",
+         "descripcion": "", "importe": 1.0}
+        for fecha in (3000, 2000, 1000)
+        for origen in ("Mantenimiento", "Finanzas")
+        for clave in ("b", "a")
+    ]
+
+
+def test_cursor_del_detalle_recorre_sin_duplicados(db):
+    db["filas"].insert_many(_filas_detalle())
+    orden = flota.ORDEN_DETALLE_COSTOS
+    completo = [(f["_fecha_ms"], f["origen"], f["_clave"]) for f in db["filas"].find().sort(list(orden.items()))]
+
+    vistas, cursor = [], None
+    while True:
+        pipeline = []
+        if cursor:
+            pipeline.append({"$match": flota._filtro_despues_de_cursor(decodificar_cursor(cursor, len(orden)), orden)})
+        pagina = list(db["filas"].aggregate(pipeline + [{"$sort": orden}, {"$limit": 5}]))
+        vistas += [(f["_fecha_ms"], f["origen"], f["_clave"]) for f in pagina]
+        if len(pagina) < 5:
+            break
+        cursor = codificar_cursor([pagina[-1][campo] for campo in orden])
+
+    assert vistas == completo
+    assert len(set(vistas)) == 12
+
+
+def test_reporte_totales_y_next_cursor(app, db, monkeypatch):
+    db["Vehiculos"].insert_one({"_id": PATENTE, "activo": True})
+    pipelines = []
+    detalle = [fila for fila in _filas_detalle()[:2]]
+
+    class _Mantenimiento:
+        def aggregate(self, pipeline):
+            pipelines.append(pipeline)
+            return CursorAsync(iter([{
+                "totales": [{"_id": None, "total_mantenimiento": 300.0, "total_infracciones": 50.5, "cantidad": 7}],
+                "detalles": detalle,
+            }]))
+    get_db_collection = flota.get_db_collection
+    monkeypatch.setattr(flota, "get_db_collection",
+                        lambda nombre: _Mantenimiento() if nombre == "Mantenimiento" else get_db_collection(nombre))
+
+    url = f"/vehiculos/{PATENTE}/reporte?start_date=2025-03-01&end_date=2025-03-31&limit=2"
+    datos = pedir(app, "GET", url).json()
+
+    assert (datos["total_general"], datos["total_mantenimiento"], datos["total_infracciones"]) == (350.5, 300.0, 50.5)
+    assert datos["cantidad_registros"] == 7  # el total del período, no el de la página
+    assert [d["_id"] for d in datos["detalles"]] == ["b", "a"]
+    assert decodificar_cursor(datos["next_cursor"], 3) == [3000, "Mantenimiento", "a"]
+
+    pedir(app, "GET", f"{url}&cursor={datos['next_cursor']}")
+    (match_rango,) = [etapa["$match"] for etapa in pipelines[1][:1]]
+    assert match_rango["patente"] == PATENTE and set(match_rango["fecha_evento"]) == {"$gte", "$lte"}
+    facet = pipelines[1][-1]["$facet"]
+    assert facet["detalles"][0] == {"$match": flota._filtro_despues_de_cursor([3000, "Mantenimiento", "a"], flota.ORDEN_DETALLE_COSTOS)}
+    assert "$match" not in facet["totales"][0]  # los totales no dependen de la página
+
+
+def test_reporte_errores_de_entrada(app, db):
+    db["Vehiculos"].insert_one({"_id": PATENTE, "activo": True})
+    assert pedir(app, "GET", f"/vehiculos/{PATENTE}/reporte?start_date=01-03-2025&end_date=2025-03-31").status_code == 400
+    url = f"/vehiculos/{PATENTE}/reporte?start_date=2025-03-01&end_date=2025-03-31&cursor=roto"
+    assert pedir(app, "GET", url).status_code == 400
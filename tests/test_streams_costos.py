@@ -0,0 +1,67 @@
+# tests/test_streams_costos.py
+# Los modos NDJSON leen cada colección con un cursor ordenado por índice y fusionan en Python.
+# (mongomock no evalúa $toLong / $type sobre fechas: las proyecciones de los reportes no se prueban acá)
+from conftest import CursorAsync, ejecutar
+from dependencies import fusionar_ordenados
+
+
+async def _lista(flujo):
+    return [fila async for fila in flujo]
+
+
+async def _cursor(filas):
+    for fila in filas:
+        yield fila
+
+
+def test_fusionar_ordenados_descendente():
+    mantenimiento = [{"f": 5, "origen": "M"}, {"f": 3, "origen": "M"}, {"f": 1, "origen": "M"}]
+    finanzas = [{"f": 4, "origen": "F"}, {"f": 3, "origen": "F"}]
+    filas = ejecutar(_lista(fusionar_ordenados(
+        [_cursor(mantenimiento), _cursor(finanzas), _cursor([])],
+        clave=lambda fila: (fila["f"], fila["origen"]), descendente=True,
+    )))
+    assert [(fila["f"], fila["origen"]) for fila in filas] == [(5, "M"), (4, "F"), (3, "M"), (3, "F"), (1, "M")]
+
+
+def test_fusionar_ordenados_lee_de_a_una_fila_por_cursor():
+    leidas = []
+
+    async def _contado(nombre, valores):
+        for valor in valores:
+            leidas.append(nombre)
+            yield {"v": valor}
+
+    async def _primeras_dos():
+        flujo = fusionar_ordenados([_contado("a", [1, 4, 5]), _contado("b", [2, 3, 6])], clave=lambda fila: fila["v"])
+        filas = [await anext(flujo), await anext(flujo)]
+        await flujo.aclose()
+        return filas
+
+    assert [fila["v"] for fila in ejecutar(_primeras_dos())] == [1, 2]
+    assert leidas == ["a", "b", "a"]  # la primera de cada cursor y la siguiente de "a", que ya entregó
+
+
+def test_detalle_coleccion_ordena_empates_por_clave(monkeypatch):
+    import routers.flota as flota
+    filas = [
+        {"_fecha_ms": 200, "_clave": "65f000000000000000000001", "origen": "Mantenimiento"},
+        {"_fecha_ms": 200, "_clave": "65f000000000000000000003", "origen": "Mantenimiento"},
+        {"_fecha_ms": 200, "_clave": "0f6c1b9e-etl", "origen": "Mantenimiento"},
+        {"_fecha_ms": 100, "_clave": "65f000000000000000000002", "origen": "Mantenimiento"},
+    ]
+    pipelines = []
+
+    class _Coleccion:
+        def aggregate(self, pipeline):
+            pipelines.append(pipeline)
+            return CursorAsync(iter(filas))
+    monkeypatch.setattr(flota, "get_db_collection", lambda nombre: _Coleccion())
+
+    detalle = ejecutar(_lista(flota._detalle_coleccion("Mantenimiento", {"patente": "AB123CD"}, [])))
+
+    assert [fila["_clave"] for fila in detalle] == [
+        "65f000000000000000000003", "65f000000000000000000001", "0f6c1b9e-etl", "65f000000000000000000002",
+    ]
+    assert {"$sort": {"fecha_evento": -1}} in pipelines[0]
+    assert all("$unionWith" not in etapa for etapa in pipelines[0])
@@ -0,0 +1,47 @@
+# tests/test_update_monto.py
+from bson import ObjectId
+
+from conftest import pedir
+from costos_mensuales import COLECCION_COSTOS_MENSUALES
+from libro_costos import COLECCION_COSTOS
+
+
+def _rollup(db, patente):
+    return {fila["_id"]: fila for fila in db[COLECCION_COSTOS_MENSUALES].find({"patente": patente})}
+
+
+def test_update_monto_actualiza_documento_libro_y_rollup(app, db):
+    from datetime import datetime
+    doc_id = ObjectId()
+    db["Mantenimiento"].insert_one({
+        "_id": doc_id, "patente": "AB123CD", "costo_monto": 100.0, "motivo": "Service",
+        "fecha_evento": datetime(2025, 3, 10), "categoria": "Mantenimiento", "excluido": None,
+    })
+    db[COLECCION_COSTOS_MENSUALES].insert_one({
+        "_id": "AB123CD|2025-03|Mantenimiento|Mantenimiento", "patente": "AB123CD", "mes": "2025-03",
+        "origen": "Mantenimiento", "categoria": "Mantenimiento", "total": 100.0, "total_infracciones": 0.0, "cantidad": 1,
+    })
+
+    respuesta = pedir(app, "PATCH", f"/monto/mantenimiento/{doc_id}", json={"monto": 250.0, "motivo": "Service completo"})
+
+    assert respuesta.status_code == 200, respuesta.text
+    assert respuesta.json()["modified"] is True
+    assert db["Mantenimiento"].find_one({"_id": doc_id})["costo_monto"] == 250.0
+    fila = _rollup(db, "AB123CD")["AB123CD|2025-03|Mantenimiento|Mantenimiento"]
+    assert fila["total"] == 250.0 and fila["cantidad"] == 1
+    assert db[COLECCION_COSTOS].find_one({"_id": f"Mantenimiento:{doc_id}"})["importe"] == 250.0
+
+
+def test_update_monto_sin_cambios_informa_modified_false(app, db):
+    doc_id = ObjectId()
+    db["Finanzas"].insert_one({"_id": doc_id, "patente": "AB123CD", "MONTO": 80.0})
+
+    respuesta = pedir(app, "PATCH", f"/monto/finanzas/{doc_id}", json={"monto": 80.0})
+
+    assert respuesta.status_code == 200, respuesta.text
+    assert respuesta.json()["modified"] is False
+
+
+def test_update_monto_documento_inexistente(app, db):
+    respuesta = pedir(app, "PATCH", f"/monto/finanzas/{ObjectId()}", json={"monto": 10.0})
+    assert respuesta.status_code == 404
@@ -0,0 +1,57 @@
+# tests/test_vencimientos_criticos.py
+# Alertas de vencimiento: umbral CRÍTICO por tipo (VENCIMIENTO_MAP) y armado de cada Alerta.
+from datetime import datetime, timedelta
+
+import routers.flota as flota
+from conftest import CursorAsync, ejecutar
+
+
+def _fila(dias, tipo="VTV", prioridad_orden=0, **extra):
+    return {"patente": "AB123CD", "tipo_documento": tipo, "dias_restantes": dias, "prioridad_orden": prioridad_orden,
+            "fecha_vencimiento": datetime(2025, 3, 1) + timedelta(days=dias), **extra}
+
+
+def test_umbral_critico_por_tipo_normalizado():
+    assert flota.DIAS_CRITICO_POR_TIPO == {"SEGURO": 15, "VTV": 30, "TARJ YPF": 15}
+
+
+def test_alerta_desde_fila_mensaje_y_prioridad():
+    vencida = flota._alerta_desde_fila(_fila(-3.0, movil_nro="12", descripcion_modelo="Kangoo"))
+    assert (vencida.mensaje, vencida.prioridad, vencida.dias_restantes) == ("VENCIDO hace 3 días para VTV", "CRÍTICA", -3)
+    assert (vencida.movil_nro, vencida.descripcion_modelo) == ("12", "Kangoo")
+
+    hoy = flota._alerta_desde_fila(_fila(0, tipo="SEGURO"))
+    assert (hoy.mensaje, hoy.movil_nro, hoy.descripcion_modelo) == ("VENCE HOY para SEGURO", "Sin móvil", "Sin modelo")
+
+    lejana = flota._alerta_desde_fila(_fila(20, prioridad_orden=1))
+    assert (lejana.mensaje, lejana.prioridad, lejana.fecha_vencimiento) == ("Quedan 20 días para VTV", "ALTA", "2025-03-21T00:00:00")
+
+
+def test_prioridad_usa_el_umbral_de_cada_tipo(db, monkeypatch):
+    ahora = datetime.utcnow()
+    db["Alertas"].insert_many([
+        {"patente": "AB123CD", "tipo_documento": "VTV", "fecha_vencimiento": ahora + timedelta(days=20, hours=1)},
+        {"patente": "AB123CD", "tipo_documento": "SEGURO", "fecha_vencimiento": ahora + timedelta(days=20, hours=1)},
+        {"patente": "AB123CD", "tipo_documento": "OTRO", "fecha_vencimiento": ahora + timedelta(days=1, hours=1)},
+    ])
+    pipeline = flota._pipeline_vencimientos_criticos(ahora, ahora + timedelta(days=30), None)
+
+    prioridades = {f["tipo_documento"]: f["prioridad_orden"] for f in db["Alertas"].aggregate(pipeline)}
+
+    assert prioridades == {"VTV": 0, "SEGURO": 1, "OTRO": 1}  # sin umbral declarado: crítica solo al vencer
+
+
+def test_alertas_del_dashboard_en_una_agregacion(monkeypatch):
+    pipelines = []
+
+    class _Coleccion:
+        def aggregate(self, pipeline):
+            pipelines.append(pipeline)
+            return CursorAsync(iter([_fila(2, prioridad_orden=0)]))
+    monkeypatch.setattr(flota, "get_db_collection", lambda nombre: _Coleccion())
+
+    (alerta,) = ejecutar(flota.get_vencimientos_criticos_alertas(limit=5, patente="ab-123-cd"))
+
+    assert (alerta.patente, alerta.mensaje) == ("AB123CD", "Quedan 2 días para VTV")
+    (pipeline,) = pipelines
+    assert pipeline[0]["$match"]["patente"] == "AB123CD" and pipeline[-1] == {"$limit": 5}
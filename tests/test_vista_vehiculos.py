@@ -0,0 +1,54 @@
+# tests/test_vista_vehiculos.py
+# GET /vehiculos con ?fields= y ?view=summary: solo los campos pedidos, también sobre documentos legados.
+from busqueda_vehiculos import campos_busqueda
+from conftest import pedir
+
+
+def _cargar(db):
+    db["Vehiculos"].insert_many([
+        {"_id": "AB123CD", "patente_original": "AB123CD", "activo": True, "schema_version": 1,
+         "nro_movil": "12", "marca": "Renault", "modelo": "Kangoo", "anio": 2019, "responsable": "Pérez"},
+        # Sin migrar: claves legadas en MAYÚSCULAS y NaN del ETL
+        {"_id": "CD456EF", "patente_original": "CD456EF", "activo": False,
+         "NRO_MOVIL": 7.0, "DESCRIPCION_MODELO": "Fiat Strada", "COSTO_ADQUISICION": float("nan")},
+    ])
+
+
+def test_fields_devuelve_solo_los_campos_pedidos(app, db):
+    _cargar(db)
+
+    respuesta = pedir(app, "GET", "/vehiculos", params={"fields": "nro_movil,marca,costo_adquisicion"})
+
+    assert respuesta.status_code == 200, respuesta.text
+    assert respuesta.json() == [
+        {"patente": "AB123CD", "nro_movil": "12", "marca": "Renault", "costo_adquisicion": None},
+        {"patente": "CD456EF", "nro_movil": "7", "marca": None, "costo_adquisicion": None},
+    ]
+
+
+def test_vista_resumen(app, db):
+    _cargar(db)
+
+    respuesta = pedir(app, "GET", "/vehiculos", params={"view": "summary"})
+
+    assert respuesta.status_code == 200, respuesta.text
+    assert respuesta.json()[1] == {"patente": "CD456EF", "nro_movil": "7", "modelo": "Fiat Strada",
+                                   "descripcion_modelo": "Fiat Strada", "activo": False}
+
+
+def test_fields_con_filtro_proyecta_en_mongo(app, db):
+    _cargar(db)
+    for doc in db["Vehiculos"].find():
+        db["Vehiculos"].update_one({"_id": doc["_id"]}, {"$set": campos_busqueda(doc)})
+
+    respuesta = pedir(app, "GET", "/vehiculos", params={"filtro": "strada", "fields": "modelo"})
+
+    assert respuesta.status_code == 200, respuesta.text
+    assert respuesta.json() == [{"patente": "CD456EF", "modelo": "Fiat Strada"}]
+
+
+def test_campo_desconocido_es_400(app, db):
+    _cargar(db)
+    respuesta = pedir(app, "GET", "/vehiculos", params={"fields": "marca,search_tokens"})
+    assert respuesta.status_code == 400
+    assert "search_tokens" in respuesta.json()["detail"]
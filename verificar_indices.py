@@ -0,0 +1,108 @@
+# verificar_indices.py
+# Compara los índices reales de MongoDB contra el registro declarativo dependencies.INDICES_REQUERIDOS.
+# Reporta: FALTANTES (declarados y no creados), REDUNDANTES (prefijo de otro índice) y SIN USO ($indexStats).
+# Uso: python verificar_indices.py [--aplicar] [--coleccion Documentacion]
+# Nota: $indexStats cuenta accesos desde el último reinicio del nodo; "sin uso" es orientativo.
+
+import logging
+import argparse
+from typing import Dict, List, Tuple
+
+from pymongo import MongoClient, IndexModel
+
+from dependencies import INDICES_REQUERIDOS, MONGO_URI, DB_NAME
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+Clave = Tuple[Tuple[str, int], ...]
+
+
+def _clave(keys) -> Clave:
+    """Normaliza la especificación de un índice a una tupla comparable ((campo, dirección), ...)."""
+    return tuple((campo, int(direccion)) if isinstance(direccion, (int, float)) else (campo, direccion)
+                 for campo, direccion in keys)
+
+
+def indices_existentes(collection) -> Dict[str, Clave]:
+    """Nombre → clave de cada índice de la colección (sin contar _id_)."""
+    return {
+        nombre: _clave(info["key"])
+        for nombre, info in collection.index_information().items()
+        if nombre != "_id_"
+    }
+
+
+def faltantes(collection_name: str, existentes: Dict[str, Clave]) -> List[dict]:
+    """Entradas del registro cuya clave no existe todavía en la colección."""
+    return [
+        indice for indice in INDICES_REQUERIDOS.get(collection_name, [])
+        if _clave(indice["keys"]) not in existentes.values()
+    ]
+
+
+def redundantes(existentes: Dict[str, Clave], unicos: set) -> List[Tuple[str, str]]:
+    """Índices cuya clave es prefijo estricto de otro (el más largo ya sirve sus consultas)."""
+    resultado = []
+    for nombre, clave in existentes.items():
+        if nombre in unicos:
+            continue
+        for otro_nombre, otra_clave in existentes.items():
+            if otro_nombre != nombre and len(otra_clave) > len(clave) and otra_clave[:len(clave)] == clave:
+                resultado.append((nombre, otro_nombre))
+                break
+    return resultado
+
+
+def sin_uso(collection) -> List[str]:
+    stats = collection.aggregate([{"$indexStats": {}}])
+    return [s["name"] for s in stats if s["name"] != "_id_" and s.get("accesses", {}).get("ops", 0) == 0]
+
+
+def main(aplicar: bool, coleccion: str | None):
+    client = MongoClient(MONGO_URI)
+    db = client[DB_NAME]
+
+    colecciones_reales = set(db.list_collection_names())
+    nombres = [coleccion] if coleccion else sorted(set(INDICES_REQUERIDOS) | colecciones_reales)
+    problemas = 0
+
+    for collection_name in nombres:
+        collection = db[collection_name]
+        if collection_name.startswith("system."):
+            continue
+
+        info = collection.index_information()
+        existentes = indices_existentes(collection)
+        unicos = {nombre for nombre, datos in info.items() if datos.get("unique")}
+
+        falta = faltantes(collection_name, existentes)
+        redundante = redundantes(existentes, unicos)
+        no_usados = sin_uso(collection) if collection_name in colecciones_reales else []
+
+        if not (falta or redundante or no_usados):
+            logger.info(f"{collection_name}: OK ({len(existentes)} índices)")
+            continue
+
+        for indice in falta:
+            logger.warning(f"{collection_name}: FALTANTE {indice['keys']}")
+        for nombre, cubierto_por in redundante:
+            logger.warning(f"{collection_name}: REDUNDANTE '{nombre}' (prefijo de '{cubierto_por}')")
+        for nombre in no_usados:
+            logger.warning(f"{collection_name}: SIN USO '{nombre}' (0 accesos en $indexStats)")
+        problemas += len(falta) + len(redundante) + len(no_usados)
+
+        if aplicar and falta:
+            collection.create_indexes([IndexModel(indice["keys"], **indice.get("options", {})) for indice in falta])
+            logger.info(f"{collection_name}: {len(falta)} índices faltantes creados.")
+
+    logger.info(f"Verificación completada: {problemas} observaciones.")
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verifica los índices de MongoDB contra el registro de dependencies.py.")
+    parser.add_argument("--aplicar", action="store_true", help="Crea los índices faltantes (no borra nada).")
+    parser.add_argument("--coleccion", type=str, help="Verificar solo esta colección (default: todas).")
+    args = parser.parse_args()
+    main(args.aplicar, args.coleccion)
@@ -0,0 +1,16 @@
+# versiones.py
+# Contadores de versión por colección, guardados en Metadatos ({"_id": "version_<coleccion>", "version": N}).
+# Toda escritura sobre una colección versionada incrementa su contador: la API (dependencies.incrementar_version),
+# el ETL y los scripts de mantenimiento. Los usan la réplica de flota (replica_flota.py) para recargarse y
+# los ETag de los endpoints de lectura.
+
+from typing import Any, Dict
+
+COLECCION_METADATOS = "Metadatos"
+
+INCREMENTO_VERSION = {"$inc": {"version": 1}}
+
+
+def filtro_version(coleccion: str) -> Dict[str, Any]:
+    """Documento de Metadatos con el contador de la colección."""
+    return {"_id": f"version_{coleccion.lower()}"}